@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vicoba_unified_complete as vicoba
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # A fresh database file per test, with the module's caches emptied
+    monkeypatch.setattr(vicoba, "DB_FILE", str(tmp_path / "vicoba.db"))
+    for cache in (vicoba.member_cache, vicoba.member_search_cache, vicoba.report_cache):
+        cache.clear()
+    yield
+    vicoba.connection_manager.close_all()
+
+
+@pytest.fixture
+def group(db):
+    # An initialised database with three members in GRPA
+    vicoba.init_db()
+    for name, phone in (("Alice Smith", "255700000001"), ("Bob Jones", "255700000002"),
+                        ("Carol King", "255700000003")):
+        vicoba.create_member("GRPA", name, phone)
+    return "GRPA"
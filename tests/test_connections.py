@@ -0,0 +1,89 @@
+import gc
+import os
+import threading
+
+import vicoba_unified_complete as vicoba
+
+
+def balance(name, group_id):
+    with vicoba.connection_manager.connection() as conn:
+        return conn.execute("SELECT total_contributions FROM members WHERE member_name=? AND group_id=?",
+                            (name, group_id)).fetchone()[0]
+
+
+def test_thread_exit_closes_its_connection(db):
+    vicoba.init_db()
+    before = len(vicoba.connection_manager._connections)
+
+    def work():
+        with vicoba.connection_manager.connection() as conn:
+            conn.execute("SELECT 1")
+
+    for _ in range(10):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert len(vicoba.connection_manager._connections) == before
+
+
+def test_nested_transaction_joins_and_after_commit_waits(db, group):
+    fired = []
+    try:
+        with vicoba.connection_manager.transaction(immediate=True) as outer:
+            vicoba.connection_manager.after_commit(lambda: fired.append("commit"))
+            with vicoba.connection_manager.transaction() as inner:
+                assert inner is outer
+                inner.execute("UPDATE members SET total_contributions = 5 WHERE group_id=?", (group,))
+            assert fired == []
+            raise RuntimeError("roll back")
+    except RuntimeError:
+        pass
+    assert fired == []
+    assert balance("Alice Smith", group) == 0
+
+
+def test_forked_child_and_parent_keep_working(db, group):
+    with vicoba.connection_manager.connection() as conn:
+        parent_conn = conn
+    # Another thread holds a connection across the fork; the child must not
+    # close it when that thread's state is discarded
+    ready, go, seen = threading.Event(), threading.Event(), []
+
+    def holder():
+        with vicoba.connection_manager.connection() as conn:
+            conn.execute("SELECT 1")
+            ready.set()
+            go.wait()
+            seen.append(conn.execute("SELECT COUNT(*) FROM members").fetchone()[0])
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    ready.wait()
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            gc.collect()
+            with vicoba.connection_manager.connection() as conn:
+                own = conn is not parent_conn
+            vicoba.post_ledger(group, [{"member_name": "Alice Smith", "action": "CONTRIBUTION", "amount": 100}])
+            # The inherited handle is left open (closing it is the parent's
+            # job) and only the child's own connection is tracked
+            parent_conn.in_transaction
+            tracked = vicoba.connection_manager._connections == [conn]
+            code = 0 if own and tracked and balance("Alice Smith", group) == 100 else 2
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    go.set()
+    thread.join()
+    assert seen == [3]
+    with vicoba.connection_manager.connection() as conn:
+        assert conn is parent_conn
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    vicoba.post_ledger(group, [{"member_name": "Alice Smith", "action": "CONTRIBUTION", "amount": 50}])
+    assert balance("Alice Smith", group) == 150
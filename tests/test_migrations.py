@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+import vicoba_unified_complete as vicoba
+
+LATEST = vicoba.MIGRATIONS[-1][0]
+
+
+def init_at(monkeypatch, version):
+    # Builds the baseline tables and applies migrations up to `version` only
+    with monkeypatch.context() as m:
+        m.setattr(vicoba, "MIGRATIONS", [mig for mig in vicoba.MIGRATIONS if mig[0] <= version])
+        vicoba.init_db()
+
+
+def schema_version():
+    with vicoba.connection_manager.connection() as conn:
+        return vicoba.get_schema_version(conn)
+
+
+def test_surrogate_key_rebuild_keeps_the_ledger(db, monkeypatch):
+    init_at(monkeypatch, 7)
+    assert schema_version() == 7
+    with vicoba.connection_manager.transaction() as conn:
+        conn.execute("INSERT INTO groups (group_id, group_name) VALUES ('GA', 'Group A')")
+        conn.executemany(
+            "INSERT INTO members (member_name, phone, total_contributions, total_received, group_id, member_no) "
+            "VALUES (?,?,?,?,?,?)",
+            [("Alice", "255700000001", 150, 200, "GA", 1), ("Bobby", "", 100, 0, "GA", 2)]
+        )
+        conn.execute("INSERT INTO rounds (round_id, member_receiving, total_amount, round_date, group_id) "
+                     "VALUES (1, 'Alice', 200, '2024-01-01T10:00:00', 'GA')")
+        conn.executemany(
+            "INSERT INTO transactions (member_name, action, amount, timestamp, round_id, group_id) "
+            "VALUES (?,?,?,?,?,?)",
+            [("Alice", "CONTRIBUTION", 100, "2024-01-01T09:00:00", 1, "GA"),
+             ("Bobby", "CONTRIBUTION", 100, "2024-01-01T09:01:00", 1, "GA"),
+             ("Alice", "ROUND_RECEIVED", 200, "2024-01-01T10:00:00", 1, "GA"),
+             ("Alice", "CONTRIBUTION", 50, "2024-01-02T09:00:00", None, "GA"),
+             # Ledger name missing from the roster: kept as a member, not dropped
+             ("Ghost", "CONTRIBUTION", 7, "2024-01-02T09:05:00", None, "GA")]
+        )
+
+    assert vicoba.run_migrations() == len([mig for mig in vicoba.MIGRATIONS if mig[0] > 7])
+    assert schema_version() == LATEST
+
+    with vicoba.connection_manager.connection() as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        rows = conn.execute("""
+            SELECT m.member_name, t.action, t.amount, t.round_id
+            FROM transactions t JOIN members m ON m.member_id = t.member_id
+            ORDER BY t.id
+        """).fetchall()
+        recipient = conn.execute(
+            "SELECT m.member_name FROM rounds r JOIN members m ON m.member_id = r.recipient_id"
+        ).fetchone()
+    assert [tuple(row) for row in rows] == [
+        ("Alice", "CONTRIBUTION", 100, 1),
+        ("Bobby", "CONTRIBUTION", 100, 1),
+        ("Alice", "ROUND_RECEIVED", 200, 1),
+        ("Alice", "CONTRIBUTION", 50, None),
+        ("Ghost", "CONTRIBUTION", 7, None),
+    ]
+    assert recipient["member_name"] == "Alice"
+
+    alice = vicoba.get_member("Alice", "GA")
+    assert (alice["total_contributions"], alice["total_received"], alice["member_no"]) == (150, 200, 1)
+    assert vicoba.get_member("Ghost", "GA")["member_no"] == 3
+    assert len(vicoba.get_transactions_page("GA", limit=10)["transactions"]) == 5
+
+    # The migrated schema takes new postings
+    vicoba.record_contribution("GA", "Bobby", 25)
+    assert vicoba.get_member("Bobby", "GA")["total_contributions"] == 125
+
+
+def test_recorded_migrations_do_not_run_again(db):
+    vicoba.init_db()
+    assert schema_version() == LATEST
+    assert vicoba.run_migrations() == 0
+
+
+def test_failed_migration_rolls_back_whole(db, monkeypatch):
+    vicoba.init_db()
+
+    def broken(c):
+        c.execute("ALTER TABLE members ADD COLUMN nickname TEXT")
+        raise sqlite3.OperationalError("simulated failure")
+
+    monkeypatch.setattr(vicoba, "MIGRATIONS", vicoba.MIGRATIONS + [(LATEST + 1, "broken", broken)])
+    with pytest.raises(sqlite3.OperationalError):
+        vicoba.run_migrations()
+    assert schema_version() == LATEST
+    with vicoba.connection_manager.connection() as conn:
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(members)")]
+    assert "nickname" not in columns
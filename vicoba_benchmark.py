@@ -0,0 +1,494 @@
+"""
+VICOBA BENCHMARK SUITE
+Seeded synthetic data generator and hot-path benchmarks for vicoba_unified_complete
+"""
+
+# ==================== IMPORTS ====================
+import argparse
+import builtins
+import contextlib
+import http.client
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Callable
+
+import vicoba_unified_complete as vicoba
+
+# ==================== CONFIGURATION ====================
+BENCH_GROUP_PREFIX = "BENCH"
+CONTRIBUTION_AMOUNTS = [1000, 2000, 5000, 10000]
+PAYMENT_SHARE = 0.1  # fraction of generated ledger rows that are member payments
+BENCH_API_PHONE = "255700000999"
+BENCH_API_PIN = "2468"
+# Request mix of one simulated app user: mostly reads, some ledger writes
+API_LOAD_MIX = {"tracker": 30, "members": 20, "transactions": 30, "contributions": 15, "payments": 5}
+
+# ==================== DATA GENERATOR ====================
+def bench_group_id(index: int) -> str:
+    return f"{BENCH_GROUP_PREFIX}{index:05d}"
+
+def bench_member_name(group_index: int, member_index: int) -> str:
+    return f"Member {group_index} {member_index:04d}"
+
+def generate_dataset(groups: int, members: int, transactions: int, seed: int = 42) -> Dict[str, int]:
+    # Writes whole rounds (every member contributes, one recipient is paid)
+    # plus a share of payments, then leaves an open round missing one member
+    # so the tracker and finalization have realistic pending state.
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    totals = {"groups": 0, "members": 0, "transactions": 0, "rounds": 0}
+
+    for g in range(groups):
+        group_id = bench_group_id(g)
+        names = [bench_member_name(g, m) for m in range(members)]
+        clock = start + timedelta(minutes=g)
+        ledger: List[tuple] = []
+
+        with vicoba.connection_manager.transaction(immediate=True) as conn:
+            c = conn.cursor()
+            group_key = vicoba.get_group_key(conn, group_id, create=True)
+            c.execute("DELETE FROM transactions WHERE group_key=?", (group_key,))
+            c.execute("DELETE FROM rounds WHERE group_key=?", (group_key,))
+            c.execute("DELETE FROM members WHERE group_id=?", (group_id,))
+            c.execute("DELETE FROM current_round WHERE group_id=?", (group_id,))
+            c.execute("DELETE FROM rotation_schedule WHERE group_id=?", (group_id,))
+            c.execute("DELETE FROM rotation_state WHERE group_id=?", (group_id,))
+            c.execute("INSERT OR IGNORE INTO groups (group_id, group_name, created_by) VALUES (?,?,?)",
+                      (group_id, f"Benchmark Group {g}", "255123456789"))
+            c.executemany(
+                """INSERT INTO members (member_name, phone, total_contributions, total_received, group_id, member_no)
+                   VALUES (?,?,?,?,?,?)""",
+                [(name, f"2557{g % 100:02d}{m:06d}", 0, 0, group_id, m + 1) for m, name in enumerate(names)]
+            )
+            ids = dict(c.execute("SELECT member_name, member_id FROM members WHERE group_id=?", (group_id,)).fetchall())
+
+            recipient_index = 0
+            while len(ledger) + members + 1 <= transactions:
+                amount = rng.choice(CONTRIBUTION_AMOUNTS)
+                pot = 0
+                for name in names:
+                    clock += timedelta(seconds=rng.randint(1, 600))
+                    ledger.append((group_key, ids[name], "CONTRIBUTION", amount, clock.isoformat(), None))
+                    pot += amount
+                clock += timedelta(seconds=1)
+                recipient = names[recipient_index % members]
+                recipient_index += 1
+                c.execute("INSERT INTO rounds (group_key, recipient_id, total_amount, round_date) VALUES (?,?,?,?)",
+                          (group_key, ids[recipient], pot, clock.isoformat()))
+                round_id = c.lastrowid
+                totals["rounds"] += 1
+                for i in range(len(ledger) - members, len(ledger)):
+                    ledger[i] = ledger[i][:5] + (round_id,)
+                ledger.append((group_key, ids[recipient], "ROUND_RECEIVED", pot, clock.isoformat(), round_id))
+
+                for _ in range(int(members * PAYMENT_SHARE)):
+                    if len(ledger) + 2 > transactions or members < 2:
+                        break
+                    payer, payee = rng.sample(names, 2)
+                    amount = rng.choice(CONTRIBUTION_AMOUNTS)
+                    clock += timedelta(seconds=rng.randint(1, 600))
+                    ledger.append((group_key, ids[payer], "PAYMENT_SENT", amount, clock.isoformat(), None))
+                    ledger.append((group_key, ids[payee], "PAYMENT_RECEIVED", amount, clock.isoformat(), None))
+
+            # Open round: everyone but the last member has paid in
+            for name in names[:-1]:
+                if len(ledger) >= transactions:
+                    break
+                clock += timedelta(seconds=rng.randint(1, 600))
+                ledger.append((group_key, ids[name], "CONTRIBUTION", rng.choice(CONTRIBUTION_AMOUNTS),
+                               clock.isoformat(), None))
+
+            c.executemany("""INSERT INTO transactions (group_key, member_id, action, amount, timestamp, round_id)
+                             VALUES (?,?,?,?,?,?)""", ledger)
+
+            # Derived state, rebuilt set-wise from the ledger just written
+            c.execute("""
+                UPDATE members SET
+                    total_contributions = COALESCE((
+                        SELECT SUM(amount) FROM transactions t
+                        WHERE t.member_id=members.member_id
+                          AND t.action IN ('CONTRIBUTION', 'PAYMENT_SENT')), 0),
+                    total_received = COALESCE((
+                        SELECT SUM(amount) FROM transactions t
+                        WHERE t.member_id=members.member_id
+                          AND t.action IN ('ROUND_RECEIVED', 'PAYMENT_RECEIVED')), 0)
+                WHERE group_id=?
+            """, (group_id,))
+            c.execute("""
+                INSERT INTO current_round (group_id, member_name, contributed)
+                SELECT m.group_id, m.member_name, SUM(t.amount)
+                FROM transactions t JOIN members m ON m.member_id=t.member_id
+                WHERE t.group_key=? AND t.action='CONTRIBUTION' AND t.round_id IS NULL
+                GROUP BY t.member_id
+            """, (group_key,))
+
+        # Rows were written behind the app's back
+        vicoba.bump_group_version(group_id)
+        vicoba.member_cache.invalidate_group(group_id)
+        vicoba.member_search_cache.invalidate_group(group_id)
+        vicoba.report_cache.invalidate_group(group_id)
+        totals["groups"] += 1
+        totals["members"] += members
+        totals["transactions"] += len(ledger)
+
+    with vicoba.connection_manager.connection() as conn:
+        conn.execute("ANALYZE")
+    return totals
+
+# ==================== BENCHMARK HARNESS ====================
+@contextlib.contextmanager
+def scripted_input(answers: List[str]):
+    # Feeds the interactive screens and swallows their output
+    remaining = iter(answers)
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(remaining)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = original_input
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def measure(name: str, operation: Callable[[int], Any], iterations: int,
+            setup: Optional[Callable[[int], Any]] = None) -> Dict[str, Any]:
+    samples = []
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        started = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - started)
+
+    total = sum(samples)
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / total, 2) if total else None,
+        "mean_ms": round(total / iterations * 1000, 3),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3)
+    }
+    print(f"  {name:<28} {result['ops_per_sec']:>10} ops/s  "
+          f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms")
+    return result
+
+# ==================== BENCHMARKS ====================
+def run_benchmarks(groups: int, members: int, iterations: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    device = "FEATURE_PHONE"
+
+    def pick_group() -> tuple:
+        g = rng.randrange(groups)
+        return g, bench_group_id(g)
+
+    def bench_contribute(i: int) -> None:
+        g, group_id = pick_group()
+        name = bench_member_name(g, rng.randrange(members))
+        with scripted_input([name, str(rng.choice(CONTRIBUTION_AMOUNTS)), "Y"]):
+            vicoba.contribute(group_id, device)
+
+    def bench_make_payment(i: int) -> None:
+        g, group_id = pick_group()
+        payer, payee = rng.sample(range(members), 2)
+        with scripted_input([bench_member_name(g, payer), bench_member_name(g, payee),
+                             str(rng.choice(CONTRIBUTION_AMOUNTS)), "Y"]):
+            vicoba.make_payment(group_id, device)
+
+    def bench_round_tracker(i: int) -> None:
+        _, group_id = pick_group()
+        with scripted_input([]):
+            vicoba.view_round_tracker(group_id, device)
+
+    def bench_next_recipient(i: int) -> None:
+        vicoba.get_next_recipient(pick_group()[1])
+
+    def bench_get_member(i: int) -> None:
+        g, group_id = pick_group()
+        vicoba.get_member(bench_member_name(g, rng.randrange(members)), group_id)
+
+    def bench_get_all_members(i: int) -> None:
+        vicoba.get_all_members(pick_group()[1])
+
+    finalize_target = {}
+
+    def fill_round(i: int) -> None:
+        # Untimed: make sure every member of the target group has paid in
+        g, group_id = pick_group()
+        finalize_target["group_id"] = group_id
+        with vicoba.connection_manager.connection() as conn:
+            missing = [row["member_name"] for row in conn.execute("""
+                SELECT m.member_name FROM members m
+                LEFT JOIN current_round cr ON cr.group_id=m.group_id AND cr.member_name=m.member_name
+                WHERE m.group_id=? AND cr.member_name IS NULL
+            """, (group_id,))]
+        if missing:
+            vicoba.post_ledger(group_id, [
+                {"member_name": name, "action": "CONTRIBUTION", "amount": 1000} for name in missing
+            ])
+
+    def bench_finalize(i: int) -> None:
+        vicoba.auto_finalize_round(finalize_target["group_id"])
+
+    export_dir = tempfile.mkdtemp(prefix="vicoba_bench_")
+
+    def bench_export(i: int) -> None:
+        _, group_id = pick_group()
+        cwd = os.getcwd()
+        os.chdir(export_dir)
+        try:
+            vicoba.export_transactions_to_csv(group_id)
+        finally:
+            for filename in os.listdir(export_dir):
+                os.remove(os.path.join(export_dir, filename))
+            os.chdir(cwd)
+
+    print(f"\n📊 Benchmarks ({iterations} iterations, {groups} groups x {members} members)")
+    results = [
+        measure("contribute", bench_contribute, iterations),
+        measure("make_payment", bench_make_payment, iterations),
+        measure("view_round_tracker", bench_round_tracker, iterations),
+        measure("get_next_recipient", bench_next_recipient, iterations),
+        measure("get_member", bench_get_member, iterations),
+        measure("get_all_members", bench_get_all_members, iterations),
+        measure("auto_finalize_round", bench_finalize, max(1, iterations // 10), setup=fill_round),
+        measure("export_transactions_to_csv", bench_export, max(1, iterations // 20)),
+    ]
+    os.rmdir(export_dir)
+    return results
+
+def run_write_benchmarks(groups: int, members: int, writers: int, iterations: int,
+                         seed: int = 42) -> List[Dict[str, Any]]:
+    # Many sessions posting at once, with and without group commit. Both
+    # sides run with synchronous=FULL so they pay for the same durability.
+    # Contributions go through post_ledger, so balances and the current
+    # round stay consistent with the journal for the benchmarks that follow.
+    def hammer(name: str) -> Dict[str, Any]:
+        def writer(w: int) -> None:
+            rng = random.Random(seed + w)
+            for _ in range(iterations):
+                g = rng.randrange(groups)
+                vicoba.post_ledger(bench_group_id(g), [{
+                    "member_name": bench_member_name(g, rng.randrange(members)),
+                    "action": "CONTRIBUTION",
+                    "amount": rng.choice(CONTRIBUTION_AMOUNTS),
+                }])
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        result = {"name": name, "rows": writers * iterations,
+                  "rows_per_sec": round(writers * iterations / elapsed, 2)}
+        print(f"  {name:<28} {result['rows_per_sec']:>10} rows/s")
+        return result
+
+    print(f"\n✍️  Concurrent writes ({writers} writers x {iterations} post_ledger calls)")
+    pragmas = vicoba.DB_PRAGMAS
+    vicoba.DB_PRAGMAS = [(k, "FULL" if k == "synchronous" else v) for k, v in pragmas]
+    vicoba.connection_manager.close_all()
+    try:
+        results = [hammer("post_ledger")]
+        vicoba.group_commit.start()
+        try:
+            results.append(hammer("post_ledger group commit"))
+        finally:
+            vicoba.group_commit.stop()
+        results[-1]["group_commit"] = vicoba.group_commit.stats()
+    finally:
+        vicoba.DB_PRAGMAS = pragmas
+        vicoba.connection_manager.close_all()
+    return results
+
+# ==================== API LOAD TEST ====================
+def run_api_load_test(groups: int, members: int, clients: int, iterations: int, workers: int,
+                      seed: int = 42) -> List[Dict[str, Any]]:
+    # Serves the HTTP API on a free local port and drives it with keep-alive
+    # clients, each logging in once and then issuing the API_LOAD_MIX.
+    # The login is created for this run only and removed afterwards, so the
+    # benchmarked database is never left with a known ADMIN PIN
+    created = vicoba.create_user(BENCH_API_PHONE, BENCH_API_PIN, bench_group_id(0), "ADMIN")
+    if created != vicoba.get_message("registration_success"):
+        print(f"\n❌ API load test skipped: {BENCH_API_PHONE}: {created}")
+        return []
+    try:
+        with vicoba.connection_manager.transaction() as conn:
+            for g in range(groups):
+                vicoba.add_user_to_group(conn, BENCH_API_PHONE, bench_group_id(g), "ADMIN")
+
+        server = vicoba.APIServer(("127.0.0.1", 0), workers)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        samples: Dict[str, List[float]] = {kind: [] for kind in API_LOAD_MIX}
+        failures: Dict[str, int] = {kind: 0 for kind in API_LOAD_MIX}
+        not_modified = [0]
+        lock = threading.Lock()
+
+        def client(c: int) -> None:
+            rng = random.Random(seed + c)
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+
+            etags: Dict[str, str] = {}
+
+            def call(method: str, path: str, body: Optional[Dict[str, Any]] = None,
+                     token: Optional[str] = None) -> tuple:
+                # GETs revalidate like a polling dashboard; 304 counts as success
+                headers = {"Content-Type": "application/json"}
+                if token:
+                    headers["Authorization"] = f"Bearer {token}"
+                if method == "GET" and path in etags:
+                    headers["If-None-Match"] = etags[path]
+                conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+                response = conn.getresponse()
+                payload = response.read()
+                if response.getheader("ETag"):
+                    etags[path] = response.getheader("ETag")
+                status = 200 if response.status == 304 else response.status
+                with lock:
+                    not_modified[0] += response.status == 304
+                return status, json.loads(payload) if payload else None
+
+            _, login = call("POST", "/api/login", {"phone": BENCH_API_PHONE, "pin": BENCH_API_PIN})
+            token = login["token"]
+            kinds, weights = list(API_LOAD_MIX), list(API_LOAD_MIX.values())
+            for _ in range(iterations):
+                g = rng.randrange(groups)
+                base = f"/api/groups/{bench_group_id(g)}"
+                kind = rng.choices(kinds, weights)[0]
+                amount = rng.choice(CONTRIBUTION_AMOUNTS)
+                started = time.perf_counter()
+                if kind == "contributions":
+                    status, _ = call("POST", f"{base}/contributions", {
+                        "member": bench_member_name(g, rng.randrange(members)), "amount": amount}, token)
+                elif kind == "payments":
+                    payer, payee = rng.sample(range(members), 2)
+                    status, _ = call("POST", f"{base}/payments", {
+                        "payer": bench_member_name(g, payer), "payee": bench_member_name(g, payee),
+                        "amount": amount}, token)
+                else:
+                    status, _ = call("GET", f"{base}/{kind}", token=token)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples[kind].append(elapsed)
+                    if status != 200:
+                        failures[kind] += 1
+            conn.close()
+
+        print(f"\n🌐 API load ({clients} clients x {iterations} requests, {workers} workers)")
+        threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            elapsed = time.perf_counter() - started
+            server.shutdown()
+            server.server_close()
+
+        results = []
+        for kind, timings in samples.items():
+            if not timings:
+                continue
+            result = {
+                "name": f"api {kind}",
+                "requests": len(timings),
+                "errors": failures[kind],
+                "p50_ms": round(percentile(timings, 50) * 1000, 3),
+                "p99_ms": round(percentile(timings, 99) * 1000, 3)
+            }
+            print(f"  {result['name']:<28} {result['requests']:>10} reqs   "
+                  f"p50 {result['p50_ms']:>8} ms  p99 {result['p99_ms']:>8} ms  errors {result['errors']}")
+            results.append(result)
+        total = sum(len(t) for t in samples.values())
+        results.append({"name": "api total", "requests": total, "requests_per_sec": round(total / elapsed, 2),
+                        "not_modified": not_modified[0]})
+        print(f"  {'api total':<28} {results[-1]['requests_per_sec']:>10} reqs/s  "
+              f"({not_modified[0]} answered 304 Not Modified)")
+        return results
+    finally:
+        with vicoba.connection_manager.transaction() as conn:
+            conn.execute("DELETE FROM user_groups WHERE phone=?", (BENCH_API_PHONE,))
+            conn.execute("DELETE FROM users WHERE phone=?", (BENCH_API_PHONE,))
+
+# ==================== MAIN FUNCTION ====================
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate VICOBA data and benchmark the hot paths")
+    parser.add_argument("--db", default=vicoba.DB_FILE, help="SQLite database to fill and benchmark")
+    parser.add_argument("--groups", type=int, default=10, help="number of groups (N)")
+    parser.add_argument("--members", type=int, default=50, help="members per group (M)")
+    parser.add_argument("--transactions", type=int, default=5000, help="ledger rows per group (K)")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per benchmark")
+    parser.add_argument("--writers", type=int, default=16, help="concurrent writer threads (0 to skip)")
+    parser.add_argument("--api-clients", type=int, default=0,
+                        help="concurrent HTTP API clients for the load test (0 to skip)")
+    parser.add_argument("--api-workers", type=int, default=vicoba.API_WORKERS,
+                        help="API server worker threads; keep-alive clients each hold one")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the existing BENCH groups")
+    parser.add_argument("--json", dest="json_path", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.members < 2:
+        parser.error("--members must be at least 2")
+
+    vicoba.DB_FILE = args.db
+    with scripted_input([]):
+        vicoba.init_db()
+
+    dataset = None
+    if not args.skip_generate:
+        started = time.perf_counter()
+        dataset = generate_dataset(args.groups, args.members, args.transactions, args.seed)
+        print(f"✅ Generated {dataset['transactions']:,} transactions across {dataset['groups']} groups "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    results = run_benchmarks(args.groups, args.members, args.iterations, args.seed)
+    if args.writers:
+        results += run_write_benchmarks(args.groups, args.members, args.writers, args.iterations, args.seed)
+    if args.api_clients:
+        results += run_api_load_test(args.groups, args.members, args.api_clients, args.iterations,
+                                     args.api_workers, args.seed)
+    cache = vicoba.member_cache.stats()
+    print(f"\n🗃️  Member cache: {cache['hits']} hits, {cache['misses']} misses, "
+          f"{cache['evictions']} evictions, {cache['entries']} entries")
+    reports = vicoba.report_cache.stats()
+    print(f"🗃️  Report cache: {reports['hits']} hits, {reports['misses']} misses, "
+          f"{reports['evictions']} evictions, {reports['entries']} entries")
+
+    report = {
+        "app_version": vicoba.APP_VERSION,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "run_at": datetime.now().isoformat(),
+        "params": {k: v for k, v in vars(args).items() if k != "json_path"},
+        "dataset": dataset,
+        "results": results,
+        "member_cache": vicoba.member_cache.stats(),
+        "report_cache": vicoba.report_cache.stats()
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.json_path}")
+
+    vicoba.connection_manager.close_all()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,39 +4,45 @@ Combines ALL 14 files into one comprehensive application
 """
 
 # ==================== IMPORTS ====================
+import argparse
+import asyncio
 import sqlite3
 import hashlib
 import os
 import sys
 import re
 import json
+import secrets
 import csv
+import gzip
 import smtplib
-from datetime import datetime
-from typing import List, Dict, Optional, Any, Union
-
-"""
-VICOBA UNIFIED PLATFORM - COMPLETE SINGLE FILE
-Combines ALL 14 files into one comprehensive application
-"""
-
-# ==================== IMPORTS ====================
-import sqlite3
-import hashlib
-import os
-import sys
-import re
-import json
-import csv
-import smtplib
-from datetime import datetime
-from typing import List, Dict, Optional, Any, Union
+import threading
+import time
+import queue
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Any, Union, Callable
+from urllib.parse import urlsplit, parse_qs
 
 # ==================== CONFIGURATION ====================
 DB_FILE = "vicoba_unified.db"
 APP_NAME = "VICOBA DIGITAL 2.0"
 APP_VERSION = "2.0.0"
 
+# Applied once per pooled connection, not per query
+DB_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # negative = KiB, ~16 MB page cache
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+]
+
 MESSAGES = {
     "en": {
         "invalid_pin": "PIN must be 4 digits",
@@ -52,7 +58,8 @@ MESSAGES = {
         "member_not_found": "Member not found",
         "round_completed": "🎉 Round completed! {recipient} received {amount}",
         "payment_success": "Payment of {amount} from {payer} to {payee} recorded!",
-        "contribution_success": "Contribution of {amount} recorded for {name}"
+        "contribution_success": "Contribution of {amount} recorded for {name}",
+        "group_admin_only": "Only admins of this group can do that"
     },
     "sw": {
         "invalid_pin": "PIN lazima iwe tarakimu 4",
@@ -65,7 +72,8 @@ MESSAGES = {
         "registration_success": "Usajili umefanikiwa! Tumia PIN kuingia.",
         "phone_exists": "Namba ya simu tayari imesajiliwa.",
         "member_exists": "Mwanachama tayari yupo.",
-        "member_not_failed": "Mwanachama hajapatikana"
+        "member_not_failed": "Mwanachama hajapatikana",
+        "group_admin_only": "Wasimamizi wa kikundi hiki pekee wanaweza kufanya hivyo"
     }
 }
 
@@ -75,6 +83,7 @@ VALIDATION_PATTERNS = {
     "group_id": r'^[\w]{3,20}$',
     "pin": r'^\d{4}$'
 }
+VALIDATION_REGEXES = {field: re.compile(pattern) for field, pattern in VALIDATION_PATTERNS.items()}
 
 # ==================== UTILITY FUNCTIONS ====================
 def safe_int(value: Optional[str]) -> int:
@@ -93,16 +102,16 @@ def format_currency(amount: int) -> str:
     return f"Tsh {amount:,}"
 
 def validate_phone(phone: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['phone'], phone))
+    return bool(VALIDATION_REGEXES['phone'].match(phone))
 
 def validate_name(name: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['name'], name))
+    return bool(VALIDATION_REGEXES['name'].match(name))
 
 def validate_pin(pin: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['pin'], pin))
+    return bool(VALIDATION_REGEXES['pin'].match(pin))
 
 def validate_group_id(group_id: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['group_id'], group_id))
+    return bool(VALIDATION_REGEXES['group_id'].match(group_id))
 
 def confirm_action(message: str) -> bool:
     response = input(f"{message} (Y/N): ").strip().upper()
@@ -123,133 +132,624 @@ def detect_device_type() -> str:
 def detect_phone_number() -> str:
     return "255123456789"
 
-def show_menu(menu_type: str, device_type: str, role: str = 'MEMBER') -> None:
-    menu_options = {
-        "AUTH": ["1. Register", "2. Login", "0. Exit"],
+MENU_OPTIONS = {
+    "AUTH": ["1. Register", "2. Login", "0. Exit"],
+    "MAIN_MEMBER": [
+        "1. Make Contribution", 
+        "2. Make Payment", 
+        "3. View Round Tracker", 
+        "4. View Member Summary", 
+        "5. View Transactions", 
+        "6. Export Report",
+        "7. Logout"
+    ],
+    "MAIN_ADMIN": [
+        "1. Add Member", 
+        "2. Make Contribution", 
+        "3. Make Payment", 
+        "4. View Round Tracker", 
+        "5. View Member Summary", 
+        "6. View Transactions", 
+        "7. Manage Groups", 
+        "8. Export Report",
+        "9. Logout"
+    ],
+    "MANAGE_GROUPS": [
+        "1. Create New Group",
+        "2. Switch Group",
+        "3. View All Groups",
+        "4. View Payout Order",
+        "0. Back"
+    ]
+}
+
+MENU_TITLES = {
+    "en": {"AUTH": APP_NAME, "MAIN": "MAIN MENU", "MANAGE_GROUPS": "MANAGE GROUPS"},
+    "sw": {"AUTH": APP_NAME, "MAIN": "MENYU KUU", "MANAGE_GROUPS": "SIMAMIA VIKUNDI"}
+}
+
+MENU_TRANSLATIONS = {
+    "sw": {
+        "AUTH": ["1. Jisajili", "2. Ingia", "0. Toka"],
         "MAIN_MEMBER": [
-            "1. Make Contribution", 
-            "2. Make Payment", 
-            "3. View Round Tracker", 
-            "4. View Member Summary", 
-            "5. View Transactions", 
-            "6. Export Report",
-            "7. Logout"
+            "1. Toa Mchango",
+            "2. Fanya Malipo",
+            "3. Angalia Mzunguko",
+            "4. Muhtasari wa Wanachama",
+            "5. Angalia Miamala",
+            "6. Pakua Ripoti",
+            "7. Ondoka"
         ],
         "MAIN_ADMIN": [
-            "1. Add Member", 
-            "2. Make Contribution", 
-            "3. Make Payment", 
-            "4. View Round Tracker", 
-            "5. View Member Summary", 
-            "6. View Transactions", 
-            "7. Manage Groups", 
-            "8. Export Report",
-            "9. Logout"
+            "1. Ongeza Mwanachama",
+            "2. Toa Mchango",
+            "3. Fanya Malipo",
+            "4. Angalia Mzunguko",
+            "5. Muhtasari wa Wanachama",
+            "6. Angalia Miamala",
+            "7. Simamia Vikundi",
+            "8. Pakua Ripoti",
+            "9. Ondoka"
         ]
     }
+}
 
-    if menu_type == "AUTH":
-        menu_items = menu_options["AUTH"]
-        title = "VICOBA DIGITAL 2.0"
-    elif menu_type == "MAIN":
-        menu_items = menu_options["MAIN_ADMIN"] if role == 'ADMIN' else menu_options["MAIN_MEMBER"]
-        title = "MAIN MENU"
-    else:
-        menu_items = []
-        title = "MENU"
+USSD_SCREEN_LIMIT = 182  # characters a USSD screen can carry
+USSD_NOTICE_RESERVE = 40  # kept free on cached menu screens for a one-line notice
+MENU_MORE = {"en": "98. More", "sw": "98. Zaidi"}
 
-    if device_type == "FEATURE_PHONE":
-        print(f"\n{title}")
-        for item in menu_items:
-            print(item)
-    else:
-        print("\n" + "="*40)
-        print(f"    {title}")
-        print("="*40)
-        for item in menu_items:
-            print(item)
-        print("="*40)
+# ==================== MENU RENDERING ====================
+def paginate_screen(title: str, lines: List[str], limit: int = USSD_SCREEN_LIMIT,
+                    more_label: str = MENU_MORE["en"], footer: Optional[List[str]] = None) -> List[str]:
+    # Greedily packs lines into screens of at most `limit` characters; every
+    # page but the last ends with the "More" option, every page with footer.
+    footer = footer or []
+    room = limit - len("\n".join([more_label] + footer)) - 1
+    pages = []
+    current = [title] if title else []
+    body_lines = 0
+    for line in lines:
+        if len(line) > room:
+            line = line[:room - 1] + "…"
+        if body_lines and len("\n".join(current + [line])) > room:
+            pages.append("\n".join(current + [more_label] + footer))
+            current, body_lines = [], 0
+        current.append(line)
+        body_lines += 1
+    pages.append("\n".join(current + footer))
+    return pages
+
+def menu_key(menu_type: str, role: str) -> str:
+    if menu_type == "MAIN":
+        return "MAIN_ADMIN" if role == 'ADMIN' else "MAIN_MEMBER"
+    return menu_type
+
+@lru_cache(maxsize=None)
+def compile_menu(menu_type: str, role: str, device_type: str, language: str = "en",
+                 limit: int = USSD_SCREEN_LIMIT) -> tuple:
+    # Built once per (menu, role, device, language); hops only index the result
+    key = menu_key(menu_type, role)
+    items = MENU_TRANSLATIONS.get(language, {}).get(key) or MENU_OPTIONS.get(key, [])
+    title = MENU_TITLES.get(language, {}).get(menu_type) or MENU_TITLES["en"].get(menu_type, "MENU")
+    
+    if device_type != "FEATURE_PHONE":
+        return ("\n".join(["="*40, f"    {title}", "="*40] + items + ["="*40]),)
+    if not limit:
+        return ("\n".join([title] + items),)
+    return tuple(paginate_screen(title, items, limit - USSD_NOTICE_RESERVE,
+                                 MENU_MORE.get(language, MENU_MORE["en"])))
+
+def render_menu(menu_type: str, device_type: str, role: str = 'MEMBER', language: str = "en",
+                page: int = 0, paginated: bool = True) -> str:
+    pages = compile_menu(menu_type, role, device_type, language, USSD_SCREEN_LIMIT if paginated else 0)
+    return pages[min(max(page, 0), len(pages) - 1)]
+
+def menu_page_count(menu_type: str, device_type: str, role: str = 'MEMBER', language: str = "en") -> int:
+    return len(compile_menu(menu_type, role, device_type, language, USSD_SCREEN_LIMIT))
+
+def show_menu(menu_type: str, device_type: str, role: str = 'MEMBER') -> None:
+    print("\n" + render_menu(menu_type, device_type, role, paginated=False))
 
 # ==================== DATABASE FUNCTIONS ====================
+# Group commit: concurrent ledger writes share one transaction (and fsync)
+GROUP_COMMIT_ENABLED = False
+# 0 batches whatever queued up while the previous commit ran; a few ms more
+# grows batches when callers do not wait for each other
+GROUP_COMMIT_MAX_DELAY = 0.0  # seconds the writer waits to fill a batch
+GROUP_COMMIT_MAX_BATCH = 256
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
+    conn = sqlite3.connect(DB_FILE, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma, value in DB_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}={value}")
     return conn
 
+class _ThreadSlot:
+    # Lives only in one thread's local storage; dropped when that thread exits
+    pass
+
+class ConnectionManager:
+    """Keeps one long-lived connection per thread (and per process/DB file).
+    
+    A connection is closed when its thread exits, so short-lived worker
+    pools do not leak file descriptors.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _acquire(self) -> sqlite3.Connection:
+        key = (os.getpid(), DB_FILE)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.key == key:
+            return conn
+        if conn is not None and self._local.key[0] == key[0]:
+            self._local.close()
+        conn = get_db_connection()
+        self._local.conn = conn
+        self._local.key = key
+        self._local.after_commit = []
+        self._local.slot = _ThreadSlot()
+        self._local.close = weakref.finalize(self._local.slot, self._release, conn)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def in_transaction(self) -> bool:
+        return self._acquire().in_transaction
+
+    def after_commit(self, callback: Callable[[], Any]) -> None:
+        # Runs once this thread's open transaction commits (now if none is open)
+        conn = self._acquire()
+        if conn.in_transaction:
+            self._local.after_commit.append(callback)
+        else:
+            callback()
+
+    def _end(self, conn: sqlite3.Connection, commit: bool) -> None:
+        callbacks, self._local.after_commit = self._local.after_commit, []
+        if commit:
+            conn.commit()
+            for callback in callbacks:
+                callback()
+        else:
+            conn.rollback()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        # Inside an open transaction() the outer block decides commit/rollback
+        owned = not conn.in_transaction
+        try:
+            yield conn
+        except BaseException:
+            if owned and conn.in_transaction:
+                self._end(conn, commit=False)
+            raise
+        else:
+            if owned and conn.in_transaction:
+                self._end(conn, commit=True)
+
+    @contextmanager
+    def transaction(self, immediate: bool = False):
+        conn = self._acquire()
+        # Nested use joins the outer transaction
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            self._end(conn, commit=False)
+            raise
+        else:
+            self._end(conn, commit=True)
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+connection_manager = ConnectionManager()
+
 def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
+    with connection_manager.transaction() as conn:
+        c = conn.cursor()
+    
+        # Users table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            phone TEXT PRIMARY KEY,
+            pin_hash TEXT NOT NULL,
+            salt TEXT NOT NULL,
+            group_ids TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'MEMBER',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
     
-    # Users table
+        # Members table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS members (
+            member_name TEXT,
+            phone TEXT,
+            total_contributions INTEGER NOT NULL DEFAULT 0,
+            total_received INTEGER NOT NULL DEFAULT 0,
+            group_id TEXT NOT NULL,
+            PRIMARY KEY (member_name, group_id)
+        )
+        """)
+    
+        # Rounds table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS rounds (
+            round_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_receiving TEXT,
+            total_amount INTEGER,
+            round_date TEXT,
+            group_id TEXT NOT NULL
+        )
+        """)
+    
+        # Transactions table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_name TEXT,
+            action TEXT,
+            amount INTEGER,
+            timestamp TEXT,
+            round_id INTEGER,
+            group_id TEXT NOT NULL
+        )
+        """)
+    
+        # Groups table
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS groups (
+            group_id TEXT PRIMARY KEY,
+            group_name TEXT NOT NULL,
+            created_by TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+    
+    run_migrations()
+    
+    # Create default admin user
+    with connection_manager.transaction() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM users WHERE phone=?", ("255123456789",))
+        if not c.fetchone():
+            salt = generate_salt()
+            pin_hash = hash_pin("1234", salt)
+            c.execute(
+                "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
+                ("255123456789", pin_hash, salt, "[]", 'ADMIN'))
+            add_user_to_group(conn, "255123456789", "TEST_GROUP", 'ADMIN')
+    
+    print("✅ Database initialized successfully!")
+
+# ==================== SCHEMA MIGRATIONS ====================
+def add_column_if_missing(c: sqlite3.Cursor, table: str, column: str, declaration: str) -> None:
+    columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})").fetchall()]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def migrate_member_numbers(c: sqlite3.Cursor) -> None:
+    add_column_if_missing(c, "members", "member_no", "INTEGER")
     c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        phone TEXT PRIMARY KEY,
-        pin_hash TEXT NOT NULL,
-        salt TEXT NOT NULL,
-        group_ids TEXT NOT NULL,
-        role TEXT NOT NULL DEFAULT 'MEMBER',
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
+        UPDATE members SET member_no = numbered.n
+        FROM (
+            SELECT rowid AS rid, ROW_NUMBER() OVER (PARTITION BY group_id ORDER BY rowid) AS n
+            FROM members
+        ) AS numbered
+        WHERE numbered.rid = members.rowid AND members.member_no IS NULL
     """)
-    
-    # Members table
+    c.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_members_group_member_no
+                 ON members (group_id, member_no)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_members_group_name_nocase
+                 ON members (group_id, member_name COLLATE NOCASE)""")
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_members_group_phone
+                 ON members (group_id, phone)""")
+
+def migrate_surrogate_keys(c: sqlite3.Cursor) -> None:
+    # Rebuilds members, rounds and transactions (SQLite cannot change a
+    # primary key in place) so the ledger carries integer keys instead of
+    # repeating the member name and group ID on every row and index entry.
     c.execute("""
-    CREATE TABLE IF NOT EXISTS members (
-        member_name TEXT,
-        phone TEXT,
-        total_contributions INTEGER NOT NULL DEFAULT 0,
-        total_received INTEGER NOT NULL DEFAULT 0,
-        group_id TEXT NOT NULL,
-        PRIMARY KEY (member_name, group_id)
-    )
+        CREATE TABLE IF NOT EXISTS group_keys (
+            group_key INTEGER PRIMARY KEY,
+            group_id TEXT NOT NULL UNIQUE
+        )
+    """)
+    c.execute("""
+        INSERT OR IGNORE INTO group_keys (group_id)
+        SELECT group_id FROM groups
+        UNION SELECT group_id FROM members
+        UNION SELECT group_id FROM transactions
+        UNION SELECT group_id FROM rounds
+        UNION SELECT group_id FROM user_groups
     """)
     
-    # Rounds table
     c.execute("""
-    CREATE TABLE IF NOT EXISTS rounds (
-        round_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        member_receiving TEXT,
-        total_amount INTEGER,
-        round_date TEXT,
-        group_id TEXT NOT NULL
-    )
+        CREATE TABLE members_new (
+            member_id INTEGER PRIMARY KEY,
+            member_name TEXT NOT NULL,
+            phone TEXT,
+            total_contributions INTEGER NOT NULL DEFAULT 0,
+            total_received INTEGER NOT NULL DEFAULT 0,
+            group_id TEXT NOT NULL,
+            member_no INTEGER,
+            UNIQUE (group_id, member_name)
+        )
+    """)
+    c.execute("""
+        INSERT INTO members_new (member_id, member_name, phone, total_contributions, total_received, group_id, member_no)
+        SELECT rowid, member_name, phone, total_contributions, total_received, group_id, member_no FROM members
+    """)
+    # Members are never removed, so ledger names missing from the roster can
+    # only come from hand-edited data; keep them rather than drop their rows.
+    c.execute("""
+        INSERT INTO members_new (member_name, group_id, member_no)
+        SELECT o.member_name, o.group_id,
+               COALESCE((SELECT MAX(member_no) FROM members WHERE group_id=o.group_id), 0)
+               + ROW_NUMBER() OVER (PARTITION BY o.group_id ORDER BY o.member_name)
+        FROM (
+            SELECT DISTINCT t.group_id, t.member_name FROM transactions t
+            WHERE t.member_name IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM members m WHERE m.group_id=t.group_id AND m.member_name=t.member_name)
+            UNION
+            SELECT DISTINCT r.group_id, r.member_receiving FROM rounds r
+            WHERE r.member_receiving IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM members m WHERE m.group_id=r.group_id AND m.member_name=r.member_receiving)
+        ) AS o
     """)
     
-    # Transactions table
     c.execute("""
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        member_name TEXT,
-        action TEXT,
-        amount INTEGER,
-        timestamp TEXT,
-        round_id INTEGER,
-        group_id TEXT NOT NULL
-    )
+        CREATE TABLE rounds_new (
+            round_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_key INTEGER NOT NULL,
+            recipient_id INTEGER,
+            total_amount INTEGER,
+            round_date TEXT
+        )
+    """)
+    c.execute("""
+        INSERT INTO rounds_new (round_id, group_key, recipient_id, total_amount, round_date)
+        SELECT r.round_id, g.group_key, m.member_id, r.total_amount, r.round_date
+        FROM rounds r
+        JOIN group_keys g ON g.group_id=r.group_id
+        LEFT JOIN members_new m ON m.group_id=r.group_id AND m.member_name=r.member_receiving
     """)
     
-    # Groups table
     c.execute("""
-    CREATE TABLE IF NOT EXISTS groups (
-        group_id TEXT PRIMARY KEY,
-        group_name TEXT NOT NULL,
-        created_by TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
+        CREATE TABLE transactions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_key INTEGER NOT NULL,
+            member_id INTEGER NOT NULL,
+            action TEXT,
+            amount INTEGER,
+            timestamp TEXT,
+            round_id INTEGER
+        )
+    """)
+    c.execute("""
+        INSERT INTO transactions_new (id, group_key, member_id, action, amount, timestamp, round_id)
+        SELECT t.id, g.group_key, m.member_id, t.action, t.amount, t.timestamp, t.round_id
+        FROM transactions t
+        JOIN group_keys g ON g.group_id=t.group_id
+        JOIN members_new m ON m.group_id=t.group_id AND m.member_name=t.member_name
     """)
     
-    # Create default admin user
-    c.execute("SELECT * FROM users WHERE phone=?", ("255123456789",))
-    if not c.fetchone():
-        salt = generate_salt()
-        pin_hash = hash_pin("1234", salt)
-        c.execute(
-            "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
-            ("255123456789", pin_hash, salt, json.dumps(["TEST_GROUP"]), 'ADMIN'))
-    
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully!")
+    for table in ("members", "rounds", "transactions"):
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    
+    # (group_id, member_name) lookups use the UNIQUE constraint's index;
+    # member-scoped ledger indexes no longer need the group column at all.
+    for statement in (
+        "CREATE UNIQUE INDEX idx_members_group_member_no ON members (group_id, member_no)",
+        "CREATE INDEX idx_members_group_name_nocase ON members (group_id, member_name COLLATE NOCASE)",
+        "CREATE INDEX idx_members_group_phone ON members (group_id, phone)",
+        "CREATE INDEX idx_rounds_group_round ON rounds (group_key, round_id)",
+        "CREATE INDEX idx_transactions_group_action_round ON transactions (group_key, action, round_id)",
+        "CREATE INDEX idx_transactions_group_timestamp ON transactions (group_key, timestamp)",
+        "CREATE INDEX idx_transactions_group_action_timestamp ON transactions (group_key, action, timestamp)",
+        "CREATE INDEX idx_transactions_member_timestamp ON transactions (member_id, timestamp)",
+        "CREATE INDEX idx_transactions_member_action_timestamp ON transactions (member_id, action, timestamp)",
+    ):
+        c.execute(statement)
+
+# Append-only: (version, description, statements or callable(cursor)).
+# Steps need not be idempotent (8 rebuilds tables, 9, 12 and 13 add columns):
+# each migration commits in one transaction with its schema_version row, so
+# a failure rolls it back whole and a recorded migration never runs again.
+MIGRATIONS: List[Any] = [
+    (1, "hot-path indexes on transactions, members and rounds", [
+        """CREATE INDEX IF NOT EXISTS idx_transactions_group_action_round
+           ON transactions (group_id, action, round_id, member_name, amount)""",
+        """CREATE INDEX IF NOT EXISTS idx_transactions_group_timestamp
+           ON transactions (group_id, timestamp)""",
+        """CREATE INDEX IF NOT EXISTS idx_transactions_group_member_timestamp
+           ON transactions (group_id, member_name, timestamp)""",
+        """CREATE INDEX IF NOT EXISTS idx_members_group_name
+           ON members (group_id, member_name)""",
+        """CREATE INDEX IF NOT EXISTS idx_rounds_group_round
+           ON rounds (group_id, round_id)""",
+    ]),
+    (2, "materialized current-round contributions", [
+        """CREATE TABLE IF NOT EXISTS current_round (
+            group_id TEXT NOT NULL,
+            member_name TEXT NOT NULL,
+            contributed INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (group_id, member_name)
+        ) WITHOUT ROWID""",
+        "DELETE FROM current_round",
+        """INSERT INTO current_round (group_id, member_name, contributed)
+           SELECT group_id, member_name, SUM(amount)
+           FROM transactions
+           WHERE action='CONTRIBUTION' AND round_id IS NULL
+           GROUP BY group_id, member_name""",
+    ]),
+    (3, "persistent rotation schedule", [
+        """CREATE TABLE IF NOT EXISTS rotation_schedule (
+            group_id TEXT NOT NULL,
+            cycle INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            member_name TEXT NOT NULL,
+            round_id INTEGER,
+            PRIMARY KEY (group_id, cycle, position)
+        )""",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_rotation_schedule_member
+           ON rotation_schedule (group_id, cycle, member_name)""",
+        """CREATE TABLE IF NOT EXISTS rotation_state (
+            group_id TEXT PRIMARY KEY,
+            cycle INTEGER NOT NULL,
+            next_position INTEGER NOT NULL
+        )""",
+    ]),
+    # The id tie-breaker is the rowid, which every index already ends with
+    (4, "keyset pagination indexes on transactions", [
+        """CREATE INDEX IF NOT EXISTS idx_transactions_group_action_timestamp
+           ON transactions (group_id, action, timestamp)""",
+        """CREATE INDEX IF NOT EXISTS idx_transactions_group_member_action_timestamp
+           ON transactions (group_id, member_name, action, timestamp)""",
+    ]),
+    (5, "persisted USSD sessions", [
+        """CREATE TABLE IF NOT EXISTS ussd_sessions (
+            session_id TEXT PRIMARY KEY,
+            phone TEXT NOT NULL,
+            state TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+        """CREATE INDEX IF NOT EXISTS idx_ussd_sessions_expires
+           ON ussd_sessions (expires_at)""",
+    ]),
+    (6, "member numbers and member search indexes", migrate_member_numbers),
+    # users.group_ids stays behind as a legacy column (SQLite cannot drop a
+    # NOT NULL column in place); user_groups is the source of truth from here.
+    # The rowid keeps each user's groups in their original JSON order.
+    (7, "normalized user-group membership", [
+        """CREATE TABLE IF NOT EXISTS user_groups (
+            phone TEXT NOT NULL,
+            group_id TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'MEMBER',
+            joined_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (phone, group_id)
+        )""",
+        """CREATE INDEX IF NOT EXISTS idx_user_groups_group_role
+           ON user_groups (group_id, role, phone)""",
+        """INSERT OR IGNORE INTO user_groups (phone, group_id, role, joined_at)
+           SELECT u.phone, g.value, u.role, u.created_at
+           FROM users u, json_each(u.group_ids) g
+           WHERE json_valid(u.group_ids)
+           ORDER BY u.phone, g.key""",
+    ]),
+    (8, "integer surrogate keys for members, groups and the ledger", migrate_surrogate_keys),
+    # Statement/receipt references make bulk imports safe to re-run
+    (9, "external references on ledger rows", [
+        "ALTER TABLE transactions ADD COLUMN reference TEXT",
+        """CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_group_reference
+           ON transactions (group_key, reference) WHERE reference IS NOT NULL""",
+    ]),
+    # reminded_for holds the meeting a reminder went out for, so restarts do not resend
+    (10, "per-group meeting schedules", [
+        """CREATE TABLE IF NOT EXISTS group_schedules (
+            group_id TEXT PRIMARY KEY,
+            frequency TEXT NOT NULL CHECK (frequency IN ('WEEKLY', 'MONTHLY')),
+            meeting_day INTEGER NOT NULL,
+            meeting_hour INTEGER NOT NULL,
+            next_meeting_at TEXT NOT NULL,
+            reminded_for TEXT,
+            last_meeting_at TEXT,
+            last_export_id INTEGER,
+            last_result TEXT
+        )""",
+        """CREATE INDEX IF NOT EXISTS idx_group_schedules_next_meeting
+           ON group_schedules (next_meeting_at)""",
+    ]),
+    (11, "notification outbox", [
+        """CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY,
+            group_id TEXT NOT NULL,
+            channel TEXT NOT NULL,
+            recipient TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            created_at TEXT NOT NULL,
+            sent_at TEXT,
+            last_error TEXT
+        )""",
+        """CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+           ON notification_outbox (next_attempt_at) WHERE status = 'PENDING'""",
+    ]),
+    # Bumped by every ledger/member write; caches in all processes compare against it
+    (12, "per-group change versions", [
+        "ALTER TABLE group_keys ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    # Claimed rows carry a lease; only expired ones are handed to another dispatcher
+    (13, "notification outbox leases", [
+        "ALTER TABLE notification_outbox ADD COLUMN lease_expires_at REAL",
+        """CREATE INDEX IF NOT EXISTS idx_notification_outbox_leased
+           ON notification_outbox (lease_expires_at) WHERE status = 'SENDING'""",
+    ]),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) AS version FROM schema_version").fetchone()
+    return row["version"] or 0
+
+def run_migrations() -> int:
+    with connection_manager.connection() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT NOT NULL
+        )
+        """)
+    
+    applied = 0
+    for version, description, steps in MIGRATIONS:
+        # BEGIN IMMEDIATE serialises concurrent starters; re-check inside the lock
+        with connection_manager.transaction(immediate=True) as conn:
+            if get_schema_version(conn) >= version:
+                continue
+            c = conn.cursor()
+            if callable(steps):
+                steps(c)
+            else:
+                for statement in steps:
+                    c.execute(statement)
+            c.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?,?,?)",
+                (version, description, datetime.now().isoformat())
+            )
+            applied += 1
+    
+    if applied:
+        with connection_manager.connection() as conn:
+            conn.execute("PRAGMA optimize")
+    return applied
 
 # ==================== AUTHENTICATION FUNCTIONS ====================
 def register_user(device_type: str) -> str:
@@ -283,26 +783,35 @@ def register_user(device_type: str) -> str:
     if not confirm_action("✅ Confirm registration?"):
         return "Registration cancelled"
     
-    conn = get_db_connection()
-    c = conn.cursor()
+    return create_user(phone, pin, group_id, role)
+
+def create_user(phone: str, pin: str, group_id: str, role: str) -> str:
+    if not validate_phone(phone):
+        return get_message("invalid_phone")
+    if not validate_pin(pin):
+        return get_message("invalid_pin")
+    if not validate_group_id(group_id):
+        return get_message("invalid_group")
+    if role not in ['ADMIN', 'MEMBER']:
+        return "Invalid role"
     
     try:
-        c.execute("SELECT * FROM users WHERE phone=?", (phone,))
-        if c.fetchone():
-            return get_message("phone_exists")
-        
-        salt = generate_salt()
-        pin_hash = hash_pin(pin, salt)
-        c.execute(
-            "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
-            (phone, pin_hash, salt, json.dumps([group_id]), role)
-        )
-        conn.commit()
+        with connection_manager.connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT * FROM users WHERE phone=?", (phone,))
+            if c.fetchone():
+                return get_message("phone_exists")
+            
+            salt = generate_salt()
+            pin_hash = hash_pin(pin, salt)
+            c.execute(
+                "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
+                (phone, pin_hash, salt, "[]", role)
+            )
+            add_user_to_group(conn, phone, group_id, role)
         return get_message("registration_success")
     except sqlite3.IntegrityError:
         return get_message("phone_exists")
-    finally:
-        conn.close()
 
 def login_user(device_type: str) -> Optional[Dict[str, Any]]:
     if device_type == "FEATURE_PHONE":
@@ -321,72 +830,266 @@ def login_user(device_type: str) -> Optional[Dict[str, Any]]:
     
     print(f"📱 Detected phone: {phone}")
     pin = input("🔐 Enter PIN: ").strip()
-    if not validate_pin(pin):
+    return authenticate_user(phone, pin)
+
+def authenticate_user(phone: str, pin: str) -> Optional[Dict[str, Any]]:
+    if not validate_phone(phone) or not validate_pin(pin):
         return None
     
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM users WHERE phone=?", (phone,))
-    user = c.fetchone()
-    conn.close()
+    with connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM users WHERE phone=?", (phone,))
+        user = c.fetchone()
     
     if user:
         stored_hash = user['pin_hash']
         salt = user['salt']
         role = user['role']
-        group_ids = json.loads(user['group_ids'])
         if hash_pin(pin, salt) == stored_hash:
-            return {
+            return refresh_user_groups({
                 "phone": phone,
-                "group_ids": group_ids,
                 "role": role
-            }
+            })
     
     return None
 
+# ==================== GROUP MEMBERSHIP ====================
+def add_user_to_group(conn: sqlite3.Connection, phone: str, group_id: str, role: str = 'MEMBER') -> None:
+    conn.execute(
+        """INSERT INTO user_groups (phone, group_id, role) VALUES (?,?,?)
+           ON CONFLICT (phone, group_id) DO UPDATE SET role=excluded.role""",
+        (phone, group_id, role)
+    )
+
+def get_user_groups(phone: str) -> List[Dict[str, Any]]:
+    with connection_manager.connection() as conn:
+        rows = conn.execute(
+            "SELECT group_id, role FROM user_groups WHERE phone=? ORDER BY rowid", (phone,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def get_group_users(group_id: str, role: Optional[str] = None) -> List[Dict[str, Any]]:
+    sql = "SELECT phone, role, joined_at FROM user_groups WHERE group_id=?"
+    params: List[Any] = [group_id]
+    if role:
+        sql += " AND role=?"
+        params.append(role)
+    with connection_manager.connection() as conn:
+        return [dict(row) for row in conn.execute(sql + " ORDER BY role, phone", params).fetchall()]
+
+def refresh_user_groups(user: Dict[str, Any]) -> Dict[str, Any]:
+    groups = get_user_groups(user["phone"])
+    user["group_ids"] = [g["group_id"] for g in groups]
+    user["group_roles"] = {g["group_id"]: g["role"] for g in groups}
+    return user
+
+def select_group(user: Dict[str, Any], group_id: Optional[str]) -> Optional[str]:
+    # user["role"] is the account-wide role; group_role is the role in the
+    # group being worked in and gates group actions such as adding members
+    user["current_group_id"] = group_id
+    user["group_role"] = user.get("group_roles", {}).get(group_id, 'MEMBER')
+    return group_id
+
+def menu_role(user: Dict[str, Any]) -> str:
+    # Account admins keep Manage Groups in groups where they are only members
+    return 'ADMIN' if 'ADMIN' in (user["role"], user.get("group_role")) else 'MEMBER'
+
+def is_group_admin(user: Dict[str, Any]) -> bool:
+    return user.get("group_role") == 'ADMIN'
+
+# ==================== MEMBER CACHE ====================
+MEMBER_CACHE_SIZE = 4096
+CACHE_MISS = object()
+
+class GroupCache:
+    """Bounded LRU whose keys start with a group ID, invalidated per group or per key."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._groups: Dict[str, set] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def generation(self, group_id: str) -> int:
+        with self._lock:
+            return self._generations.get(group_id, 0)
+
+    def get(self, key: tuple, version: Optional[int] = None) -> Any:
+        # With a version, an entry cached under any other version is a miss
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (version is not None and entry[0] != version):
+                self.misses += 1
+                return CACHE_MISS
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, value: Any, generation: int, version: Optional[int] = None) -> None:
+        # A read that raced an invalidation would cache rows from before the write
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            self._groups.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._discard(old_key)
+                self.evictions += 1
+
+    def _discard(self, key: tuple) -> None:
+        keys = self._groups.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._groups[key[0]]
+
+    def invalidate(self, group_id: str, keys: Optional[List[tuple]] = None) -> None:
+        with self._lock:
+            self._generations[group_id] = self._generations.get(group_id, 0) + 1
+            for key in list(self._groups.get(group_id, ())) if keys is None else keys:
+                if self._entries.pop(key, None) is not None:
+                    self._discard(key)
+
+    def invalidate_group(self, group_id: str) -> None:
+        self.invalidate(group_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            for group_id in self._groups:
+                self._generations[group_id] = self._generations.get(group_id, 0) + 1
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None
+            }
+
+# Keys: (group_id, member_name) for one member, (group_id, None) for the roster
+member_cache = GroupCache(MEMBER_CACHE_SIZE)
+
+def invalidate_on_commit(cache: GroupCache, group_id: str, keys: Optional[List[tuple]] = None) -> None:
+    # Drop now, so reads later in this transaction see its writes, and again
+    # after commit, so a reader holding the old snapshot cannot re-cache it.
+    cache.invalidate(group_id, keys)
+    connection_manager.after_commit(lambda: cache.invalidate(group_id, keys))
+
+def invalidate_members(group_id: str, names: Optional[List[str]] = None) -> None:
+    keys = None if names is None else [(group_id, None)] + [(group_id, name) for name in names]
+    invalidate_on_commit(member_cache, group_id, keys)
+    bump_group_version(group_id)
+
+# In-process invalidation cannot see writes from other processes (CLI jobs,
+# other API workers), so cached entries also carry the group's stored
+# version and are only served while it is unchanged.
+def read_group_version(group_id: str) -> int:
+    with connection_manager.connection() as conn:
+        row = conn.execute("SELECT version FROM group_keys WHERE group_id=?", (group_id,)).fetchone()
+    return row["version"] if row else 0
+
+def bump_group_version(group_id: str) -> None:
+    # Joins the writer's transaction, so the bump commits with the write
+    with connection_manager.connection() as conn:
+        conn.execute("""
+            INSERT INTO group_keys (group_id, version) VALUES (?, 1)
+            ON CONFLICT (group_id) DO UPDATE SET version = version + 1
+        """, (group_id,))
+    invalidate_on_commit(report_cache, group_id)
+
+# ==================== REPORT CACHE ====================
+REPORT_CACHE_SIZE = 2048
+
+# Keys: (group_id, view, *args). Entries are tagged with the group's stored
+# version, so a write from any process retires them on the next read.
+report_cache = GroupCache(REPORT_CACHE_SIZE)
+
+def report_etag(group_id: str) -> str:
+    return f'"v{read_group_version(group_id)}"'
+
+def cached_report(group_id: str, view: str, build: Callable[..., Any], *args: Any) -> Any:
+    # build(group_id, *args) runs only when the group changed since it was cached
+    key = (group_id, view) + args
+    version = read_group_version(group_id)
+    report = report_cache.get(key, version)
+    if report is CACHE_MISS:
+        generation = report_cache.generation(group_id)
+        report = build(group_id, *args)
+        if not connection_manager.in_transaction():
+            report_cache.put(key, report, generation, version)
+    return report
+
 # ==================== MEMBER MANAGEMENT ====================
 def get_member(name: str, group_id: str) -> Optional[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM members WHERE member_name=? AND group_id=?", (name, group_id))
-    row = c.fetchone()
-    conn.close()
+    key = (group_id, name)
+    version = read_group_version(group_id)
+    row = member_cache.get(key, version)
+    if row is CACHE_MISS:
+        generation = member_cache.generation(group_id)
+        with connection_manager.connection() as conn:
+            # Rows read inside an open transaction may still be rolled back
+            cacheable = not conn.in_transaction
+            c = conn.cursor()
+            c.execute("SELECT * FROM members WHERE member_name=? AND group_id=?", (name, group_id))
+            row = c.fetchone()
+        row = dict(row) if row else None
+        if cacheable:
+            member_cache.put(key, row, generation, version)
     
     return dict(row) if row else None
 
 def get_all_members(group_id: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM members WHERE group_id=? ORDER BY member_name", (group_id,))
-    rows = c.fetchall()
-    conn.close()
+    key = (group_id, None)
+    version = read_group_version(group_id)
+    rows = member_cache.get(key, version)
+    if rows is CACHE_MISS:
+        generation = member_cache.generation(group_id)
+        with connection_manager.connection() as conn:
+            cacheable = not conn.in_transaction
+            c = conn.cursor()
+            c.execute("SELECT * FROM members WHERE group_id=? ORDER BY member_name", (group_id,))
+            rows = [dict(row) for row in c.fetchall()]
+        if cacheable:
+            member_cache.put(key, rows, generation, version)
     
     return [dict(row) for row in rows]
 
 def save_member(member_data: Dict[str, Any], group_id: str) -> bool:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
     try:
-        c.execute("""
-        INSERT OR REPLACE INTO members VALUES (?,?,?,?,?)
-        """, (
-            member_data["member_name"],
-            member_data.get("phone", ""),
-            safe_int(member_data["total_contributions"]),
-            safe_int(member_data["total_received"]),
-            group_id
-        ))
-        conn.commit()
+        with connection_manager.transaction() as conn:
+            # Upsert keeps an existing member's number; new members get the next one
+            conn.execute("""
+            INSERT INTO members (member_name, phone, total_contributions, total_received, group_id, member_no)
+            VALUES (?,?,?,?,?, (SELECT COALESCE(MAX(member_no), 0) + 1 FROM members WHERE group_id=?))
+            ON CONFLICT (member_name, group_id) DO UPDATE SET
+                phone=excluded.phone,
+                total_contributions=excluded.total_contributions,
+                total_received=excluded.total_received
+            """, (
+                member_data["member_name"],
+                member_data.get("phone", ""),
+                safe_int(member_data["total_contributions"]),
+                safe_int(member_data["total_received"]),
+                group_id,
+                group_id
+            ))
+            enqueue_rotation_member(conn, group_id, member_data["member_name"])
+            invalidate_members(group_id, [member_data["member_name"]])
+            invalidate_on_commit(member_search_cache, group_id)
         return True
     except Exception as e:
         print(f"❌ Error saving member: {e}")
         return False
-    finally:
-        conn.close()
 
 def add_member(group_id: str, device_type: str) -> str:
     if device_type == "FEATURE_PHONE":
@@ -410,6 +1113,16 @@ def add_member(group_id: str, device_type: str) -> str:
     if not confirm_action("✅ Confirm adding member?"):
         return "Cancelled"
     
+    return create_member(group_id, name, phone)
+
+def create_member(group_id: str, name: str, phone: str = "") -> str:
+    if not validate_name(name):
+        return get_message("invalid_name")
+    if phone and not validate_phone(phone):
+        return get_message("invalid_phone")
+    if get_member(name, group_id):
+        return get_message("member_exists")
+    
     save_member({
         "member_name": name,
         "phone": phone,
@@ -419,24 +1132,282 @@ def add_member(group_id: str, device_type: str) -> str:
     
     return f"✅ Member {name} added successfully!"
 
+# ==================== MEMBER SEARCH ====================
+MEMBER_PICKER_PAGE_SIZE = 8
+MEMBER_SEARCH_CACHE_SIZE = 2048
+
+# Search pages hold no balances, so only roster changes drop them
+member_search_cache = GroupCache(MEMBER_SEARCH_CACHE_SIZE)
+
+def search_members(group_id: str, query: str = "", after: Optional[tuple] = None,
+                   limit: int = MEMBER_PICKER_PAGE_SIZE, exclude: Optional[str] = None) -> Dict[str, Any]:
+    # query is matched as a phone (255...), a member number or a name prefix;
+    # pages are keyed on (member_name, member_id) so each one is a short index
+    # range, and names differing only in case are neither skipped nor repeated.
+    query = query.strip()
+    if after is not None:
+        after = tuple(after)  # USSD sessions round-trip the cursor through JSON
+    key = (group_id, query.lower(), after, limit, exclude)
+    version = read_group_version(group_id)
+    cached = member_search_cache.get(key, version)
+    if cached is not CACHE_MISS:
+        return cached
+    generation = member_search_cache.generation(group_id)
+    
+    sql = "SELECT member_id, member_name, member_no, phone FROM members WHERE group_id=? "
+    params: List[Any] = [group_id]
+    if query and validate_phone(query):
+        sql += "AND phone=? "
+        params.append(query)
+    elif query.lstrip("#").isdigit():
+        sql += "AND member_no=? "
+        params.append(int(query.lstrip("#")))
+    elif query:
+        sql += "AND member_name >= ? COLLATE NOCASE AND member_name < ? COLLATE NOCASE "
+        params.extend([query, query + "\U0010ffff"])
+    if exclude:
+        sql += "AND member_name != ? "
+        params.append(exclude)
+    if after is not None:
+        # Spelled out: SQLite seeks the index on this form but not on a row value
+        sql += "AND member_name >= ? COLLATE NOCASE AND (member_name > ? COLLATE NOCASE OR member_id > ?) "
+        params.extend([after[0], after[0], after[1]])
+    sql += "ORDER BY member_name COLLATE NOCASE, member_id LIMIT ?"
+    params.append(limit + 1)
+    
+    with connection_manager.connection() as conn:
+        cacheable = not conn.in_transaction
+        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+    
+    page = {
+        "members": rows[:limit],
+        "next_after": (rows[limit - 1]["member_name"], rows[limit - 1]["member_id"]) if len(rows) > limit else None
+    }
+    if cacheable:
+        member_search_cache.put(key, page, generation, version)
+    return page
+
+def count_members(group_id: str) -> int:
+    with connection_manager.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM members WHERE group_id=?", (group_id,)).fetchone()[0]
+
+def member_label(member: Dict[str, Any]) -> str:
+    return f"{member['member_name']} #{member['member_no']}" if member.get("member_no") else member["member_name"]
+
+def pick_member(group_id: str, role_label: str, exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    query = input(f"🔎 {role_label} (name, phone or member no; blank for all): ").strip()
+    after = None
+    while True:
+        page = search_members(group_id, query, after, exclude=exclude)
+        members = page["members"]
+        if not members:
+            return None
+        if after is None:
+            if len(members) == 1:
+                return members[0]
+            exact = [m for m in members if m["member_name"].lower() == query.lower()]
+            if exact:
+                return exact[0]
+        
+        print(f"\n👤 Select {role_label.lower()}:")
+        for i, member in enumerate(members, 1):
+            print(f"  {i}. {member_label(member)}")
+        if page["next_after"]:
+            print("  N. Next page")
+        
+        choice = input("📥 Number: ").strip().upper()
+        if choice == "N" and page["next_after"]:
+            after = page["next_after"]
+            continue
+        idx = safe_int(choice) - 1
+        return members[idx] if 0 <= idx < len(members) else None
+
+# ==================== GROUP COMMIT ====================
+class GroupCommitWriter:
+    """Single writer thread that commits queued ledger operations in batches.
+    
+    submit() returns a Future that resolves only after the operation's batch
+    has committed. Each operation runs in its own savepoint, so one failure
+    is reported to its caller without aborting the rest of the batch.
+    """
+
+    def __init__(self, max_delay: float = GROUP_COMMIT_MAX_DELAY, max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = self.operations = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="vicoba-group-commit", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], Any]) -> Future:
+        future: Future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "mean_batch": round(self.operations / self.batches, 2) if self.batches else None
+        }
+
+    def _run(self) -> None:
+        # The batch fsync is what callers wait for, so pay for a full one
+        with connection_manager.connection() as conn:
+            conn.execute("PRAGMA synchronous=FULL")
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+        # Anything queued after stop() still gets written
+        leftovers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self._commit(leftovers)
+
+    def _commit(self, batch: List[tuple]) -> None:
+        outcomes = []
+        try:
+            with connection_manager.transaction(immediate=True) as conn:
+                for operation, future in batch:
+                    conn.execute("SAVEPOINT group_commit_op")
+                    try:
+                        outcomes.append((future, operation(conn), None))
+                        conn.execute("RELEASE group_commit_op")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO group_commit_op")
+                        conn.execute("RELEASE group_commit_op")
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+group_commit = GroupCommitWriter()
+
 # ==================== CONTRIBUTION SYSTEM ====================
+def get_group_key(conn: sqlite3.Connection, group_id: str, create: bool = False) -> Optional[int]:
+    # Ledger rows carry this integer instead of the group ID text
+    row = conn.execute("SELECT group_key FROM group_keys WHERE group_id=?", (group_id,)).fetchone()
+    if row:
+        return row["group_key"]
+    if not create:
+        return None
+    return conn.execute("INSERT INTO group_keys (group_id) VALUES (?)", (group_id,)).lastrowid
+
+def insert_transaction(conn: sqlite3.Connection, member_name: str, action: str, amount: int,
+                       round_id: Optional[int], group_id: str, timestamp: str) -> bool:
+    group_key = get_group_key(conn, group_id, create=True)
+    c = conn.execute("""
+        INSERT INTO transactions (group_key, member_id, action, amount, timestamp, round_id)
+        SELECT ?, member_id, ?, ?, ?, ? FROM members WHERE group_id=? AND member_name=?
+    """, (group_key, action, amount, timestamp, round_id, group_id, member_name))
+    if c.rowcount != 1:
+        print(f"❌ Error logging transaction: member {member_name} not found")
+        return False
+    bump_group_version(group_id)
+    return True
+
 def log_transaction(member_name: str, action: str, amount: int, 
                    round_id: Optional[int], group_id: str) -> bool:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
+    timestamp = datetime.now().isoformat()
     try:
-        c.execute(
-            "INSERT INTO transactions VALUES (NULL,?,?,?,?,?,?)",
-            (member_name, action, amount, datetime.now().isoformat(), round_id, group_id)
-        )
-        conn.commit()
-        return True
+        if group_commit.running and not connection_manager.in_transaction():
+            return group_commit.submit(
+                lambda conn: insert_transaction(conn, member_name, action, amount, round_id, group_id, timestamp)
+            ).result()
+        # IMMEDIATE: a deferred read-then-write would fail busy under contention
+        with connection_manager.transaction(immediate=True) as conn:
+            return insert_transaction(conn, member_name, action, amount, round_id, group_id, timestamp)
     except Exception as e:
         print(f"❌ Error logging transaction: {e}")
         return False
-    finally:
-        conn.close()
+
+# ==================== LEDGER POSTING ====================
+# Which member balance each ledger action moves
+LEDGER_BALANCE_COLUMNS = {
+    "CONTRIBUTION": "total_contributions",
+    "PAYMENT_SENT": "total_contributions",
+    "PAYMENT_RECEIVED": "total_received",
+    "ROUND_RECEIVED": "total_received"
+}
+
+def post_ledger(group_id: str, entries: List[Dict[str, Any]]) -> None:
+    """Apply balance deltas and journal rows for one business operation atomically.
+    
+    Each entry has member_name, action, amount and optionally round_id. Raises
+    ValueError (and rolls everything back) if a member does not exist. With
+    group commit running, top-level postings return once their batch commits.
+    """
+    if group_commit.running and not connection_manager.in_transaction():
+        group_commit.submit(lambda conn: post_ledger(group_id, entries)).result()
+        return
+    timestamp = datetime.now().isoformat()
+    with connection_manager.transaction(immediate=True) as conn:
+        c = conn.cursor()
+        group_key = get_group_key(conn, group_id, create=True)
+        member_ids = []
+        for entry in entries:
+            column = LEDGER_BALANCE_COLUMNS[entry["action"]]
+            row = c.execute(
+                f"UPDATE members SET {column} = {column} + ? WHERE member_name=? AND group_id=? RETURNING member_id",
+                (entry["amount"], entry["member_name"], group_id)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Member {entry['member_name']} not found in {group_id}")
+            member_ids.append(row["member_id"])
+            if entry["action"] == "CONTRIBUTION" and entry.get("round_id") is None:
+                c.execute("""
+                    INSERT INTO current_round (group_id, member_name, contributed) VALUES (?,?,?)
+                    ON CONFLICT (group_id, member_name) DO UPDATE SET contributed = contributed + excluded.contributed
+                """, (group_id, entry["member_name"], entry["amount"]))
+        c.executemany(
+            "INSERT INTO transactions (group_key, member_id, action, amount, timestamp, round_id) VALUES (?,?,?,?,?,?)",
+            [(group_key, member_id, e["action"], e["amount"], timestamp, e.get("round_id"))
+             for member_id, e in zip(member_ids, entries)]
+        )
+        invalidate_members(group_id, [e["member_name"] for e in entries])
 
 def contribute(group_id: str, device_type: str) -> str:
     if device_type == "FEATURE_PHONE":
@@ -446,109 +1417,215 @@ def contribute(group_id: str, device_type: str) -> str:
         print("        MAKE CONTRIBUTION")
         print("="*40)
     
-    name = input("👤 Member name: ").strip()
-    if not validate_name(name):
-        return get_message("invalid_name")
+    member = pick_member(group_id, "Member")
+    if not member:
+        return get_message("member_not_found")
+    name = member["member_name"]
     
     amount_str = input("💰 Amount: ").strip()
     amount = safe_int(amount_str)
     if amount <= 0:
         return "❌ Invalid amount"
     
-    member = get_member(name, group_id)
-    if not member:
-        return get_message("member_not_found")
-    
-    if not confirm_action(f"✅ Confirm contribution of {format_currency(amount)}?"):
+    if not confirm_action(f"✅ Confirm contribution of {format_currency(amount)} for {name}?"):
         return "❌ Cancelled"
     
-    member["total_contributions"] += amount
-    save_member(member, group_id)
+    return record_contribution(group_id, name, amount)
+
+def record_contribution(group_id: str, name: str, amount: int) -> str:
+    if amount <= 0:
+        return "❌ Invalid amount"
     
-    log_transaction(name, "CONTRIBUTION", amount, None, group_id)
+    try:
+        post_ledger(group_id, [
+            {"member_name": name, "action": "CONTRIBUTION", "amount": amount}
+        ])
+    except ValueError:
+        return get_message("member_not_found")
     
-    return get_message("contribution_success").format(
+    message = get_message("contribution_success").format(
         amount=format_currency(amount),
         name=name
     )
+    
+    completed = finalize_round_if_complete(group_id)
+    if completed:
+        message += "\n" + get_message("round_completed").format(
+            recipient=completed["recipient"],
+            amount=format_currency(completed["amount"])
+        )
+    return message
 
 # ==================== ROUND MANAGEMENT ====================
 def create_round(member_receiving: str, total_amount: int, group_id: str) -> int:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
     round_date = datetime.now().isoformat()
-    c.execute(
-        "INSERT INTO rounds VALUES (NULL,?,?,?,?)", 
-        (member_receiving, total_amount, round_date, group_id)
-    )
-    round_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    
-    member = get_member(member_receiving, group_id)
-    if member:
-        member["total_received"] += total_amount
-        save_member(member, group_id)
-    
-    log_transaction(member_receiving, "ROUND_RECEIVED", total_amount, round_id, group_id)
+    with connection_manager.transaction(immediate=True) as conn:
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO rounds (group_key, recipient_id, total_amount, round_date)
+            VALUES (?, (SELECT member_id FROM members WHERE group_id=? AND member_name=?), ?, ?)
+        """, (get_group_key(conn, group_id, create=True), group_id, member_receiving, total_amount, round_date))
+        round_id = c.lastrowid
+        advance_rotation(conn, group_id, member_receiving, round_id)
+        post_ledger(group_id, [{
+            "member_name": member_receiving,
+            "action": "ROUND_RECEIVED",
+            "amount": total_amount,
+            "round_id": round_id
+        }])
     return round_id
 
 def get_current_round_contributions(group_id: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT round_id FROM rounds WHERE group_id=? ORDER BY round_id DESC LIMIT 1", (group_id,))
-    latest_round = c.fetchone()
-    latest_id = latest_round['round_id'] if latest_round else 0
-    
-    c.execute("""
-        SELECT member_name, SUM(amount) AS contributed
-        FROM transactions 
-        WHERE action='CONTRIBUTION' AND group_id=? AND (round_id IS NULL OR round_id > ?)
-        GROUP BY member_name
-    """, (group_id, latest_id))
-    
-    contribs = [dict(row) for row in c.fetchall()]
-    conn.close()
+    # Maintained by post_ledger() and cleared when the round closes
+    with connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT member_name, contributed
+            FROM current_round 
+            WHERE group_id=?
+            ORDER BY member_name
+        """, (group_id,))
+        
+        contribs = [dict(row) for row in c.fetchall()]
     
     return contribs
 
 def get_next_recipient(group_id: str) -> Optional[str]:
-    members = get_all_members(group_id)
-    if not members:
-        return None
-    
-    min_received = min(m["total_received"] for m in members)
-    candidates = [m["member_name"] for m in members if m["total_received"] == min_received]
-    return sorted(candidates)[0] if candidates else None
+    # Read-only: between cycles this previews the head of the next one, which
+    # finalize_round_if_complete starts when it pays out
+    with connection_manager.connection() as conn:
+        recipient = get_scheduled_recipient(conn, group_id)
+        if recipient is None:
+            upcoming = preview_rotation_cycle(conn, group_id, limit=1)
+            recipient = upcoming[0] if upcoming else None
+    return recipient
 
-def auto_finalize_round(group_id: str) -> bool:
-    contribs = get_current_round_contributions(group_id)
-    all_members = get_all_members(group_id)
-    
-    if len(contribs) == len(all_members) and all(c["contributed"] > 0 for c in contribs):
-        total_amount = sum(c["contributed"] for c in contribs)
-        next_recipient = get_next_recipient(group_id)
+# ==================== ROTATION SCHEDULE ====================
+# Each cycle is an ordered queue of recipients fixed when the cycle starts
+# (fewest received first, then by name); rotation_state holds the cursor.
+# Cycles are only started by a payout; readers preview the next one instead.
+ROTATION_ORDER = "total_received, member_name"
+
+def preview_rotation_cycle(conn: sqlite3.Connection, group_id: str, limit: int = -1) -> List[str]:
+    rows = conn.execute(
+        f"SELECT member_name FROM members WHERE group_id=? ORDER BY {ROTATION_ORDER} LIMIT ?", (group_id, limit)
+    ).fetchall()
+    return [row["member_name"] for row in rows]
+
+def start_rotation_cycle(group_id: str) -> int:
+    with connection_manager.transaction(immediate=True) as conn:
+        c = conn.cursor()
+        c.execute("SELECT cycle FROM rotation_state WHERE group_id=?", (group_id,))
+        row = c.fetchone()
+        if row and get_scheduled_recipient(conn, group_id) is not None:
+            return row["cycle"]  # a racing payout already started it
+        cycle = row["cycle"] + 1 if row else 1
         
-        if next_recipient and total_amount > 0:
-            round_id = create_round(next_recipient, total_amount, group_id)
-            
-            conn = get_db_connection()
-            c = conn.cursor()
-            
-            for contrib in contribs:
-                c.execute("""
-                    UPDATE transactions 
-                    SET round_id=? 
-                    WHERE member_name=? AND action='CONTRIBUTION' AND round_id IS NULL AND group_id=?
-                """, (round_id, contrib["member_name"], group_id))
-            conn.commit()
-            conn.close()
-            
-            return True
-    
-    return False
+        c.execute(f"""
+            INSERT INTO rotation_schedule (group_id, cycle, position, member_name)
+            SELECT group_id, ?, ROW_NUMBER() OVER (ORDER BY {ROTATION_ORDER}), member_name
+            FROM members
+            WHERE group_id=?
+        """, (cycle, group_id))
+        if c.rowcount <= 0:
+            return 0
+        
+        c.execute("""
+            INSERT INTO rotation_state (group_id, cycle, next_position) VALUES (?,?,1)
+            ON CONFLICT (group_id) DO UPDATE SET cycle=excluded.cycle, next_position=1
+        """, (group_id, cycle))
+    return cycle
+
+def get_scheduled_recipient(conn: sqlite3.Connection, group_id: str) -> Optional[str]:
+    row = conn.execute("""
+        SELECT s.member_name
+        FROM rotation_state st
+        JOIN rotation_schedule s
+          ON s.group_id=st.group_id AND s.cycle=st.cycle AND s.position=st.next_position
+        WHERE st.group_id=?
+    """, (group_id,)).fetchone()
+    return row["member_name"] if row else None
+
+def advance_rotation(conn: sqlite3.Connection, group_id: str, member_name: str, round_id: int) -> bool:
+    # Only a payout to the scheduled member moves the cursor
+    c = conn.cursor()
+    c.execute("""
+        UPDATE rotation_schedule SET round_id=?
+        WHERE group_id=? AND member_name=? AND round_id IS NULL
+          AND (cycle, position) = (SELECT cycle, next_position FROM rotation_state WHERE group_id=?)
+    """, (round_id, group_id, member_name, group_id))
+    if c.rowcount != 1:
+        return False
+    c.execute("UPDATE rotation_state SET next_position = next_position + 1 WHERE group_id=?", (group_id,))
+    return True
+
+def enqueue_rotation_member(conn: sqlite3.Connection, group_id: str, member_name: str) -> None:
+    # Members joining mid-cycle go to the back of the running cycle's queue
+    conn.execute("""
+        INSERT INTO rotation_schedule (group_id, cycle, position, member_name)
+        SELECT st.group_id, st.cycle,
+               (SELECT MAX(position) FROM rotation_schedule WHERE group_id=st.group_id AND cycle=st.cycle) + 1,
+               ?
+        FROM rotation_state st
+        WHERE st.group_id=?
+          AND NOT EXISTS (
+              SELECT 1 FROM rotation_schedule
+              WHERE group_id=st.group_id AND cycle=st.cycle AND member_name=?
+          )
+    """, (member_name, group_id, member_name))
+
+def get_rotation_schedule(group_id: str) -> List[Dict[str, Any]]:
+    with connection_manager.connection() as conn:
+        if get_scheduled_recipient(conn, group_id) is None:
+            # No cycle running: show the order the next payout will fix
+            row = conn.execute("SELECT cycle FROM rotation_state WHERE group_id=?", (group_id,)).fetchone()
+            cycle = row["cycle"] + 1 if row else 1
+            return [{"cycle": cycle, "position": position, "member_name": name, "round_id": None,
+                     "is_next": position == 1}
+                    for position, name in enumerate(preview_rotation_cycle(conn, group_id), 1)]
+        c = conn.cursor()
+        c.execute("""
+            SELECT s.cycle, s.position, s.member_name, s.round_id,
+                   s.position = st.next_position AS is_next
+            FROM rotation_state st
+            JOIN rotation_schedule s ON s.group_id=st.group_id AND s.cycle=st.cycle
+            WHERE st.group_id=?
+            ORDER BY s.position
+        """, (group_id,))
+        return [dict(row) for row in c.fetchall()]
+
+def finalize_round_if_complete(group_id: str) -> Optional[Dict[str, Any]]:
+    # One IMMEDIATE transaction: the eligibility check, the round, the payout
+    # and the stamping of the pot's contributions commit or roll back together.
+    with connection_manager.transaction(immediate=True) as conn:
+        c = conn.cursor()
+        contribs = get_current_round_contributions(group_id)
+        member_count = count_members(group_id)
+        
+        if not contribs or len(contribs) != member_count or any(r["contributed"] <= 0 for r in contribs):
+            return None
+        
+        total_amount = sum(r["contributed"] for r in contribs)
+        next_recipient = get_scheduled_recipient(conn, group_id)
+        if next_recipient is None and start_rotation_cycle(group_id):
+            next_recipient = get_scheduled_recipient(conn, group_id)
+        if not next_recipient or total_amount <= 0:
+            return None
+        
+        round_id = create_round(next_recipient, total_amount, group_id)
+        c.execute("""
+            UPDATE transactions 
+            SET round_id=? 
+            WHERE group_key=? AND action='CONTRIBUTION' AND round_id IS NULL
+        """, (round_id, get_group_key(conn, group_id)))
+        c.execute("DELETE FROM current_round WHERE group_id=?", (group_id,))
+        enqueue_notifications(conn, group_id, get_message("round_completed").format(
+            recipient=next_recipient, amount=format_currency(total_amount)))
+    
+    return {"round_id": round_id, "recipient": next_recipient, "amount": total_amount}
+
+def auto_finalize_round(group_id: str) -> bool:
+    return finalize_round_if_complete(group_id) is not None
 
 # ==================== PAYMENT SYSTEM ====================
 def make_payment(group_id: str, device_type: str) -> str:
@@ -559,32 +1636,18 @@ def make_payment(group_id: str, device_type: str) -> str:
         print("        ENHANCED PAYMENT")
         print("="*40)
     
-    members = get_all_members(group_id)
-    if len(members) < 2:
+    if count_members(group_id) < 2:
         return "❌ Need at least 2 members for payments"
     
-    print("\n👤 Select payer:")
-    for i, member in enumerate(members, 1):
-        print(f"  {i}. {member['member_name']} - {format_currency(member['total_contributions'])}")
-    
     try:
-        payer_idx = int(input("\n📥 Payer number: ")) - 1
-        if payer_idx < 0 or payer_idx >= len(members):
+        payer = pick_member(group_id, "Payer")
+        if not payer:
             return "❌ Invalid payer selection"
         
-        payer = members[payer_idx]
-        
-        print("\n👤 Select payee:")
-        payees = [m for m in members if m['member_name'] != payer['member_name']]
-        for i, member in enumerate(payees, 1):
-            print(f"  {i}. {member['member_name']} - {format_currency(member['total_received'])}")
-        
-        payee_idx = int(input("\n📤 Payee number: ")) - 1
-        if payee_idx < 0 or payee_idx >= len(payees):
+        payee = pick_member(group_id, "Payee", exclude=payer["member_name"])
+        if not payee:
             return "❌ Invalid payee selection"
         
-        payee = payees[payee_idx]
-        
         amount_str = input("💰 Amount: ").strip()
         amount = safe_int(amount_str)
         if amount <= 0:
@@ -593,24 +1656,31 @@ def make_payment(group_id: str, device_type: str) -> str:
         if not confirm_action(f"✅ Confirm payment of {format_currency(amount)} from {payer['member_name']} to {payee['member_name']}?"):
             return "❌ Cancelled"
         
-        payer["total_contributions"] += amount
-        save_member(payer, group_id)
-        
-        payee["total_received"] += amount
-        save_member(payee, group_id)
-        
-        log_transaction(payer["member_name"], "PAYMENT_SENT", amount, None, group_id)
-        log_transaction(payee["member_name"], "PAYMENT_RECEIVED", amount, None, group_id)
-        
-        return get_message("payment_success").format(
-            amount=format_currency(amount),
-            payer=payer['member_name'],
-            payee=payee['member_name']
-        )
+        return record_payment(group_id, payer["member_name"], payee["member_name"], amount)
     
     except ValueError:
         return "❌ Please enter valid numbers"
 
+def record_payment(group_id: str, payer_name: str, payee_name: str, amount: int) -> str:
+    if amount <= 0:
+        return "❌ Invalid amount"
+    if payer_name == payee_name:
+        return "❌ Invalid payee selection"
+    
+    try:
+        post_ledger(group_id, [
+            {"member_name": payer_name, "action": "PAYMENT_SENT", "amount": amount},
+            {"member_name": payee_name, "action": "PAYMENT_RECEIVED", "amount": amount}
+        ])
+    except ValueError:
+        return get_message("member_not_found")
+    
+    return get_message("payment_success").format(
+        amount=format_currency(amount),
+        payer=payer_name,
+        payee=payee_name
+    )
+
 # ==================== GROUP MANAGEMENT ====================
 def create_group(phone: str, device_type: str) -> str:
     if device_type == "FEATURE_PHONE":
@@ -631,27 +1701,31 @@ def create_group(phone: str, device_type: str) -> str:
     if not confirm_action("✅ Confirm group creation?"):
         return "❌ Cancelled"
     
-    conn = get_db_connection()
-    c = conn.cursor()
-    
+    return insert_group(phone, group_id, group_name)
+
+def insert_group(phone: str, group_id: str, group_name: str) -> str:
+    # The creator administers the new group
     try:
-        c.execute("INSERT INTO groups (group_id, group_name, created_by) VALUES (?,?,?)",
-                  (group_id, group_name, phone))
-        conn.commit()
-        
-        c.execute("SELECT group_ids FROM users WHERE phone=?", (phone,))
-        result = c.fetchone()
-        if result:
-            group_ids = json.loads(result[0])
-            group_ids.append(group_id)
-            c.execute("UPDATE users SET group_ids=? WHERE phone=?", (json.dumps(group_ids), phone))
-            conn.commit()
-            
-            return f"✅ Group {group_name} ({group_id}) created!"
+        with connection_manager.transaction() as conn:
+            conn.execute("INSERT INTO groups (group_id, group_name, created_by) VALUES (?,?,?)",
+                         (group_id, group_name, phone))
+            add_user_to_group(conn, phone, group_id, 'ADMIN')
+        return f"✅ Group {group_name} ({group_id}) created!"
     except sqlite3.IntegrityError:
         return "❌ Group ID already exists"
-    finally:
-        conn.close()
+
+def get_groups_overview() -> List[Dict[str, Any]]:
+    with connection_manager.connection() as conn:
+        rows = conn.execute("""
+            SELECT g.group_id, g.group_name,
+                   COUNT(ug.phone) AS users,
+                   COUNT(ug.phone) FILTER (WHERE ug.role='ADMIN') AS admins
+            FROM groups g
+            LEFT JOIN user_groups ug ON ug.group_id=g.group_id
+            GROUP BY g.group_id
+            ORDER BY g.group_id
+        """).fetchall()
+    return [dict(row) for row in rows]
 
 def manage_groups(user: Dict[str, Any], device_type: str) -> str:
     if device_type == "FEATURE_PHONE":
@@ -664,18 +1738,20 @@ def manage_groups(user: Dict[str, Any], device_type: str) -> str:
     print("1. 🆕 Create New Group")
     print("2. 🔄 Switch Group")
     print("3. 👥 View All Groups")
+    print("4. 📅 View Payout Order")
     choice = input("📥 Choose: ").strip()
     
     if choice == "1":
         return create_group(user["phone"], device_type)
     elif choice == "2":
+        refresh_user_groups(user)
         print("\n🏷️  Your Groups:")
         for i, gid in enumerate(user["group_ids"], 1):
-            print(f"  {i}. {gid}")
+            print(f"  {i}. {gid} ({user['group_roles'][gid].title()})")
         try:
             idx = int(input("📥 Select group number: ")) - 1
             if 0 <= idx < len(user["group_ids"]):
-                user["current_group_id"] = user["group_ids"][idx]
+                select_group(user, user["group_ids"][idx])
                 return f"✅ Switched to group {user['current_group_id']}"
             else:
                 return "❌ Invalid selection"
@@ -683,19 +1759,64 @@ def manage_groups(user: Dict[str, Any], device_type: str) -> str:
             return "❌ Invalid input"
     elif choice == "3":
         print("\n🏷️  All Groups:")
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT * FROM groups")
-        groups = [dict(row) for row in c.fetchall()]
-        conn.close()
+        groups = get_groups_overview()
         
         for i, group in enumerate(groups, 1):
-            print(f"  {i}. {group['group_id']} - {group['group_name']}")
+            print(f"  {i}. {group['group_id']} - {group['group_name']} "
+                  f"({group['users']} users, {group['admins']} admins)")
         return "✅ Groups displayed successfully"
+    elif choice == "4":
+        group_id = user.get("current_group_id")
+        schedule = get_rotation_schedule(group_id) if group_id else []
+        if not schedule:
+            return "❌ No members in group"
+        
+        print(f"\n📅 Payout Order (cycle {schedule[0]['cycle']}):")
+        for entry in schedule:
+            status = "✅" if entry["round_id"] else ("🎯" if entry["is_next"] else "⏳")
+            print(f"  {entry['position']}. {entry['member_name']} {status}")
+        return "✅ Payout order displayed successfully"
     else:
         return "❌ Invalid choice"
 
 # ==================== REPORTS & ANALYTICS ====================
+def get_round_tracker(group_id: str) -> Dict[str, Any]:
+    with connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT m.member_name, COALESCE(cr.contributed, 0) AS contributed
+            FROM members m
+            LEFT JOIN current_round cr
+              ON cr.group_id=m.group_id AND cr.member_name=m.member_name
+            WHERE m.group_id=?
+            ORDER BY m.member_name
+        """, (group_id,))
+        rows = c.fetchall()
+    
+    next_recipient = get_next_recipient(group_id) if rows else None
+    members = []
+    pending = []
+    total_pot = 0
+    for row in rows:
+        contributed = row["contributed"]
+        total_pot += contributed
+        if contributed <= 0:
+            pending.append(row["member_name"])
+        members.append({
+            "member_name": row["member_name"],
+            "contributed": contributed,
+            "status": "CONTRIBUTED" if contributed > 0 else "PENDING",
+            "is_next": row["member_name"] == next_recipient
+        })
+    
+    return {
+        "group_id": group_id,
+        "total_pot": total_pot,
+        "next_recipient": next_recipient,
+        "members": members,
+        "pending": pending
+    }
+
 def view_round_tracker(group_id: str, device_type: str) -> None:
     if device_type == "FEATURE_PHONE":
         print("\n--- ROUND TRACKER ---")
@@ -704,28 +1825,30 @@ def view_round_tracker(group_id: str, device_type: str) -> None:
         print("        ROUND TRACKER")
         print("="*40)
     
-    contribs = get_current_round_contributions(group_id)
-    all_members = get_all_members(group_id)
-    total_pot = sum(c["contributed"] for c in contribs)
-    next_recipient = get_next_recipient(group_id)
+    tracker = cached_report(group_id, "tracker", get_round_tracker)
     
-    print(f"💰 Total Collected: {format_currency(total_pot)}")
-    print(f"🎯 Next Recipient: {next_recipient or 'None'}")
+    print(f"💰 Total Collected: {format_currency(tracker['total_pot'])}")
+    print(f"🎯 Next Recipient: {tracker['next_recipient'] or 'None'}")
     print("\n📊 Contributions:")
     
-    for member in all_members:
-        contributed = next((c["contributed"] for c in contribs if c["member_name"] == member["member_name"]), 0)
-        status = "✅" if contributed > 0 else "❌"
-        marker = " <-- NEXT" if member["member_name"] == next_recipient else ""
-        print(f"  👤 {member['member_name']}: {format_currency(contributed)} {status}{marker}")
+    for member in tracker["members"]:
+        status = "✅" if member["status"] == "CONTRIBUTED" else "❌"
+        marker = " <-- NEXT" if member["is_next"] else ""
+        print(f"  👤 {member['member_name']}: {format_currency(member['contributed'])} {status}{marker}")
     
-    not_contributed = [m["member_name"] for m in all_members if next((c["contributed"] for c in contribs if c["member_name"] == m["member_name"]), 0) == 0]
-    
-    if not_contributed:
-        print(f"\n⏰ Pending: {', '.join(not_contributed)}")
+    if tracker["pending"]:
+        print(f"\n⏰ Pending: {', '.join(tracker['pending'])}")
     else:
         print("\n🎉 All members have contributed!")
 
+def get_member_summary(group_id: str) -> List[Dict[str, Any]]:
+    return [{
+        "member_name": m["member_name"],
+        "total_contributions": m["total_contributions"],
+        "total_received": m["total_received"],
+        "balance": m["total_received"] - m["total_contributions"]
+    } for m in get_all_members(group_id)]
+
 def view_member_summary(group_id: str, device_type: str) -> None:
     if device_type == "FEATURE_PHONE":
         print("\n--- MEMBER SUMMARY ---")
@@ -734,7 +1857,7 @@ def view_member_summary(group_id: str, device_type: str) -> None:
         print("        MEMBER SUMMARY")
         print("="*40)
     
-    members = get_all_members(group_id)
+    members = cached_report(group_id, "members", get_member_summary)
     if not members:
         print("❌ No members in group")
         return
@@ -743,11 +1866,93 @@ def view_member_summary(group_id: str, device_type: str) -> None:
         print(f"\n👤 {member['member_name']}:")
         print(f"  💰 Contributions: {format_currency(member['total_contributions'])}")
         print(f"  📥 Received: {format_currency(member['total_received'])}")
-        balance = member['total_received'] - member['total_contributions']
-        status = "🟢" if balance >= 0 else "🔴"
-        print(f"  ⚖️  Balance: {format_currency(balance)} {status}")
+        status = "🟢" if member['balance'] >= 0 else "🔴"
+        print(f"  ⚖️  Balance: {format_currency(member['balance'])} {status}")
+
+TRANSACTION_PAGE_SIZES = {"FEATURE_PHONE": 5, "SMARTPHONE": 20}
+
+TRANSACTION_ICONS = {
+    "CONTRIBUTION": "💰",
+    "PAYMENT_SENT": "📤",
+    "PAYMENT_RECEIVED": "📥",
+    "ROUND_RECEIVED": "🎯"
+}
+
+# Ledger rows joined back to their names; callers add "WHERE t.group_key=? ..."
+LEDGER_SELECT = """
+    SELECT t.id, m.member_name, t.action, t.amount, t.timestamp, t.round_id, m.group_id, t.reference
+    FROM transactions t JOIN members m ON m.member_id=t.member_id
+"""
+
+def encode_page_cursor(row: Dict[str, Any]) -> str:
+    return f"{row['timestamp']}|{row['id']}"
+
+def decode_page_cursor(cursor: str) -> Optional[tuple]:
+    timestamp, _, row_id = cursor.rpartition("|")
+    if not timestamp or not row_id.isdigit():
+        return None
+    return timestamp, int(row_id)
+
+def get_transactions_page(group_id: str, member_name: Optional[str] = None,
+                          action: Optional[str] = None, start_date: Optional[str] = None,
+                          end_date: Optional[str] = None, cursor: Optional[str] = None,
+                          direction: str = "next", limit: int = 20) -> Dict[str, Any]:
+    # Newest first, keyed on (timestamp, id): "next" pages go older, "prev" newer
+    empty = {"transactions": [], "next_cursor": None, "prev_cursor": None}
+    with connection_manager.connection() as conn:
+        if member_name:
+            member = conn.execute("SELECT member_id FROM members WHERE group_id=? AND member_name=?",
+                                  (group_id, member_name)).fetchone()
+            if not member:
+                return empty
+            query = LEDGER_SELECT + "WHERE t.member_id=? "
+            params: List[Any] = [member["member_id"]]
+        else:
+            group_key = get_group_key(conn, group_id)
+            if group_key is None:
+                return empty
+            query = LEDGER_SELECT + "WHERE t.group_key=? "
+            params = [group_key]
+        if action:
+            query += "AND t.action=? "
+            params.append(action)
+        if start_date:
+            query += "AND t.timestamp >= ? "
+            params.append(start_date)
+        if end_date:
+            query += "AND t.timestamp <= ? "
+            params.append(f"{end_date}T23:59:59.999999" if len(end_date) == 10 else end_date)
+        
+        key = decode_page_cursor(cursor) if cursor else None
+        backwards = direction == "prev" and key is not None
+        if key:
+            query += "AND (t.timestamp, t.id) > (?, ?) " if backwards else "AND (t.timestamp, t.id) < (?, ?) "
+            params.extend(key)
+        query += "ORDER BY t.timestamp ASC, t.id ASC " if backwards else "ORDER BY t.timestamp DESC, t.id DESC "
+        query += "LIMIT ?"
+        params.append(limit + 1)
+        
+        c = conn.cursor()
+        c.execute(query, params)
+        rows = [dict(row) for row in c.fetchall()]
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = key is not None, has_more
+    
+    return {
+        "transactions": rows,
+        "next_cursor": encode_page_cursor(rows[-1]) if rows and has_older else None,
+        "prev_cursor": encode_page_cursor(rows[0]) if rows and has_newer else None
+    }
 
-def view_transactions(group_id: str, device_type: str, member_name: Optional[str] = None) -> None:
+def view_transactions(group_id: str, device_type: str, member_name: Optional[str] = None,
+                      action: Optional[str] = None, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> None:
     if device_type == "FEATURE_PHONE":
         print("\n--- TRANSACTIONS ---")
     else:
@@ -755,70 +1960,1095 @@ def view_transactions(group_id: str, device_type: str, member_name: Optional[str
         print("        TRANSACTION HISTORY")
         print("="*40)
     
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    query = "SELECT * FROM transactions WHERE group_id=? "
-    params = [group_id]
-    if member_name:
-        query += "AND member_name=? "
-        params.append(member_name)
-    query += "ORDER BY timestamp DESC LIMIT 50"
-    
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    
-    if not rows:
+    limit = TRANSACTION_PAGE_SIZES.get(device_type, 20)
+    page = cached_report(group_id, "transactions", get_transactions_page,
+                         member_name, action, start_date, end_date, None, "next", limit)
+    if not page["transactions"]:
         print("❌ No transactions found")
         return
     
-    for row in rows:
-        action_icon = {
-            "CONTRIBUTION": "💰",
-            "PAYMENT_SENT": "📤",
-            "PAYMENT_RECEIVED": "📥",
-            "ROUND_RECEIVED": "🎯"
-        }.get(row['action'], "📝")
+    while True:
+        for row in page["transactions"]:
+            action_icon = TRANSACTION_ICONS.get(row['action'], "📝")
+            print(f"{row['timestamp'][:16]} {action_icon} {row['member_name']} - {row['action']} {format_currency(row['amount'])}")
         
-        print(f"{row['timestamp'][:16]} {action_icon} {row['member_name']} - {row['action']} {format_currency(row['amount'])}")
+        options = []
+        if page["next_cursor"]:
+            options.append("N. Next page")
+        if page["prev_cursor"]:
+            options.append("P. Previous page")
+        if not options:
+            return
+        options.append("0. Back")
+        print("\n" + "  ".join(options))
+        
+        choice = input("📥 Choose: ").strip().upper()
+        if choice == "N" and page["next_cursor"]:
+            cursor, direction = page["next_cursor"], "next"
+        elif choice == "P" and page["prev_cursor"]:
+            cursor, direction = page["prev_cursor"], "prev"
+        else:
+            return
+        
+        page = cached_report(group_id, "transactions", get_transactions_page,
+                             member_name, action, start_date, end_date, cursor, direction, limit)
+        print()
 
 # ==================== REPORT EXPORT ====================
-def export_transactions_to_csv(group_id: str) -> str:
-    conn = get_db_connection()
-    c = conn.cursor()
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = ("csv", "jsonl")
+
+def stream_transactions_export(group_id: str, fmt: str = "csv", compress: bool = False,
+                               start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               since_id: Optional[int] = None, out_dir: str = ".") -> Dict[str, Any]:
+    # Rows go from the cursor to the file in fetchmany() batches, so memory
+    # stays flat however large the ledger is. With since_id the export is a
+    # delta in id order and last_id is the watermark for the next run.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    
+    query = LEDGER_SELECT + "WHERE t.group_key=? "
+    params: List[Any] = []
+    if since_id is not None:
+        query += "AND t.id > ? "
+        params.append(since_id)
+    if start_date:
+        query += "AND t.timestamp >= ? "
+        params.append(start_date)
+    if end_date:
+        query += "AND t.timestamp <= ? "
+        params.append(f"{end_date}T23:59:59.999999" if len(end_date) == 10 else end_date)
+    query += "ORDER BY t.id ASC" if since_id is not None else "ORDER BY t.timestamp DESC, t.id DESC"
+    
+    result = {"filename": None, "rows": 0, "last_id": since_id}
+    with connection_manager.connection() as conn:
+        group_key = get_group_key(conn, group_id)
+        if group_key is None:
+            return result
+        params.insert(0, group_key)
+        c = conn.cursor()
+        c.execute(query, params)
+        batch = c.fetchmany(EXPORT_BATCH_SIZE)
+        if not batch:
+            return result
+        
+        fieldnames = [column[0] for column in c.description]
+        filename = os.path.join(out_dir, f"vicoba_transactions_{group_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}")
+        if compress:
+            filename += ".gz"
+            output = gzip.open(filename, 'wt', newline='', encoding='utf-8')
+        else:
+            output = open(filename, 'w', newline='', encoding='utf-8')
+        
+        with output:
+            if fmt == "csv":
+                writer = csv.writer(output)
+                writer.writerow(fieldnames)
+            while batch:
+                if fmt == "csv":
+                    writer.writerows(batch)
+                else:
+                    output.writelines(json.dumps(dict(zip(fieldnames, row))) + "\n" for row in batch)
+                result["rows"] += len(batch)
+                result["last_id"] = max(result["last_id"] or 0, max(row["id"] for row in batch))
+                batch = c.fetchmany(EXPORT_BATCH_SIZE)
+    
+    result["filename"] = filename
+    return result
+
+def export_transactions_to_csv(group_id: str, fmt: str = "csv", compress: bool = False,
+                               start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               since_id: Optional[int] = None) -> str:
+    try:
+        result = stream_transactions_export(group_id, fmt, compress, start_date, end_date, since_id)
+    except Exception as e:
+        return f"❌ Export failed: {e}"
     
+    if not result["rows"]:
+        return "❌ No transactions to export"
+    return f"✅ Transactions exported to {result['filename']} ({result['rows']} rows, last id {result['last_id']})"
+
+# ==================== BULK INGESTION ====================
+INGEST_BATCH_SIZE = 5000
+INGEST_MAX_REJECTS = 1000  # rejected rows kept in the summary
+
+def open_ingest_file(path: str):
+    return gzip.open(path, 'rt', newline='', encoding='utf-8') if path.endswith(".gz") \
+        else open(path, newline='', encoding='utf-8')
+
+def iter_ingest_rows(path: str):
+    # (line, row) pairs; JSON Lines or a JSON array by extension, otherwise
+    # CSV with a header. For a JSON array "line" is the 1-based item number.
+    name = path[:-3] if path.endswith(".gz") else path
+    with open_ingest_file(path) as f:
+        if name.endswith(".json"):
+            yield from enumerate(json.load(f), 1)
+        elif name.endswith((".jsonl", ".ndjson")):
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except ValueError:
+                        yield line_no, None
+        else:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+
+def parse_amount(value: Any) -> int:
+    # Statements write "1,500" or "1500.00"; fractional shillings are rejected
+    try:
+        amount = float(str(value).replace(",", "").strip())
+    except (ValueError, TypeError):
+        return 0
+    return int(amount) if amount.is_integer() else 0
+
+def validate_ingest_row(row: Any, now: str) -> Union[tuple, str]:
+    # Returns the staged tuple, or the reason the row is rejected
+    if not isinstance(row, dict):
+        return "unreadable row"
+    group_id = str(row.get("group_id") or "").strip()
+    member = str(row.get("member") or "").strip()
+    if not validate_group_id(group_id):
+        return "invalid group_id"
+    if validate_phone(member):
+        is_phone = 1
+    elif validate_name(member):
+        is_phone = 0
+    else:
+        return "invalid member"
+    amount = parse_amount(row.get("amount"))
+    if amount <= 0:
+        return "invalid amount"
+    timestamp = str(row.get("timestamp") or "").strip()
+    if timestamp:
+        try:
+            timestamp = datetime.fromisoformat(timestamp).isoformat()
+        except ValueError:
+            return "invalid timestamp"
+    reference = str(row.get("reference") or "").strip() or None
+    return group_id, member, is_phone, amount, timestamp or now, reference
+
+def ingest_batch(conn: sqlite3.Connection, batch: List[tuple]) -> Dict[str, Any]:
+    # One chunk, set-wise: stage, resolve members, drop duplicate references,
+    # then append the ledger and move balances and the open round in bulk.
+    c = conn.cursor()
     c.execute("""
-    SELECT * FROM transactions 
-    WHERE group_id=? 
-    ORDER BY timestamp DESC
-    """, (group_id,))
+        CREATE TEMP TABLE IF NOT EXISTS ingest_stage (
+            line INTEGER PRIMARY KEY,
+            group_id TEXT, member TEXT, is_phone INTEGER, amount INTEGER,
+            timestamp TEXT, reference TEXT,
+            group_key INTEGER, member_id INTEGER, member_name TEXT,
+            status TEXT NOT NULL DEFAULT 'ok'
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS temp.idx_ingest_stage_reference ON ingest_stage (group_key, reference)")
+    c.execute("DELETE FROM ingest_stage")
+    c.executemany("""
+        INSERT INTO ingest_stage (line, group_id, member, is_phone, amount, timestamp, reference)
+        VALUES (?,?,?,?,?,?,?)
+    """, batch)
     
-    transactions = [dict(row) for row in c.fetchall()]
-    conn.close()
+    c.execute("""
+        UPDATE ingest_stage SET member_id = m.member_id, member_name = m.member_name
+        FROM members m
+        WHERE ingest_stage.is_phone = 0 AND m.group_id = ingest_stage.group_id AND m.member_name = ingest_stage.member
+    """)
+    c.execute("""
+        UPDATE ingest_stage SET (member_id, member_name) = (
+            SELECT member_id, member_name FROM members m
+            WHERE m.group_id = ingest_stage.group_id AND m.phone = ingest_stage.member
+            ORDER BY m.member_no LIMIT 1
+        )
+        WHERE is_phone = 1
+    """)
+    c.execute("UPDATE ingest_stage SET status = 'member not found' WHERE member_id IS NULL")
     
-    if not transactions:
-        return "❌ No transactions to export"
+    c.execute("""
+        INSERT OR IGNORE INTO group_keys (group_id)
+        SELECT DISTINCT group_id FROM ingest_stage WHERE status = 'ok'
+    """)
+    c.execute("""
+        UPDATE ingest_stage SET group_key = g.group_key
+        FROM group_keys g WHERE g.group_id = ingest_stage.group_id
+    """)
+    c.execute("""
+        UPDATE ingest_stage SET status = 'duplicate reference'
+        WHERE status = 'ok' AND reference IS NOT NULL AND (
+            EXISTS (SELECT 1 FROM transactions t
+                    WHERE t.group_key = ingest_stage.group_key AND t.reference = ingest_stage.reference)
+            OR line > (SELECT MIN(s.line) FROM ingest_stage s
+                       WHERE s.group_key = ingest_stage.group_key AND s.reference = ingest_stage.reference
+                       AND s.status = 'ok')
+        )
+    """)
     
-    filename = f"vicoba_transactions_{group_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    c.execute("""
+        INSERT INTO transactions (group_key, member_id, action, amount, timestamp, round_id, reference)
+        SELECT group_key, member_id, 'CONTRIBUTION', amount, timestamp, NULL, reference
+        FROM ingest_stage WHERE status = 'ok' ORDER BY line
+    """)
+    inserted = c.rowcount
+    c.execute("""
+        UPDATE members SET total_contributions = total_contributions + s.total
+        FROM (SELECT member_id, SUM(amount) AS total FROM ingest_stage WHERE status = 'ok' GROUP BY member_id) AS s
+        WHERE members.member_id = s.member_id
+    """)
+    c.execute("""
+        INSERT INTO current_round (group_id, member_name, contributed)
+        SELECT group_id, member_name, SUM(amount) FROM ingest_stage
+        WHERE status = 'ok' GROUP BY group_id, member_name
+        ON CONFLICT (group_id, member_name) DO UPDATE SET contributed = contributed + excluded.contributed
+    """)
     
+    groups = [row[0] for row in c.execute("SELECT DISTINCT group_id FROM ingest_stage WHERE status = 'ok'")]
+    rejected = c.execute("SELECT line, status FROM ingest_stage WHERE status != 'ok' ORDER BY line").fetchall()
+    return {"inserted": inserted, "groups": groups, "rejected": [tuple(row) for row in rejected]}
+
+def ingest_contributions(path: str, batch_size: int = INGEST_BATCH_SIZE) -> Dict[str, Any]:
+    """Stream contribution rows (group_id, member, amount, timestamp, reference)
+    from a CSV or JSONL file into the ledger in chunked transactions.
+    
+    member is a name or phone. Rows whose reference is already in the group's
+    ledger are skipped, so a statement can be re-imported safely. Each
+    affected group gets one round-finalization check at the end.
+    """
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {"rows": 0, "inserted": 0, "rejected": 0, "rejects": [],
+                               "groups": 0, "rounds_completed": []}
+    groups: set = set()
+    now = datetime.now().isoformat()
+    
+    def reject(line_no: int, reason: str) -> None:
+        # Database rejects arrive with their batch, after validation rejects
+        # for later lines; keeping the lowest lines seen is still exact
+        summary["rejected"] += 1
+        summary["rejects"].append((line_no, reason))
+        if len(summary["rejects"]) >= 2 * INGEST_MAX_REJECTS:
+            summary["rejects"] = sorted(summary["rejects"])[:INGEST_MAX_REJECTS]
+    
+    def flush(batch: List[tuple]) -> None:
+        with connection_manager.transaction(immediate=True) as conn:
+            result = ingest_batch(conn, batch)
+            for group_id in result["groups"]:
+                invalidate_members(group_id)
+        summary["inserted"] += result["inserted"]
+        groups.update(result["groups"])
+        for line_no, reason in result["rejected"]:
+            reject(line_no, reason)
+    
+    batch: List[tuple] = []
+    for line_no, row in iter_ingest_rows(path):
+        summary["rows"] += 1
+        staged = validate_ingest_row(row, now)
+        if isinstance(staged, str):
+            reject(line_no, staged)
+            continue
+        batch.append((line_no,) + staged)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    summary["rejects"] = sorted(summary["rejects"])[:INGEST_MAX_REJECTS]
+    
+    for group_id in sorted(groups):
+        completed = finalize_round_if_complete(group_id)
+        if completed:
+            summary["rounds_completed"].append(dict(completed, group_id=group_id))
+    summary["groups"] = len(groups)
+    summary["elapsed"] = round(time.perf_counter() - started, 3)
+    return summary
+
+def import_contributions(path: str, batch_size: int = INGEST_BATCH_SIZE) -> str:
+    try:
+        summary = ingest_contributions(path, batch_size)
+    except (OSError, csv.Error, sqlite3.Error) as e:
+        return f"❌ Import failed: {e}"
+    
+    lines = [f"✅ Imported {summary['inserted']:,} of {summary['rows']:,} rows into "
+             f"{summary['groups']} groups in {summary['elapsed']}s"]
+    if summary["rejected"]:
+        lines.append(f"⚠️  {summary['rejected']:,} rows rejected:")
+        lines.extend(f"  line {line_no}: {reason}" for line_no, reason in summary["rejects"][:20])
+    for completed in summary["rounds_completed"]:
+        lines.append(get_message("round_completed").format(
+            recipient=completed["recipient"], amount=format_currency(completed["amount"])
+        ) + f" ({completed['group_id']})")
+    return "\n".join(lines)
+
+# ==================== ROSTER IMPORT ====================
+def validate_roster_row(row: Any, default_group: Optional[str]) -> Union[tuple, str]:
+    if not isinstance(row, dict):
+        return "unreadable row"
+    group_id = str(row.get("group_id") or default_group or "").strip()
+    name = str(row.get("member_name") or row.get("name") or "").strip()
+    phone = str(row.get("phone") or "").strip()
+    if not validate_group_id(group_id):
+        return get_message("invalid_group")
+    if not validate_name(name):
+        return get_message("invalid_name")
+    if phone and not validate_phone(phone):
+        return get_message("invalid_phone")
+    return group_id, name, phone
+
+def import_roster(path: str, group_id: Optional[str] = None) -> Dict[str, Any]:
+    """Validate a roster file (name, phone and optional group_id per row) and
+    add every valid new member in one transaction.
+    
+    Names (case-insensitively) and phones must be unique per group, both
+    within the file and against existing members. Rejected rows come back as
+    (line, reason) pairs; they do not stop the valid rows.
+    """
+    started = time.perf_counter()
+    errors: List[tuple] = []
+    rows: List[tuple] = []
+    seen_names: Dict[tuple, int] = {}
+    seen_phones: Dict[tuple, int] = {}
+    
+    total = 0
+    for line_no, row in iter_ingest_rows(path):
+        total += 1
+        checked = validate_roster_row(row, group_id)
+        if isinstance(checked, str):
+            errors.append((line_no, checked))
+            continue
+        gid, name, phone = checked
+        first = seen_names.setdefault((gid, name.lower()), line_no)
+        if first != line_no:
+            errors.append((line_no, f"duplicate of line {first}"))
+            continue
+        if phone:
+            first = seen_phones.setdefault((gid, phone), line_no)
+            if first != line_no:
+                errors.append((line_no, f"phone already used on line {first}"))
+                continue
+        rows.append((line_no, gid, name, phone))
+    
+    added = 0
+    groups: List[str] = []
+    if rows:
+        keys = json.dumps([[gid, name, phone] for _, gid, name, phone in rows])
+        with connection_manager.transaction(immediate=True) as conn:
+            # One round trip finds every clash with the existing roster
+            clashes = conn.execute("""
+                SELECT 'name' AS kind, m.group_id, lower(m.member_name) AS value
+                FROM json_each(?) j
+                JOIN members m ON m.group_id = json_extract(j.value, '$[0]')
+                 AND m.member_name = json_extract(j.value, '$[1]') COLLATE NOCASE
+                UNION
+                SELECT 'phone', m.group_id, m.phone
+                FROM json_each(?) j
+                JOIN members m ON m.group_id = json_extract(j.value, '$[0]')
+                 AND m.phone = json_extract(j.value, '$[2]')
+                WHERE json_extract(j.value, '$[2]') != ''
+            """, (keys, keys)).fetchall()
+            taken = {(row["kind"], row["group_id"], row["value"]) for row in clashes}
+            
+            valid = []
+            for line_no, gid, name, phone in rows:
+                if ("name", gid, name.lower()) in taken:
+                    errors.append((line_no, get_message("member_exists")))
+                elif phone and ("phone", gid, phone) in taken:
+                    errors.append((line_no, "❌ Phone already registered in group"))
+                else:
+                    valid.append((gid, name, phone))
+            # Only groups that actually gain members are reported and invalidated
+            groups = sorted({gid for gid, _, _ in valid})
+            
+            next_no = dict(conn.execute(f"""
+                SELECT group_id, COALESCE(MAX(member_no), 0) FROM members
+                WHERE group_id IN ({",".join("?" * len(groups))}) GROUP BY group_id
+            """, groups).fetchall())
+            inserts = []
+            for gid, name, phone in valid:
+                next_no[gid] = next_no.get(gid, 0) + 1
+                inserts.append((name, phone, gid, next_no[gid]))
+            conn.executemany("""
+                INSERT INTO members (member_name, phone, total_contributions, total_received, group_id, member_no)
+                VALUES (?,?,0,0,?,?)
+            """, inserts)
+            added = len(inserts)
+            
+            # Groups with a running rotation queue the newcomers at the back
+            conn.execute("""
+                INSERT INTO rotation_schedule (group_id, cycle, position, member_name)
+                SELECT st.group_id, st.cycle,
+                       (SELECT MAX(position) FROM rotation_schedule s WHERE s.group_id=st.group_id AND s.cycle=st.cycle)
+                       + ROW_NUMBER() OVER (PARTITION BY st.group_id ORDER BY j.key),
+                       json_extract(j.value, '$[1]')
+                FROM json_each(?) j
+                JOIN rotation_state st ON st.group_id = json_extract(j.value, '$[0]')
+            """, (json.dumps([[gid, name] for gid, name, _ in valid]),))
+            for gid in groups:
+                invalidate_members(gid)
+                invalidate_on_commit(member_search_cache, gid)
+    
+    errors.sort()
+    return {"rows": total, "added": added, "groups": groups, "errors": errors,
+            "elapsed": round(time.perf_counter() - started, 3)}
+
+def onboard_members(path: str, group_id: Optional[str] = None) -> str:
+    try:
+        summary = import_roster(path, group_id)
+    except (OSError, ValueError, csv.Error, sqlite3.Error) as e:
+        return f"❌ Roster import failed: {e}"
+    
+    lines = [f"✅ Added {summary['added']:,} of {summary['rows']:,} members to "
+             f"{len(summary['groups'])} groups in {summary['elapsed']}s"]
+    if summary["errors"]:
+        lines.append(f"⚠️  {len(summary['errors']):,} rows rejected:")
+        lines.extend(f"  line {line_no}: {reason}" for line_no, reason in summary["errors"])
+    return "\n".join(lines)
+
+# ==================== BATCH JOBS ====================
+# Nightly per-group jobs for the CLI. Each group is independent, so a run
+# fans out over a process pool; every worker opens its own connections.
+BATCH_JOBS = ("finalize", "export", "summarize")
+
+def list_group_ids() -> List[str]:
+    # Groups from before the groups table only appear on their members
+    with connection_manager.connection() as conn:
+        rows = conn.execute("SELECT group_id FROM groups UNION SELECT group_id FROM members ORDER BY 1").fetchall()
+    return [row["group_id"] for row in rows]
+
+def rebuild_group_totals(group_id: str) -> Dict[str, int]:
+    # Member balances and the open round are caches of the ledger; rebuild
+    # them from it and report how many rows had drifted.
+    actions = {column: [a for a, c in LEDGER_BALANCE_COLUMNS.items() if c == column]
+               for column in ("total_contributions", "total_received")}
+    with connection_manager.transaction(immediate=True) as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            UPDATE members SET total_contributions = s.contributions, total_received = s.received
+            FROM (
+                SELECT m.member_id,
+                       COALESCE(SUM(t.amount) FILTER (WHERE t.action IN ({",".join("?" * len(actions["total_contributions"]))})), 0)
+                           AS contributions,
+                       COALESCE(SUM(t.amount) FILTER (WHERE t.action IN ({",".join("?" * len(actions["total_received"]))})), 0)
+                           AS received
+                FROM members m LEFT JOIN transactions t ON t.member_id = m.member_id
+                WHERE m.group_id = ?
+                GROUP BY m.member_id
+            ) AS s
+            WHERE members.member_id = s.member_id
+              AND (members.total_contributions != s.contributions OR members.total_received != s.received)
+        """, actions["total_contributions"] + actions["total_received"] + [group_id])
+        members_fixed = c.rowcount
+        
+        c.execute("""
+            SELECT m.member_name, SUM(t.amount) AS contributed
+            FROM transactions t JOIN members m ON m.member_id = t.member_id
+            WHERE t.group_key = ? AND t.action = 'CONTRIBUTION' AND t.round_id IS NULL
+            GROUP BY t.member_id
+        """, (get_group_key(conn, group_id),))
+        expected = {row["member_name"]: row["contributed"] for row in c.fetchall()}
+        c.execute("SELECT member_name, contributed FROM current_round WHERE group_id=?", (group_id,))
+        actual = {row["member_name"]: row["contributed"] for row in c.fetchall()}
+        round_fixed = sum(1 for name in expected.keys() | actual.keys() if expected.get(name) != actual.get(name))
+        if round_fixed:
+            c.execute("DELETE FROM current_round WHERE group_id=?", (group_id,))
+            c.executemany("INSERT INTO current_round (group_id, member_name, contributed) VALUES (?,?,?)",
+                          [(group_id, name, amount) for name, amount in expected.items()])
+        if members_fixed or round_fixed:
+            invalidate_members(group_id)
+    return {"members_fixed": members_fixed, "round_fixed": round_fixed}
+
+def run_group_job(job: str, group_id: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"group_id": group_id, "ok": True}
     try:
-        with open(filename, 'w', newline='') as csvfile:
-            fieldnames = transactions[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(transactions)
-        return f"✅ Transactions exported to {filename}"
+        if job == "finalize":
+            completed = finalize_round_if_complete(group_id)
+            result["finalized"] = completed is not None
+            result.update(completed or {})
+        elif job == "export":
+            export = stream_transactions_export(group_id, options.get("format", "csv"), options.get("gzip", False),
+                                                since_id=options.get("since_id"), out_dir=options.get("out_dir", "."))
+            result.update(rows=export["rows"], filename=export["filename"])
+        elif job == "summarize":
+            result.update(rebuild_group_totals(group_id))
+        else:
+            raise ValueError(f"Unknown batch job: {job}")
     except Exception as e:
-        return f"❌ Export failed: {e}"
+        result.update(ok=False, error=str(e))
+    return result
+
+def init_batch_worker(db_file: str) -> None:
+    # Spawned workers re-import the module; forked ones inherit DB_FILE anyway
+    global DB_FILE
+    DB_FILE = db_file
+
+def describe_group_result(job: str, result: Dict[str, Any]) -> str:
+    if not result["ok"]:
+        return f"❌ {result['group_id']}: {result['error']}"
+    if job == "finalize":
+        if not result["finalized"]:
+            return f"➖ {result['group_id']}: round still open"
+        return f"✅ {result['group_id']}: round {result['round_id']} paid {format_currency(result['amount'])} to {result['recipient']}"
+    if job == "export":
+        if not result["rows"]:
+            return f"➖ {result['group_id']}: no transactions"
+        return f"✅ {result['group_id']}: {result['rows']} rows to {result['filename']}"
+    fixed = result["members_fixed"] + result["round_fixed"]
+    return f"{'✅' if fixed else '➖'} {result['group_id']}: {result['members_fixed']} balances, {result['round_fixed']} round rows corrected"
+
+def run_batch(job: str, group_ids: List[str], options: Optional[Dict[str, Any]] = None,
+              jobs: Optional[int] = None, echo: bool = True) -> Dict[str, Any]:
+    """Run one batch job over many groups in a process pool.
+    
+    Returns a summary with per-group results in input order. jobs defaults
+    to the CPU count; jobs=1 runs in this process.
+    """
+    options = options or {}
+    jobs = jobs or os.cpu_count() or 1
+    started = time.perf_counter()
+    results = []
+    if jobs == 1 or len(group_ids) <= 1:
+        outcomes = (run_group_job(job, gid, options) for gid in group_ids)
+        pool = None
+    else:
+        # Connections must not cross fork(); workers open their own
+        connection_manager.close_all()
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=init_batch_worker, initargs=(DB_FILE,))
+        chunksize = max(1, min(64, len(group_ids) // (jobs * 4)))
+        outcomes = pool.map(run_group_job, [job] * len(group_ids), group_ids,
+                            [options] * len(group_ids), chunksize=chunksize)
+    try:
+        for result in outcomes:
+            results.append(result)
+            if echo:
+                print(describe_group_result(job, result))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    
+    failed = [r["group_id"] for r in results if not r["ok"]]
+    summary = {
+        "job": job,
+        "groups": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": failed,
+        "workers": 1 if pool is None else jobs,
+        "elapsed_sec": round(time.perf_counter() - started, 3),
+        "results": results
+    }
+    if job == "finalize":
+        summary["rounds_finalized"] = sum(1 for r in results if r.get("finalized"))
+        summary["amount_paid"] = sum(r.get("amount", 0) for r in results if r.get("finalized"))
+    elif job == "export":
+        summary["rows_exported"] = sum(r.get("rows", 0) for r in results)
+    else:
+        summary["members_fixed"] = sum(r.get("members_fixed", 0) for r in results)
+        summary["round_fixed"] = sum(r.get("round_fixed", 0) for r in results)
+    return summary
 
 # ==================== NOTIFICATIONS ====================
-def simulate_notifications(group_id: str, message: str) -> None:
-    members = get_all_members(group_id)
-    for member in members:
-        phone = member.get("phone")
-        if phone:
-            print(f"📱 [SIMULATED SMS to {phone}]: {message}")
+# Messages are written to notification_outbox in the caller's transaction
+# and delivered later by notification_dispatcher, so a round closing for a
+# large group costs one INSERT ... SELECT on the request path. The dispatcher
+# runs under `notify`, `serve` and `scheduler`, not the interactive app.
+NOTIFICATIONS_ENABLED = True
+NOTIFY_BATCH_SIZE = 200  # outbox rows claimed per pass
+NOTIFY_POLL_INTERVAL = 1.0  # seconds; enqueues in this process wake the dispatcher sooner
+NOTIFY_MAX_ATTEMPTS = 6
+NOTIFY_RETRY_BASE = 30  # seconds before the first retry, doubling after each failure
+NOTIFY_RETRY_MAX = 3600
+NOTIFY_LEASE = 300  # seconds a claimed row stays SENDING before another dispatcher may take it over
+# Channel -> transport name; route SMS to "smtp" to watch it on a local SMTP debugging server
+NOTIFICATION_ROUTES = {"SMS": "sms"}
+SMTP_HOST = "localhost"
+SMTP_PORT = 1025
+SMTP_SENDER = "notifications@vicoba.local"
+SMTP_SMS_DOMAIN = "sms.vicoba.local"  # email-to-SMS gateway address for a phone
+
+class SMSStubTransport:
+    """Prints messages instead of calling an SMS aggregator."""
+
+    name = "sms"
+
+    def __init__(self, sender: str = "VICOBA", rate: float = 50.0, batch_size: int = 50):
+        self.sender = sender
+        self.rate = rate  # messages per second for this sender
+        self.batch_size = batch_size
+
+    def send_batch(self, messages: List[Dict[str, Any]]) -> List[Optional[str]]:
+        # One entry per message: None when sent, else the error
+        for message in messages:
+            print(f"📱 [SIMULATED SMS to {message['recipient']}]: {message['body']}")
+        return [None] * len(messages)
+
+class SMTPTransport:
+    """Sends each batch over one SMTP session, addressed via an email-to-SMS gateway."""
+
+    name = "smtp"
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, sender: str = SMTP_SENDER,
+                 domain: str = SMTP_SMS_DOMAIN, rate: float = 10.0, batch_size: int = 20):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.domain = domain
+        self.rate = rate
+        self.batch_size = batch_size
+
+    def send_batch(self, messages: List[Dict[str, Any]]) -> List[Optional[str]]:
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=10)
+        except OSError as e:
+            return [f"SMTP connect failed: {e}"] * len(messages)
+        errors: List[Optional[str]] = []
+        with smtp:
+            for message in messages:
+                recipient = message["recipient"]
+                if "@" not in recipient:
+                    recipient = f"{recipient}@{self.domain}"
+                body = (f"From: {self.sender}\r\nTo: {recipient}\r\n"
+                        f"Subject: {APP_NAME} ({message['group_id']})\r\n"
+                        f"Content-Type: text/plain; charset=utf-8\r\n\r\n{message['body']}")
+                try:
+                    smtp.sendmail(self.sender, [recipient], body.encode("utf-8"))
+                    errors.append(None)
+                except smtplib.SMTPException as e:
+                    errors.append(f"SMTP send failed: {e}")
+        return errors
+
+notification_transports: Dict[str, Any] = {"sms": SMSStubTransport(), "smtp": SMTPTransport()}
+
+def register_transport(transport: Any) -> None:
+    # Anything with name, sender, rate, batch_size and send_batch(messages)
+    notification_transports[transport.name] = transport
+
+def enqueue_notifications(conn: sqlite3.Connection, group_id: str, message: str,
+                          names: Optional[List[str]] = None, channel: str = "SMS") -> int:
+    # Joins the caller's transaction; the dispatcher is woken once it commits
+    query = """
+        INSERT INTO notification_outbox (group_id, channel, recipient, body, next_attempt_at, created_at)
+        SELECT group_id, ?, phone, ?, ?, ? FROM members
+        WHERE group_id=? AND COALESCE(phone, '') != ''
+    """
+    params: List[Any] = [channel, message, time.time(), datetime.now().isoformat(), group_id]
+    if names is not None:
+        query += "AND member_name IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(names))
+    queued = conn.execute(query, params).rowcount
+    if queued:
+        connection_manager.after_commit(notification_dispatcher.wake)
+    return queued
+
+def notify_members(group_id: str, message: str, names: Optional[List[str]] = None) -> int:
+    with connection_manager.transaction() as conn:
+        return enqueue_notifications(conn, group_id, message, names)
+
+def get_outbox_counts() -> Dict[str, int]:
+    with connection_manager.connection() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) AS n FROM notification_outbox GROUP BY status").fetchall()
+    return {row["status"]: row["n"] for row in rows}
+
+class RateLimiter:
+    """Async token bucket: `rate` messages per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, count: int = 1) -> None:
+        count = min(count, self.burst)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= count:
+                    self._tokens -= count
+                    return
+                await asyncio.sleep((count - self._tokens) / self.rate)
+
+class NotificationDispatcher:
+    """Delivers the outbox from an asyncio loop on its own thread.
+    
+    Each pass claims due rows (PENDING -> SENDING), groups them by transport
+    and sends every transport's share in batches, concurrently across
+    transports. Batches wait on a token bucket per sender. Failed messages
+    go back to PENDING with exponential backoff until NOTIFY_MAX_ATTEMPTS,
+    then FAILED. Transports and SQLite are blocking, so both run in the
+    loop's default executor. Several dispatchers may share a database:
+    claims are atomic, and a claimed row is only requeued once its lease
+    has expired (its dispatcher died or stalled).
+    """
+
+    def __init__(self, batch_size: int = NOTIFY_BATCH_SIZE, poll_interval: float = NOTIFY_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake_event: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._limiters: Dict[str, RateLimiter] = {}
+        self.counts = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                ready = threading.Event()
+                self._thread = threading.Thread(target=asyncio.run, args=(self._serve(ready),),
+                                                name="vicoba-notifications", daemon=True)
+                self._thread.start()
+                ready.wait()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self.wake()
+            thread.join()
+
+    def wake(self) -> None:
+        loop, event = self._loop, self._wake_event
+        if loop is not None and event is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts)
+
+    def flush(self) -> int:
+        # Synchronous drain for the CLI and tests; not while the thread runs
+        self._limiters = {}  # asyncio locks belong to the loop that made them
+        return asyncio.run(self.drain())
+
+    async def drain(self) -> int:
+        loop = asyncio.get_running_loop()
+        delivered = 0
+        await loop.run_in_executor(None, self._requeue_stale)
+        while True:
+            rows = await loop.run_in_executor(None, self._claim)
+            if not rows:
+                return delivered
+            by_transport: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_transport.setdefault(NOTIFICATION_ROUTES.get(row["channel"], ""), []).append(row)
+            await asyncio.gather(*(self._deliver(name, messages) for name, messages in by_transport.items()))
+            delivered += len(rows)
+
+    async def _deliver(self, transport_name: str, messages: List[Dict[str, Any]]) -> None:
+        loop = asyncio.get_running_loop()
+        transport = notification_transports.get(transport_name)
+        if transport is None:
+            self._count(await loop.run_in_executor(
+                None, self._record, messages, [f"No transport for channel {messages[0]['channel']}"] * len(messages)))
+            return
+        limiter = self._limiters.get(transport.sender)
+        if limiter is None:
+            limiter = self._limiters[transport.sender] = RateLimiter(transport.rate, transport.batch_size)
+        for i in range(0, len(messages), transport.batch_size):
+            batch = messages[i:i + transport.batch_size]
+            await limiter.acquire(len(batch))
+            try:
+                errors = await loop.run_in_executor(None, transport.send_batch, batch)
+            except Exception as e:
+                errors = [f"{transport_name} transport failed: {e}"] * len(batch)
+            self.counts["batches"] += 1
+            self._count(await loop.run_in_executor(None, self._record, batch, errors))
+
+    def _count(self, outcome: tuple) -> None:
+        # Only called on the loop thread
+        for key, value in zip(("sent", "retried", "failed"), outcome):
+            self.counts[key] += value
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with connection_manager.transaction(immediate=True) as conn:
+            rows = conn.execute("""
+                UPDATE notification_outbox
+                SET status='SENDING', attempts = attempts + 1, lease_expires_at = ?
+                WHERE id IN (
+                    SELECT id FROM notification_outbox
+                    WHERE status='PENDING' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at LIMIT ?
+                )
+                RETURNING id, group_id, channel, recipient, body, attempts
+            """, (now + NOTIFY_LEASE, now, self.batch_size)).fetchall()
+        return [dict(row) for row in rows]
+
+    def _record(self, messages: List[Dict[str, Any]], errors: List[Optional[str]]) -> tuple:
+        now = time.time()
+        sent, retry, failed = [], [], []
+        for message, error in zip(messages, errors):
+            if error is None:
+                sent.append((datetime.now().isoformat(), message["id"]))
+            elif message["attempts"] >= NOTIFY_MAX_ATTEMPTS:
+                failed.append((error, message["id"]))
+            else:
+                delay = min(NOTIFY_RETRY_MAX, NOTIFY_RETRY_BASE * 2 ** (message["attempts"] - 1))
+                retry.append((now + delay, error, message["id"]))
+        with connection_manager.transaction() as conn:
+            conn.executemany("""UPDATE notification_outbox
+                                SET status='SENT', sent_at=?, last_error=NULL, lease_expires_at=NULL
+                                WHERE id=?""", sent)
+            conn.executemany("""UPDATE notification_outbox
+                                SET status='PENDING', next_attempt_at=?, last_error=?, lease_expires_at=NULL
+                                WHERE id=?""", retry)
+            conn.executemany("""UPDATE notification_outbox SET status='FAILED', last_error=?, lease_expires_at=NULL
+                                WHERE id=?""", failed)
+        return len(sent), len(retry), len(failed)
+
+    async def _serve(self, ready: threading.Event) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop, self._wake_event = loop, asyncio.Event()
+        self._limiters = {}
+        ready.set()
+        try:
+            while not self._stopping:
+                try:
+                    await self.drain()
+                except Exception as e:
+                    print(f"❌ Notification dispatch failed: {e}")
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake_event.clear()
+        finally:
+            self._loop = self._wake_event = None
+
+    def _requeue_stale(self) -> None:
+        # An expired lease means its dispatcher crashed or hung mid-send; the
+        # batch may or may not have gone out, so it is sent again
+        with connection_manager.connection() as conn:
+            conn.execute("""
+                UPDATE notification_outbox SET status='PENDING', lease_expires_at=NULL
+                WHERE status='SENDING' AND (lease_expires_at <= ? OR lease_expires_at IS NULL)
+            """, (time.time(),))
+
+notification_dispatcher = NotificationDispatcher()
+
+# ==================== SCHEDULER ====================
+SCHEDULER_ENABLED = False
+SCHEDULER_TICK = 30  # seconds between checks for due groups
+SCHEDULER_MAX_CONCURRENT = 4  # groups worked on at once
+# Groups meeting at the same hour start spread over this many seconds; the
+# offset is derived from the group ID, so it is stable across restarts
+SCHEDULER_JITTER = 900
+SCHEDULER_REMINDER_LEAD = 24 * 3600  # seconds before the meeting
+SCHEDULER_REPORT_DIR = "reports"
+WEEKDAYS = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+
+def next_meeting_time(frequency: str, day: int, hour: int, after: datetime) -> datetime:
+    # WEEKLY: day is 0 (Monday) to 6; MONTHLY: day of the month, 1 to 28
+    candidate = after.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if frequency == "WEEKLY":
+        candidate += timedelta(days=(day - candidate.weekday()) % 7)
+        if candidate <= after:
+            candidate += timedelta(days=7)
+    else:
+        candidate = candidate.replace(day=day)
+        if candidate <= after:
+            years, month = divmod(candidate.month, 12)
+            candidate = candidate.replace(year=candidate.year + years, month=month + 1)
+    return candidate
+
+def schedule_jitter(group_id: str, window: int = SCHEDULER_JITTER) -> timedelta:
+    digest = hashlib.sha256(group_id.encode()).digest()
+    return timedelta(seconds=int.from_bytes(digest[:4], "big") % window if window > 0 else 0)
+
+def set_group_schedule(group_id: str, frequency: str, day: int, hour: int = 9) -> str:
+    if not validate_group_id(group_id):
+        return f"❌ {get_message('invalid_group')}"
+    with connection_manager.connection() as conn:
+        # Groups with ledger rows have a key; newly created ones only a groups row
+        known = conn.execute("""
+            SELECT 1 FROM group_keys WHERE group_id=? UNION ALL SELECT 1 FROM groups WHERE group_id=?
+        """, (group_id, group_id)).fetchone()
+    if not known:
+        return f"❌ Group {group_id} not found"
+    frequency = frequency.upper()
+    if frequency not in ("WEEKLY", "MONTHLY"):
+        return "❌ Frequency must be WEEKLY or MONTHLY"
+    if frequency == "WEEKLY" and not 0 <= day <= 6:
+        return "❌ Weekly meetings need a weekday"
+    if frequency == "MONTHLY" and not 1 <= day <= 28:
+        return "❌ Monthly meetings must fall on day 1-28"
+    if not 0 <= hour <= 23:
+        return "❌ Meeting hour must be 0-23"
+    
+    next_meeting = next_meeting_time(frequency, day, hour, datetime.now()).isoformat()
+    with connection_manager.connection() as conn:
+        conn.execute("""
+            INSERT INTO group_schedules (group_id, frequency, meeting_day, meeting_hour, next_meeting_at)
+            VALUES (?,?,?,?,?)
+            ON CONFLICT (group_id) DO UPDATE SET
+                frequency=excluded.frequency, meeting_day=excluded.meeting_day,
+                meeting_hour=excluded.meeting_hour, next_meeting_at=excluded.next_meeting_at
+        """, (group_id, frequency, day, hour, next_meeting))
+    when = WEEKDAYS[day].title() if frequency == "WEEKLY" else f"day {day}"
+    return f"✅ {group_id} meets {frequency.lower()} on {when} at {hour:02d}:00; next meeting {next_meeting[:16]}"
+
+def get_group_schedule(group_id: str) -> Optional[Dict[str, Any]]:
+    with connection_manager.connection() as conn:
+        row = conn.execute("SELECT * FROM group_schedules WHERE group_id=?", (group_id,)).fetchone()
+    return dict(row) if row else None
+
+def send_contribution_reminders(group_id: str, meeting_at: str) -> int:
+    pending = get_round_tracker(group_id)["pending"]
+    if pending:
+        notify_members(group_id, f"Reminder: please contribute before the "
+                       f"{group_id} meeting on {meeting_at[:16].replace('T', ' ')}", pending)
+    return len(pending)
+
+def run_meeting_tasks(group_id: str, schedule: Dict[str, Any]) -> Dict[str, Any]:
+    # Meeting day: close the round if the pot is complete, then write the
+    # ledger rows added since the last meeting to a report file
+    result: Dict[str, Any] = {"round": finalize_round_if_complete(group_id)}
+    
+    os.makedirs(SCHEDULER_REPORT_DIR, exist_ok=True)
+    export = stream_transactions_export(group_id, since_id=schedule["last_export_id"] or 0,
+                                        out_dir=SCHEDULER_REPORT_DIR)
+    result.update(report=export["filename"], report_rows=export["rows"])
+    with connection_manager.connection() as conn:
+        conn.execute("UPDATE group_schedules SET last_export_id=?, last_result=? WHERE group_id=?",
+                     (export["last_id"], json.dumps(result), group_id))
+    return result
+
+class GroupScheduler:
+    """Background thread that runs each group's meeting-day jobs when due.
+    
+    Every tick it reads the schedules whose next meeting (or reminder) has
+    come, shifted by the group's jitter, and hands them to a small worker
+    pool. A task is claimed with a conditional UPDATE before it runs, so two
+    schedulers on one database never run it twice and a restart does not
+    repeat work. Missed meetings are caught up once, not once per week.
+    """
+
+    def __init__(self, tick: float = SCHEDULER_TICK, max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+                 jitter: int = SCHEDULER_JITTER, reminder_lead: int = SCHEDULER_REMINDER_LEAD):
+        self.tick = tick
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.reminder_lead = timedelta(seconds=reminder_lead)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight: set = set()
+        # One pool for the scheduler's lifetime; its workers keep their connections
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="scheduler")
+        self.counts = {"reminders": 0, "meetings": 0, "rounds_finalized": 0, "failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="vicoba-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+        executor = self._executor
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="scheduler")
+        executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts, in_flight=len(self._in_flight))
+
+    def due_tasks(self, now: datetime) -> List[tuple]:
+        horizon = (now + self.reminder_lead).isoformat()
+        with connection_manager.connection() as conn:
+            rows = conn.execute("SELECT * FROM group_schedules WHERE next_meeting_at <= ? ORDER BY next_meeting_at",
+                                (horizon,)).fetchall()
+        tasks = []
+        for row in rows:
+            schedule = dict(row)
+            meeting_at = datetime.fromisoformat(schedule["next_meeting_at"]) + schedule_jitter(row["group_id"], self.jitter)
+            if meeting_at <= now:
+                tasks.append(("meeting", schedule))
+            elif meeting_at - self.reminder_lead <= now and schedule["reminded_for"] != schedule["next_meeting_at"]:
+                tasks.append(("reminder", schedule))
+        return tasks
+
+    def claim(self, task: str, schedule: Dict[str, Any], now: datetime) -> bool:
+        meeting_at = schedule["next_meeting_at"]
+        with connection_manager.connection() as conn:
+            if task == "reminder":
+                c = conn.execute("""
+                    UPDATE group_schedules SET reminded_for=next_meeting_at
+                    WHERE group_id=? AND next_meeting_at=? AND reminded_for IS NOT next_meeting_at
+                """, (schedule["group_id"], meeting_at))
+            else:
+                upcoming = next_meeting_time(schedule["frequency"], schedule["meeting_day"],
+                                             schedule["meeting_hour"], now).isoformat()
+                c = conn.execute("""
+                    UPDATE group_schedules SET next_meeting_at=?, last_meeting_at=next_meeting_at
+                    WHERE group_id=? AND next_meeting_at=?
+                """, (upcoming, schedule["group_id"], meeting_at))
+        return c.rowcount == 1
+
+    def run_pending(self, now: Optional[datetime] = None) -> int:
+        # One tick: at most max_concurrent groups run at once, the rest queue
+        now = now or datetime.now()
+        futures = []
+        for task, schedule in self.due_tasks(now):
+            group_id = schedule["group_id"]
+            with self._lock:
+                if group_id in self._in_flight:
+                    continue
+                self._in_flight.add(group_id)
+            futures.append(self._executor.submit(self._run_task, task, schedule, now))
+        return sum(f.result() for f in futures)
+
+    def _run_task(self, task: str, schedule: Dict[str, Any], now: datetime) -> int:
+        group_id = schedule["group_id"]
+        try:
+            if self._stopping.is_set() or not self.claim(task, schedule, now):
+                return 0
+            if task == "reminder":
+                sent = send_contribution_reminders(group_id, schedule["next_meeting_at"])
+                print(f"⏰ {group_id}: reminded {sent} pending members")
+                counts = {"reminders": 1}
+            else:
+                result = run_meeting_tasks(group_id, schedule)
+                print(f"⏰ {group_id}: meeting {schedule['next_meeting_at'][:16]} - "
+                      f"{'round closed' if result['round'] else 'round still open'}, "
+                      f"{result['report_rows']} rows reported")
+                counts = {"meetings": 1, "rounds_finalized": 1 if result["round"] else 0}
+        except Exception as e:
+            print(f"❌ Scheduled {task} for {group_id} failed: {e}")
+            counts = {"failures": 1}
+        finally:
+            with self._lock:
+                self._in_flight.discard(group_id)
+        with self._lock:
+            for key, value in counts.items():
+                self.counts[key] += value
+        return 1
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"❌ Scheduler tick failed: {e}")
+            self._stopping.wait(self.tick)
+
+scheduler = GroupScheduler()
 
 # ==================== MOBILE MONEY ====================
 class MobileMoneyService:
@@ -835,916 +3065,895 @@ class MobileMoneyService:
 
 mobile_money_service = MobileMoneyService()
 
-# ==================== MAIN APPLICATION ====================
-def main_app(user: Dict[str, Any], device_type: str) -> None:
-    if "current_group_id" not in user:
-        user["current_group_id"] = user["group_ids"][0] if user["group_ids"] else None
-    
-    group_id = user["current_group_id"]
-    if not group_id:
-        print("❌ No group assigned. Please manage groups.")
-        return
-    
-    print(f"\n🎉 Welcome! Group: {group_id}")
-    
-    while True:
-        show_menu("MAIN", device_type, user["role"])
-        choice = input("📥 Choose: ").strip()
-        
-        if choice == "1" and user["role"] == "MEMBER":
-            print(contribute(group_id, device_type))
-        elif choice == "1" and user["role"] == "ADMIN":
-            print(add_member(group_id, device_type))
-        elif choice == "2":
-            print(contribute(group_id, device_type))
-        elif choice == "3":
-            print(make_payment(group_id, device_type))
-        elif choice == "4":
-            view_round_tracker(group_id, device_type)
-        elif choice == "5":
-            view_member_summary(group_id, device_type)
-        elif choice == "6" and user["role"] == "MEMBER":
-            view_transactions(group_id, device_type)
-        elif choice == "6" and user["role"] == "ADMIN":
-            view_transactions(group_id, device_type)
-        elif choice == "7" and user["role"] == "MEMBER":
-            print(export_transactions_to_csv(group_id))
-        elif choice == "7" and user["role"] == "ADMIN":
-            result = manage_groups(user, device_type)
-            print(result)
-            group_id = user.get("current_group_id", group_id)
-        elif choice == "8" and user["role"] == "ADMIN":
-            print(export_transactions_to_csv(group_id))
-        elif choice == "9" and user["role"] == "ADMIN":
-            print("👋 Logging out...")
-            break
-        elif choice == "7" and user["role"] == "MEMBER":
-            print("👋 Logging out...")
-            break
-        else:
-            print("❌ Invalid choice")
+# ==================== SESSION STORE ====================
+USSD_SESSION_TTL = 180  # seconds; carriers drop idle USSD sessions after ~3 minutes
+USSD_MAX_SESSIONS = 100000
 
-def auth_flow(device_type: str) -> bool:
-    while True:
-        show_menu("AUTH", device_type)
-        choice = input("📥 Choose: ").strip()
-        
-        if choice == "1":
-            result = register_user(device_type)
-            print(result)
-        elif choice == "2":
-            user = login_user(device_type)
-            if user:
-                print(get_message("login_success"))
-                main_app(user, device_type)
-            else:
-                print(get_message("login_failed"))
-        elif choice == "0":
-            print("👋 Goodbye!")
-            return True  # Exit program
-        else:
-            print("❌ Invalid choice")
-    
-    return False
+class SessionStore:
+    """Bounded in-memory session map with TTL expiry and LRU eviction.
+    
+    Entries are ordered by last access, so expired sessions collect at the
+    front and are dropped as new ones arrive. With persist=True every write
+    is mirrored to the ussd_sessions table and misses fall back to it, so a
+    restarted gateway resumes sessions that are still within their TTL.
+    """
 
-# ==================== MAIN FUNCTION ====================
-def main():
-    try:
-        print(f"\n🎉 {APP_NAME}")
-        print("="*50)
-        
-        init_db()
-        
-        device_type = detect_device_type()
-        print(f"📱 Detected device: {device_type}")
-        
-        if device_type == "FEATURE_PHONE":
-            print("📟 USSD/SMS Mode")
-        else:
-            print("📱 Smartphone App Mode")
-        print("="*50)
+    def __init__(self, ttl: float = USSD_SESSION_TTL, max_sessions: int = USSD_MAX_SESSIONS,
+                 persist: bool = False):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.persist = persist
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                expires_at, session = entry
+                if expires_at > now:
+                    self._entries.move_to_end(session_id)
+                    self.stats["hits"] += 1
+                    return session
+                del self._entries[session_id]
+                self.stats["expired"] += 1
         
-        exit_program = False
-        while not exit_program:
-            exit_program = auth_flow(device_type)
-            
-    except KeyboardInterrupt:
-        print("\n\n⚠️  Program interrupted by user. Goodbye!")
-    except Exception as e:
-        print(f"❌ Unexpected error: {str(e)}")
-        print("📞 Please contact support if this persists.")
+        session = self._load(session_id, now) if self.persist else None
+        with self._lock:
+            self.stats["hits" if session else "misses"] += 1
+            if session:
+                self._entries[session_id] = (now + self.ttl, session)
+        return session
 
-# ==================== START APPLICATION ====================
-if __name__ == "__main__":
-    main()
+    def put(self, session: Dict[str, Any]) -> None:
+        now = time.time()
+        expires_at = now + self.ttl
+        session_id = session["session_id"]
+        with self._lock:
+            self._entries[session_id] = (expires_at, session)
+            self._entries.move_to_end(session_id)
+            self._trim(now)
+        if self.persist:
+            with connection_manager.connection() as conn:
+                conn.execute("""
+                    INSERT INTO ussd_sessions (session_id, phone, state, payload, expires_at) VALUES (?,?,?,?,?)
+                    ON CONFLICT (session_id) DO UPDATE SET
+                        state=excluded.state, payload=excluded.payload, expires_at=excluded.expires_at
+                """, (session_id, session["phone"], session["state"], json.dumps(session), expires_at))
 
-# ==================== CONFIGURATION ====================
-DB_FILE = "vicoba_unified.db"
-APP_NAME = "VICOBA DIGITAL 2.0"
-APP_VERSION = "2.0.0"
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+        if self.persist:
+            with connection_manager.connection() as conn:
+                conn.execute("DELETE FROM ussd_sessions WHERE session_id=?", (session_id,))
 
-MESSAGES = {
-    "en": {
-        "invalid_pin": "PIN must be 4 digits",
-        "invalid_phone": "Phone must be in format 255xxxxxxxxx",
-        "invalid_name": "Name must be 3-50 characters, letters and spaces only",
-        "invalid_group": "Group ID must be 3-20 alphanumeric characters",
-        "required": "This field is required",
-        "login_success": "Login successful!",
-        "login_failed": "Invalid credentials",
-        "registration_success": "Registration successful! Use PIN to login.",
-        "phone_exists": "Phone already registered.",
-        "member_exists": "Member already exists",
-        "member_not_found": "Member not found",
-        "round_completed": "🎉 Round completed! {recipient} received {amount}",
-        "payment_success": "Payment of {amount} from {payer} to {payee} recorded!",
-        "contribution_success": "Contribution of {amount} recorded for {name}"
-    },
-    "sw": {
-        "invalid_pin": "PIN lazima iwe tarakimu 4",
-        "invalid_phone": "Namba ya simu lazima iwe 255xxxxxxxxx",
-        "invalid_name": "Jina lazima liwe herufi 3-50 pekee",
-        "invalid_group": "Kitambulisho cha kikundi lazima kiwe herufi 3-20",
-        "required": "Sehemu hii inahitajika",
-        "login_success": "Umefanikiwa kuingia!",
-        "login_failed": "Umekosea namba ya siri",
-        "registration_success": "Usajili umefanikiwa! Tumia PIN kuingia.",
-        "phone_exists": "Namba ya simu tayari imesajiliwa.",
-        "member_exists": "Mwanachama tayari yupo.",
-        "member_not_failed": "Mwanachama hajapatikana"
-    }
-}
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            removed = self._trim(now)
+        if self.persist:
+            with connection_manager.connection() as conn:
+                removed += conn.execute("DELETE FROM ussd_sessions WHERE expires_at <= ?", (now,)).rowcount
+        return removed
 
-VALIDATION_PATTERNS = {
-    "phone": r'^255\d{9}$',
-    "name": r'^[\w\s]{3,50}$',
-    "group_id": r'^[\w]{3,20}$',
-    "pin": r'^\d{4}$'
+    def _trim(self, now: float) -> int:
+        # Caller holds self._lock
+        removed = 0
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at <= now:
+                self.stats["expired"] += 1
+            elif len(self._entries) > self.max_sessions:
+                self.stats["evicted"] += 1
+            else:
+                break
+            del self._entries[session_id]
+            removed += 1
+        return removed
+
+    def _load(self, session_id: str, now: float) -> Optional[Dict[str, Any]]:
+        with connection_manager.connection() as conn:
+            row = conn.execute(
+                "SELECT payload FROM ussd_sessions WHERE session_id=? AND expires_at > ?", (session_id, now)
+            ).fetchone()
+        return json.loads(row["payload"]) if row else None
+
+# ==================== USSD GATEWAY ====================
+# The console screens above block on input(); the gateway drives the same
+# menus as a state machine that advances one USSD request at a time.
+# Responses follow the aggregator convention: "CON ..." keeps the session
+# open, "END ..." closes it.
+USSD_MAIN_ACTIONS = {
+    "MEMBER": {"1": "CONTRIBUTE", "2": "PAYMENT", "3": "TRACKER", "4": "SUMMARY",
+               "5": "TRANSACTIONS", "6": "EXPORT", "7": "LOGOUT"},
+    "ADMIN": {"1": "ADD_MEMBER", "2": "CONTRIBUTE", "3": "PAYMENT", "4": "TRACKER", "5": "SUMMARY",
+              "6": "TRANSACTIONS", "7": "MANAGE_GROUPS", "8": "EXPORT", "9": "LOGOUT"}
 }
+USSD_CONFIRM = "1. Yes\n2. No"
+USSD_NEXT_PAGE = "98"
+USSD_PREV_PAGE = "97"
+USSD_PAGE_SIZE = 5
 
-# ==================== UTILITY FUNCTIONS ====================
-def safe_int(value: Optional[str]) -> int:
-    try:
-        return int(value) if value is not None else 0
-    except (ValueError, TypeError):
-        return 0
+def new_ussd_session(session_id: str, phone: str, language: str = "en") -> Dict[str, Any]:
+    return {"session_id": session_id, "phone": phone, "state": "START", "user": None,
+            "language": language, "data": {}}
 
-def generate_salt() -> str:
-    return os.urandom(16).hex()
+def ussd_con(session: Dict[str, Any], state: str, text: str) -> str:
+    session["state"] = state
+    return f"CON {text}"
 
-def hash_pin(pin: str, salt: str) -> str:
-    return hashlib.sha256((pin + salt).encode()).hexdigest()
+def ussd_end(session: Dict[str, Any], text: str) -> str:
+    session["state"] = "END"
+    return f"END {text}"
 
-def format_currency(amount: int) -> str:
-    return f"Tsh {amount:,}"
+def ussd_more_label(session: Dict[str, Any]) -> str:
+    return MENU_MORE.get(session.get("language", "en"), MENU_MORE["en"])
 
-def validate_phone(phone: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['phone'], phone))
+def ussd_result(session: Dict[str, Any], text: str) -> str:
+    pages = paginate_screen("", text.split("\n"), USSD_SCREEN_LIMIT, ussd_more_label(session), ["0. Back"])
+    session["data"]["result_pages"] = pages[1:]
+    return ussd_con(session, "RESULT", pages[0])
 
-def validate_name(name: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['name'], name))
+def ussd_menu(session: Dict[str, Any], menu_type: str, state: str, notice: str = "", page: int = 0) -> str:
+    role = menu_role(session["user"]) if session["user"] else 'MEMBER'
+    pages = menu_page_count(menu_type, "FEATURE_PHONE", role, session.get("language", "en"))
+    session["data"]["menu_page"] = page if page < pages else 0
+    menu = render_menu(menu_type, "FEATURE_PHONE", role, session.get("language", "en"),
+                       session["data"]["menu_page"])
+    if notice:
+        notice = notice if len(notice) < USSD_NOTICE_RESERVE else notice[:USSD_NOTICE_RESERVE - 2] + "…"
+        menu = f"{notice}\n{menu}"
+    return ussd_con(session, state, menu)
 
-def validate_pin(pin: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['pin'], pin))
+def ussd_auth_menu(session: Dict[str, Any], notice: str = "", page: int = 0) -> str:
+    return ussd_menu(session, "AUTH", "AUTH", notice, page)
 
-def validate_group_id(group_id: str) -> bool:
-    return bool(re.match(VALIDATION_PATTERNS['group_id'], group_id))
+def ussd_main_menu(session: Dict[str, Any], notice: str = "", page: int = 0) -> str:
+    return ussd_menu(session, "MAIN", "MAIN", notice, page)
 
-def confirm_action(message: str) -> bool:
-    response = input(f"{message} (Y/N): ").strip().upper()
-    return response == 'Y'
+def ussd_next_menu_page(session: Dict[str, Any], menu_type: str, state: str) -> str:
+    return ussd_menu(session, menu_type, state, page=session["data"].get("menu_page", 0) + 1)
 
-def get_message(key: str, language: str = "en") -> str:
-    return MESSAGES.get(language, {}).get(key, key)
+def ussd_member_list(session: Dict[str, Any], state: str, title: str, names: List[str], page: int = 0) -> str:
+    # Items are numbered per page so "98" can never collide with an item
+    data = session["data"]
+    data.update(choices=names, list_title=title)
+    more_label = ussd_more_label(session)
+    room = USSD_SCREEN_LIMIT - len(more_label) - 1
+    start, page_no = 0, 0
+    while True:
+        lines, count = [title], 0
+        while start + count < len(names):
+            line = f"{count + 1}. {names[start + count]}"
+            if count and len("\n".join(lines + [line])) > room:
+                break
+            lines.append(line)
+            count += 1
+        last = start + count >= len(names)
+        if page_no >= page or last:
+            break
+        start += count
+        page_no += 1
+    
+    if not last:
+        lines.append(more_label)
+    # After the last page "More" wraps back to the first
+    data.update(list_page=-1 if last else page_no, page_start=start, page_count=count)
+    return ussd_con(session, state, "\n".join(lines))
 
-# ==================== UI FUNCTIONS ====================
-def detect_device_type() -> str:
-    if hasattr(sys, 'getandroidapilevel'):
-        return "SMARTPHONE"
-    elif sys.platform == 'darwin':
-        return "SMARTPHONE"
-    else:
-        return "FEATURE_PHONE"
+def ussd_next_list_page(session: Dict[str, Any]) -> str:
+    data = session["data"]
+    return ussd_member_list(session, session["state"], data["list_title"], data["choices"],
+                            data.get("list_page", 0) + 1)
 
-def detect_phone_number() -> str:
-    return "255123456789"
+def ussd_pick(session: Dict[str, Any], text: str) -> Optional[str]:
+    data = session["data"]
+    idx = safe_int(text) - 1
+    if not 0 <= idx < data.get("page_count", 0):
+        return None
+    return data["choices"][data["page_start"] + idx]
 
-def show_menu(menu_type: str, device_type: str, role: str = 'MEMBER') -> None:
-    menu_options = {
-        "AUTH": ["1. Register", "2. Login", "0. Exit"],
-        "MAIN_MEMBER": [
-            "1. Make Contribution", 
-            "2. Make Payment", 
-            "3. View Round Tracker", 
-            "4. View Member Summary", 
-            "5. View Transactions", 
-            "6. Export Report",
-            "7. Logout"
-        ],
-        "MAIN_ADMIN": [
-            "1. Add Member", 
-            "2. Make Contribution", 
-            "3. Make Payment", 
-            "4. View Round Tracker", 
-            "5. View Member Summary", 
-            "6. View Transactions", 
-            "7. Manage Groups", 
-            "8. Export Report",
-            "9. Logout"
-        ]
-    }
+def ussd_member_search(session: Dict[str, Any], state: str, title: str, query: str,
+                       after: Optional[tuple] = None, exclude: Optional[str] = None) -> str:
+    # One indexed keyset page per screen; "98" follows next_after
+    data = session["data"]
+    page = search_members(session["user"]["current_group_id"], query, after,
+                          limit=USSD_PAGE_SIZE, exclude=exclude)
+    if not page["members"]:
+        return ussd_result(session, get_message("member_not_found"))
+    
+    names = [m["member_name"] for m in page["members"]]
+    data.update(choices=names, page_start=0, page_count=len(names), search_query=query,
+                search_title=title, search_exclude=exclude, next_after=page["next_after"])
+    lines = [title]
+    for i, member in enumerate(page["members"], 1):
+        label = member_label(member)
+        lines.append(f"{i}. {label if len(label) <= 26 else label[:25] + '…'}")
+    if page["next_after"]:
+        lines.append(ussd_more_label(session))
+    return ussd_con(session, state, "\n".join(lines))
 
-    if menu_type == "AUTH":
-        menu_items = menu_options["AUTH"]
-        title = "VICOBA DIGITAL 2.0"
-    elif menu_type == "MAIN":
-        menu_items = menu_options["MAIN_ADMIN"] if role == 'ADMIN' else menu_options["MAIN_MEMBER"]
-        title = "MAIN MENU"
-    else:
-        menu_items = []
-        title = "MENU"
+def ussd_find_member(session: Dict[str, Any], pick_state: str, title: str, text: str,
+                     exclude: Optional[str] = None) -> tuple:
+    # Returns (name, None) on a single or exact match, else (None, picker screen)
+    query = "" if text == "0" else text
+    response = ussd_member_search(session, pick_state, title, query, exclude=exclude)
+    if session["state"] != pick_state:
+        return None, response
+    data = session["data"]
+    if len(data["choices"]) == 1 and not data["next_after"]:
+        return data["choices"][0], None
+    exact = [name for name in data["choices"] if name.lower() == query.lower()]
+    return (exact[0], None) if exact else (None, response)
 
-    if device_type == "FEATURE_PHONE":
-        print(f"\n{title}")
-        for item in menu_items:
-            print(item)
-    else:
-        print("\n" + "="*40)
-        print(f"    {title}")
-        print("="*40)
-        for item in menu_items:
-            print(item)
-        print("="*40)
+def ussd_pick_member(session: Dict[str, Any], text: str, error: str) -> tuple:
+    data = session["data"]
+    if text == USSD_NEXT_PAGE:
+        return None, ussd_member_search(session, session["state"], data["search_title"], data["search_query"],
+                                        data["next_after"], data["search_exclude"])
+    name = ussd_pick(session, text)
+    return (name, None) if name else (None, ussd_result(session, error))
 
-# ==================== DATABASE FUNCTIONS ====================
-def get_db_connection():
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
+def ussd_transactions_page(session: Dict[str, Any], cursor: Optional[str] = None,
+                           direction: str = "next") -> str:
+    group_id = session["user"]["current_group_id"]
+    page = cached_report(group_id, "transactions", get_transactions_page,
+                         None, None, None, None, cursor, direction, USSD_PAGE_SIZE)
+    if not page["transactions"]:
+        return ussd_result(session, "❌ No transactions found")
+    
+    session["data"]["page"] = page
+    lines = [f"{row['timestamp'][5:16]} {row['member_name']} {row['action'][:7]} {row['amount']:,}"
+             for row in page["transactions"]]
+    if page["next_cursor"]:
+        lines.append(f"{USSD_NEXT_PAGE}. Next")
+    if page["prev_cursor"]:
+        lines.append(f"{USSD_PREV_PAGE}. Previous")
+    lines.append("0. Back")
+    return ussd_con(session, "TRANSACTIONS", "\n".join(lines))
 
-def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # Users table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        phone TEXT PRIMARY KEY,
-        pin_hash TEXT NOT NULL,
-        salt TEXT NOT NULL,
-        group_ids TEXT NOT NULL,
-        role TEXT NOT NULL DEFAULT 'MEMBER',
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # Members table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS members (
-        member_name TEXT,
-        phone TEXT,
-        total_contributions INTEGER NOT NULL DEFAULT 0,
-        total_received INTEGER NOT NULL DEFAULT 0,
-        group_id TEXT NOT NULL,
-        PRIMARY KEY (member_name, group_id)
-    )
-    """)
-    
-    # Rounds table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS rounds (
-        round_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        member_receiving TEXT,
-        total_amount INTEGER,
-        round_date TEXT,
-        group_id TEXT NOT NULL
-    )
-    """)
-    
-    # Transactions table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        member_name TEXT,
-        action TEXT,
-        amount INTEGER,
-        timestamp TEXT,
-        round_id INTEGER,
-        group_id TEXT NOT NULL
-    )
-    """)
-    
-    # Groups table
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS groups (
-        group_id TEXT PRIMARY KEY,
-        group_name TEXT NOT NULL,
-        created_by TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    
-    # Create default admin user
-    c.execute("SELECT * FROM users WHERE phone=?", ("255123456789",))
-    if not c.fetchone():
-        salt = generate_salt()
-        pin_hash = hash_pin("1234", salt)
-        c.execute(
-            "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
-            ("255123456789", pin_hash, salt, json.dumps(["TEST_GROUP"]), 'ADMIN'))
-    
-    conn.commit()
-    conn.close()
-    print("✅ Database initialized successfully!")
+# --- State handlers: each takes (session, input) and returns the response ---
+def ussd_state_start(session: Dict[str, Any], text: str) -> str:
+    return ussd_auth_menu(session)
 
-# ==================== AUTHENTICATION FUNCTIONS ====================
-def register_user(device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- REGISTER ---")
-    else:
-        print("\n" + "="*40)
-        print("        ENHANCED REGISTRATION")
-        print("="*40)
-    
-    phone = detect_phone_number()
-    if not phone:
-        phone = input("Enter phone (255xxxxxxx): ").strip()
-    
-    if not validate_phone(phone):
-        return get_message("invalid_phone")
-    
-    print(f"📱 Detected phone: {phone}")
-    pin = input("🔐 Create 4-digit PIN: ").strip()
-    if not validate_pin(pin):
-        return get_message("invalid_pin")
-    
-    group_id = input("🏷️  Group ID: ").strip()
-    if not validate_group_id(group_id):
-        return get_message("invalid_group")
-    
-    role = input("👤 Role (ADMIN/MEMBER): ").strip().upper() or 'MEMBER'
-    if role not in ['ADMIN', 'MEMBER']:
-        return "Invalid role"
-    
-    if not confirm_action("✅ Confirm registration?"):
-        return "Registration cancelled"
-    
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    try:
-        c.execute("SELECT * FROM users WHERE phone=?", (phone,))
-        if c.fetchone():
-            return get_message("phone_exists")
-        
-        salt = generate_salt()
-        pin_hash = hash_pin(pin, salt)
-        c.execute(
-            "INSERT INTO users (phone, pin_hash, salt, group_ids, role) VALUES (?,?,?,?,?)",
-            (phone, pin_hash, salt, json.dumps([group_id]), role)
-        )
-        conn.commit()
-        return get_message("registration_success")
-    except sqlite3.IntegrityError:
-        return get_message("phone_exists")
-    finally:
-        conn.close()
+def ussd_state_auth(session: Dict[str, Any], text: str) -> str:
+    if text == "1":
+        return ussd_con(session, "REGISTER_PIN", "Create 4-digit PIN:")
+    if text == "2":
+        return ussd_con(session, "LOGIN_PIN", "Enter PIN:")
+    if text == "0":
+        return ussd_end(session, "👋 Goodbye!")
+    if text == USSD_NEXT_PAGE:
+        return ussd_next_menu_page(session, "AUTH", "AUTH")
+    return ussd_auth_menu(session, "❌ Invalid choice")
 
-def login_user(device_type: str) -> Optional[Dict[str, Any]]:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- LOGIN ---")
-    else:
-        print("\n" + "="*40)
-        print("        ENHANCED LOGIN")
-        print("="*40)
-    
-    phone = detect_phone_number()
-    if not phone:
-        phone = input("Enter phone (255xxxxxxx): ").strip()
-    
-    if not validate_phone(phone):
-        return None
-    
-    print(f"📱 Detected phone: {phone}")
-    pin = input("🔐 Enter PIN: ").strip()
-    if not validate_pin(pin):
-        return None
-    
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM users WHERE phone=?", (phone,))
-    user = c.fetchone()
-    conn.close()
-    
-    if user:
-        stored_hash = user['pin_hash']
-        salt = user['salt']
-        role = user['role']
-        group_ids = json.loads(user['group_ids'])
-        if hash_pin(pin, salt) == stored_hash:
-            return {
-                "phone": phone,
-                "group_ids": group_ids,
-                "role": role
-            }
-    
-    return None
+def ussd_state_login_pin(session: Dict[str, Any], text: str) -> str:
+    user = authenticate_user(session["phone"], text)
+    if not user:
+        return ussd_end(session, get_message("login_failed"))
+    if not user["group_ids"]:
+        return ussd_end(session, "❌ No group assigned. Please manage groups.")
+    select_group(user, user["group_ids"][0])
+    session["user"] = user
+    return ussd_main_menu(session, get_message("login_success"))
 
-# ==================== MEMBER MANAGEMENT ====================
-def get_member(name: str, group_id: str) -> Optional[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM members WHERE member_name=? AND group_id=?", (name, group_id))
-    row = c.fetchone()
-    conn.close()
-    
-    return dict(row) if row else None
+def ussd_state_register_pin(session: Dict[str, Any], text: str) -> str:
+    if not validate_pin(text):
+        return ussd_end(session, get_message("invalid_pin"))
+    session["data"]["pin"] = text
+    return ussd_con(session, "REGISTER_GROUP", "Group ID:")
 
-def get_all_members(group_id: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT * FROM members WHERE group_id=? ORDER BY member_name", (group_id,))
-    rows = c.fetchall()
-    conn.close()
-    
-    return [dict(row) for row in rows]
+def ussd_state_register_group(session: Dict[str, Any], text: str) -> str:
+    if not validate_group_id(text):
+        return ussd_end(session, get_message("invalid_group"))
+    session["data"]["group_id"] = text
+    return ussd_con(session, "REGISTER_ROLE", "Role:\n1. Member\n2. Admin")
 
-def save_member(member_data: Dict[str, Any], group_id: str) -> bool:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    try:
-        c.execute("""
-        INSERT OR REPLACE INTO members VALUES (?,?,?,?,?)
-        """, (
-            member_data["member_name"],
-            member_data.get("phone", ""),
-            safe_int(member_data["total_contributions"]),
-            safe_int(member_data["total_received"]),
-            group_id
-        ))
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"❌ Error saving member: {e}")
-        return False
-    finally:
-        conn.close()
+def ussd_state_register_role(session: Dict[str, Any], text: str) -> str:
+    role = {"1": "MEMBER", "2": "ADMIN"}.get(text)
+    if not role:
+        return ussd_end(session, "Invalid role")
+    session["data"]["role"] = role
+    return ussd_con(session, "REGISTER_CONFIRM", f"Confirm registration?\n{USSD_CONFIRM}")
 
-def add_member(group_id: str, device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- ADD MEMBER ---")
-    else:
-        print("\n" + "="*40)
-        print("        ADD NEW MEMBER")
-        print("="*40)
-    
-    name = input("👤 Member name: ").strip()
-    if not validate_name(name):
-        return get_message("invalid_name")
-    
-    if get_member(name, group_id):
-        return get_message("member_exists")
-    
-    phone = input("📱 Phone (optional): ").strip()
-    if phone and not validate_phone(phone):
-        return get_message("invalid_phone")
-    
-    if not confirm_action("✅ Confirm adding member?"):
-        return "Cancelled"
-    
-    save_member({
-        "member_name": name,
-        "phone": phone,
-        "total_contributions": 0,
-        "total_received": 0
-    }, group_id)
-    
-    return f"✅ Member {name} added successfully!"
+def ussd_state_register_confirm(session: Dict[str, Any], text: str) -> str:
+    if text != "1":
+        return ussd_end(session, "Registration cancelled")
+    data = session["data"]
+    return ussd_end(session, create_user(session["phone"], data["pin"], data["group_id"], data["role"]))
 
-# ==================== CONTRIBUTION SYSTEM ====================
-def log_transaction(member_name: str, action: str, amount: int, 
-                   round_id: Optional[int], group_id: str) -> bool:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    try:
-        c.execute(
-            "INSERT INTO transactions VALUES (NULL,?,?,?,?,?,?)",
-            (member_name, action, amount, datetime.now().isoformat(), round_id, group_id)
-        )
-        conn.commit()
-        return True
-    except Exception as e:
-        print(f"❌ Error logging transaction: {e}")
-        return False
-    finally:
-        conn.close()
+def ussd_state_main(session: Dict[str, Any], text: str) -> str:
+    user = session["user"]
+    group_id = user["current_group_id"]
+    if text == USSD_NEXT_PAGE:
+        return ussd_next_menu_page(session, "MAIN", "MAIN")
+    action = USSD_MAIN_ACTIONS[menu_role(user)].get(text)
+    session["data"] = {}
+    
+    if action == "CONTRIBUTE":
+        return ussd_con(session, "CONTRIBUTE_NAME", "Member (name/phone/no.), 0 for all:")
+    if action == "ADD_MEMBER":
+        if not is_group_admin(user):
+            return ussd_result(session, f"❌ {get_message('group_admin_only')}")
+        return ussd_con(session, "ADD_MEMBER_NAME", "Member name:")
+    if action == "PAYMENT":
+        if count_members(group_id) < 2:
+            return ussd_result(session, "❌ Need at least 2 members for payments")
+        return ussd_con(session, "PAYMENT_PAYER", "Payer (name/phone/no.), 0 for all:")
+    if action == "TRACKER":
+        tracker = cached_report(group_id, "tracker", get_round_tracker)
+        lines = [f"Pot: {format_currency(tracker['total_pot'])}",
+                 f"Next: {tracker['next_recipient'] or 'None'}"]
+        paid = len(tracker["members"]) - len(tracker["pending"])
+        lines.append(f"Paid: {paid}/{len(tracker['members'])}")
+        if tracker["pending"]:
+            lines.append("Pending:")
+            lines.extend(tracker["pending"])
+        return ussd_result(session, "\n".join(lines))
+    if action == "SUMMARY":
+        members = get_all_members(group_id)
+        if not members:
+            return ussd_result(session, "❌ No members in group")
+        lines = [f"{m['member_name']}: in {m['total_contributions']:,} out {m['total_received']:,}"
+                 for m in members]
+        return ussd_result(session, "\n".join(lines))
+    if action == "TRANSACTIONS":
+        return ussd_transactions_page(session)
+    if action == "EXPORT":
+        return ussd_result(session, export_transactions_to_csv(group_id))
+    if action == "MANAGE_GROUPS":
+        return ussd_menu(session, "MANAGE_GROUPS", "MANAGE_GROUPS")
+    if action == "LOGOUT":
+        return ussd_end(session, "👋 Logging out...")
+    return ussd_main_menu(session, "❌ Invalid choice")
 
-def contribute(group_id: str, device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- MAKE CONTRIBUTION ---")
-    else:
-        print("\n" + "="*40)
-        print("        MAKE CONTRIBUTION")
-        print("="*40)
-    
-    name = input("👤 Member name: ").strip()
-    if not validate_name(name):
-        return get_message("invalid_name")
-    
-    amount_str = input("💰 Amount: ").strip()
-    amount = safe_int(amount_str)
+def ussd_state_result(session: Dict[str, Any], text: str) -> str:
+    remaining = session["data"].get("result_pages")
+    if text == USSD_NEXT_PAGE and remaining:
+        session["data"]["result_pages"] = remaining[1:]
+        return ussd_con(session, "RESULT", remaining[0])
+    return ussd_main_menu(session)
+
+def ussd_contribute_member(session: Dict[str, Any], name: str) -> str:
+    session["data"]["name"] = name
+    return ussd_con(session, "CONTRIBUTE_AMOUNT", f"Amount for {name}:")
+
+def ussd_state_contribute_name(session: Dict[str, Any], text: str) -> str:
+    name, response = ussd_find_member(session, "CONTRIBUTE_PICK", "Select member:", text)
+    return ussd_contribute_member(session, name) if name else response
+
+def ussd_state_contribute_pick(session: Dict[str, Any], text: str) -> str:
+    name, response = ussd_pick_member(session, text, get_message("member_not_found"))
+    return ussd_contribute_member(session, name) if name else response
+
+def ussd_state_contribute_amount(session: Dict[str, Any], text: str) -> str:
+    amount = safe_int(text)
     if amount <= 0:
-        return "❌ Invalid amount"
-    
-    member = get_member(name, group_id)
-    if not member:
-        return get_message("member_not_found")
-    
-    if not confirm_action(f"✅ Confirm contribution of {format_currency(amount)}?"):
-        return "❌ Cancelled"
-    
-    member["total_contributions"] += amount
-    save_member(member, group_id)
-    
-    log_transaction(name, "CONTRIBUTION", amount, None, group_id)
-    
-    return get_message("contribution_success").format(
-        amount=format_currency(amount),
-        name=name
-    )
+        return ussd_result(session, "❌ Invalid amount")
+    session["data"]["amount"] = amount
+    return ussd_con(session, "CONTRIBUTE_CONFIRM",
+                    f"Confirm contribution of {format_currency(amount)}?\n{USSD_CONFIRM}")
+
+def ussd_state_contribute_confirm(session: Dict[str, Any], text: str) -> str:
+    if text != "1":
+        return ussd_result(session, "❌ Cancelled")
+    data = session["data"]
+    return ussd_result(session, record_contribution(session["user"]["current_group_id"], data["name"], data["amount"]))
+
+def ussd_payment_payer(session: Dict[str, Any], payer: str) -> str:
+    session["data"]["payer"] = payer
+    return ussd_con(session, "PAYMENT_PAYEE", "Payee (name/phone/no.), 0 for all:")
+
+def ussd_payment_payee(session: Dict[str, Any], payee: str) -> str:
+    session["data"]["payee"] = payee
+    return ussd_con(session, "PAYMENT_AMOUNT", "Amount:")
+
+def ussd_state_payment_payer(session: Dict[str, Any], text: str) -> str:
+    payer, response = ussd_find_member(session, "PAYMENT_PAYER_PICK", "Select payer:", text)
+    return ussd_payment_payer(session, payer) if payer else response
+
+def ussd_state_payment_payer_pick(session: Dict[str, Any], text: str) -> str:
+    payer, response = ussd_pick_member(session, text, "❌ Invalid payer selection")
+    return ussd_payment_payer(session, payer) if payer else response
+
+def ussd_state_payment_payee(session: Dict[str, Any], text: str) -> str:
+    payee, response = ussd_find_member(session, "PAYMENT_PAYEE_PICK", "Select payee:", text,
+                                       exclude=session["data"]["payer"])
+    return ussd_payment_payee(session, payee) if payee else response
+
+def ussd_state_payment_payee_pick(session: Dict[str, Any], text: str) -> str:
+    payee, response = ussd_pick_member(session, text, "❌ Invalid payee selection")
+    return ussd_payment_payee(session, payee) if payee else response
+
+def ussd_state_payment_amount(session: Dict[str, Any], text: str) -> str:
+    amount = safe_int(text)
+    if amount <= 0:
+        return ussd_result(session, "❌ Invalid amount")
+    data = session["data"]
+    data["amount"] = amount
+    return ussd_con(session, "PAYMENT_CONFIRM",
+                    f"Pay {format_currency(amount)} from {data['payer']} to {data['payee']}?\n{USSD_CONFIRM}")
 
-# ==================== ROUND MANAGEMENT ====================
-def create_round(member_receiving: str, total_amount: int, group_id: str) -> int:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    round_date = datetime.now().isoformat()
-    c.execute(
-        "INSERT INTO rounds VALUES (NULL,?,?,?,?)", 
-        (member_receiving, total_amount, round_date, group_id)
-    )
-    round_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    
-    member = get_member(member_receiving, group_id)
-    if member:
-        member["total_received"] += total_amount
-        save_member(member, group_id)
-    
-    log_transaction(member_receiving, "ROUND_RECEIVED", total_amount, round_id, group_id)
-    return round_id
+def ussd_state_payment_confirm(session: Dict[str, Any], text: str) -> str:
+    if text != "1":
+        return ussd_result(session, "❌ Cancelled")
+    data = session["data"]
+    return ussd_result(session, record_payment(session["user"]["current_group_id"],
+                                               data["payer"], data["payee"], data["amount"]))
 
-def get_current_round_contributions(group_id: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("SELECT round_id FROM rounds WHERE group_id=? ORDER BY round_id DESC LIMIT 1", (group_id,))
-    latest_round = c.fetchone()
-    latest_id = latest_round['round_id'] if latest_round else 0
-    
-    c.execute("""
-        SELECT member_name, SUM(amount) AS contributed
-        FROM transactions 
-        WHERE action='CONTRIBUTION' AND group_id=? AND (round_id IS NULL OR round_id > ?)
-        GROUP BY member_name
-    """, (group_id, latest_id))
-    
-    contribs = [dict(row) for row in c.fetchall()]
-    conn.close()
-    
-    return contribs
+def ussd_state_add_member_name(session: Dict[str, Any], text: str) -> str:
+    if not validate_name(text):
+        return ussd_result(session, get_message("invalid_name"))
+    session["data"]["name"] = text
+    return ussd_con(session, "ADD_MEMBER_PHONE", "Phone (0 to skip):")
 
-def get_next_recipient(group_id: str) -> Optional[str]:
-    members = get_all_members(group_id)
-    if not members:
-        return None
-    
-    min_received = min(m["total_received"] for m in members)
-    candidates = [m["member_name"] for m in members if m["total_received"] == min_received]
-    return sorted(candidates)[0] if candidates else None
+def ussd_state_add_member_phone(session: Dict[str, Any], text: str) -> str:
+    phone = "" if text == "0" else text
+    if phone and not validate_phone(phone):
+        return ussd_result(session, get_message("invalid_phone"))
+    session["data"]["phone"] = phone
+    return ussd_con(session, "ADD_MEMBER_CONFIRM", f"Add {session['data']['name']}?\n{USSD_CONFIRM}")
 
-def auto_finalize_round(group_id: str) -> bool:
-    contribs = get_current_round_contributions(group_id)
-    all_members = get_all_members(group_id)
-    
-    if len(contribs) == len(all_members) and all(c["contributed"] > 0 for c in contribs):
-        total_amount = sum(c["contributed"] for c in contribs)
-        next_recipient = get_next_recipient(group_id)
-        
-        if next_recipient and total_amount > 0:
-            round_id = create_round(next_recipient, total_amount, group_id)
-            
-            conn = get_db_connection()
-            c = conn.cursor()
+def ussd_state_add_member_confirm(session: Dict[str, Any], text: str) -> str:
+    if text != "1":
+        return ussd_result(session, "Cancelled")
+    data = session["data"]
+    return ussd_result(session, create_member(session["user"]["current_group_id"], data["name"], data["phone"]))
+
+def ussd_state_transactions(session: Dict[str, Any], text: str) -> str:
+    page = session["data"].get("page", {})
+    if text == USSD_NEXT_PAGE and page.get("next_cursor"):
+        return ussd_transactions_page(session, page["next_cursor"], "next")
+    if text == USSD_PREV_PAGE and page.get("prev_cursor"):
+        return ussd_transactions_page(session, page["prev_cursor"], "prev")
+    return ussd_main_menu(session)
+
+def ussd_state_manage_groups(session: Dict[str, Any], text: str) -> str:
+    user = session["user"]
+    if text == "1":
+        return ussd_con(session, "GROUP_NEW_ID", "Group ID:")
+    if text == "2":
+        refresh_user_groups(user)
+        return ussd_member_list(session, "GROUP_SWITCH", "Your Groups:", list(user["group_ids"]))
+    if text == "3":
+        return ussd_result(session, "\n".join(f"{g['group_id']} - {g['group_name']} ({g['users']})"
+                                              for g in get_groups_overview()) or "❌ No groups")
+    if text == "4":
+        schedule = get_rotation_schedule(user["current_group_id"])
+        if not schedule:
+            return ussd_result(session, "❌ No members in group")
+        return ussd_result(session, "\n".join(
+            f"{e['position']}. {e['member_name']}{' ✅' if e['round_id'] else ''}" for e in schedule))
+    return ussd_main_menu(session)
+
+def ussd_state_group_new_id(session: Dict[str, Any], text: str) -> str:
+    if not validate_group_id(text):
+        return ussd_result(session, get_message("invalid_group"))
+    session["data"]["group_id"] = text
+    return ussd_con(session, "GROUP_NEW_NAME", "Group Name:")
+
+def ussd_state_group_new_name(session: Dict[str, Any], text: str) -> str:
+    if not text:
+        return ussd_result(session, get_message("required"))
+    user = session["user"]
+    group_id = session["data"]["group_id"]
+    result = insert_group(user["phone"], group_id, text)
+    if result.startswith("✅"):
+        refresh_user_groups(user)
+    return ussd_result(session, result)
+
+def ussd_state_group_switch(session: Dict[str, Any], text: str) -> str:
+    if text == USSD_NEXT_PAGE:
+        return ussd_next_list_page(session)
+    group_id = ussd_pick(session, text)
+    if not group_id:
+        return ussd_result(session, "❌ Invalid selection")
+    select_group(session["user"], group_id)
+    return ussd_main_menu(session, f"✅ Switched to group {group_id}")
+
+USSD_STATE_HANDLERS = {
+    "START": ussd_state_start,
+    "AUTH": ussd_state_auth,
+    "LOGIN_PIN": ussd_state_login_pin,
+    "REGISTER_PIN": ussd_state_register_pin,
+    "REGISTER_GROUP": ussd_state_register_group,
+    "REGISTER_ROLE": ussd_state_register_role,
+    "REGISTER_CONFIRM": ussd_state_register_confirm,
+    "MAIN": ussd_state_main,
+    "RESULT": ussd_state_result,
+    "CONTRIBUTE_NAME": ussd_state_contribute_name,
+    "CONTRIBUTE_PICK": ussd_state_contribute_pick,
+    "CONTRIBUTE_AMOUNT": ussd_state_contribute_amount,
+    "CONTRIBUTE_CONFIRM": ussd_state_contribute_confirm,
+    "PAYMENT_PAYER": ussd_state_payment_payer,
+    "PAYMENT_PAYER_PICK": ussd_state_payment_payer_pick,
+    "PAYMENT_PAYEE": ussd_state_payment_payee,
+    "PAYMENT_PAYEE_PICK": ussd_state_payment_payee_pick,
+    "PAYMENT_AMOUNT": ussd_state_payment_amount,
+    "PAYMENT_CONFIRM": ussd_state_payment_confirm,
+    "ADD_MEMBER_NAME": ussd_state_add_member_name,
+    "ADD_MEMBER_PHONE": ussd_state_add_member_phone,
+    "ADD_MEMBER_CONFIRM": ussd_state_add_member_confirm,
+    "TRANSACTIONS": ussd_state_transactions,
+    "MANAGE_GROUPS": ussd_state_manage_groups,
+    "GROUP_NEW_ID": ussd_state_group_new_id,
+    "GROUP_NEW_NAME": ussd_state_group_new_name,
+    "GROUP_SWITCH": ussd_state_group_switch
+}
+
+def step_ussd_session(session: Dict[str, Any], user_input: str) -> str:
+    handler = USSD_STATE_HANDLERS.get(session["state"], ussd_state_start)
+    return handler(session, (user_input or "").strip())
+
+class USSDGateway:
+    """Async front door: one call per USSD hop, sessions keyed by session ID."""
+
+    def __init__(self, max_workers: int = 32, sessions: Optional[SessionStore] = None,
+                 use_group_commit: bool = GROUP_COMMIT_ENABLED):
+        self.sessions = sessions if sessions is not None else SessionStore()
+        # Concurrent sessions' ledger writes then share commits
+        self._owns_group_commit = use_group_commit and not group_commit.running
+        if self._owns_group_commit:
+            group_commit.start()
+        # Locks live only while some hop holds or awaits them
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # SQLite work stays off the event loop; each worker thread keeps its
+        # own pooled connection via connection_manager.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ussd")
+
+    async def handle_request(self, session_id: str, phone: str, text: str = "") -> str:
+        # Hops of one session are serialised; different sessions run concurrently
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        async with lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = new_ussd_session(session_id, phone)
             
-            for contrib in contribs:
-                c.execute("""
-                    UPDATE transactions 
-                    SET round_id=? 
-                    WHERE member_name=? AND action='CONTRIBUTION' AND round_id IS NULL AND group_id=?
-                """, (round_id, contrib["member_name"], group_id))
-            conn.commit()
-            conn.close()
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(self._executor, step_ussd_session, session, text)
+            except Exception as e:
+                print(f"❌ USSD session {session_id} failed: {e}")
+                response = ussd_end(session, "❌ Service unavailable. Please try again.")
             
-            return True
-    
-    return False
+            if session["state"] == "END":
+                self.sessions.delete(session_id)
+            else:
+                self.sessions.put(session)
+        return response
 
-# ==================== PAYMENT SYSTEM ====================
-def make_payment(group_id: str, device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- MEMBER PAYMENT ---")
-    else:
-        print("\n" + "="*40)
-        print("        ENHANCED PAYMENT")
-        print("="*40)
-    
-    members = get_all_members(group_id)
-    if len(members) < 2:
-        return "❌ Need at least 2 members for payments"
-    
-    print("\n👤 Select payer:")
-    for i, member in enumerate(members, 1):
-        print(f"  {i}. {member['member_name']} - {format_currency(member['total_contributions'])}")
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._owns_group_commit:
+            group_commit.stop()
+
+class LocalUSSDGateway:
+    """Stand-in for the carrier aggregator: replays recorded hops for testing.
     
-    try:
-        payer_idx = int(input("\n📥 Payer number: ")) - 1
-        if payer_idx < 0 or payer_idx >= len(members):
-            return "❌ Invalid payer selection"
-        
-        payer = members[payer_idx]
-        
-        print("\n👤 Select payee:")
-        payees = [m for m in members if m['member_name'] != payer['member_name']]
-        for i, member in enumerate(payees, 1):
-            print(f"  {i}. {member['member_name']} - {format_currency(member['total_received'])}")
-        
-        payee_idx = int(input("\n📤 Payee number: ")) - 1
-        if payee_idx < 0 or payee_idx >= len(payees):
-            return "❌ Invalid payee selection"
-        
-        payee = payees[payee_idx]
-        
-        amount_str = input("💰 Amount: ").strip()
-        amount = safe_int(amount_str)
-        if amount <= 0:
-            return "❌ Invalid amount"
-        
-        if not confirm_action(f"✅ Confirm payment of {format_currency(amount)} from {payer['member_name']} to {payee['member_name']}?"):
-            return "❌ Cancelled"
-        
-        payer["total_contributions"] += amount
-        save_member(payer, group_id)
+    Events are dicts with session_id, phone and input (the text typed on that
+    hop; "" for the initial dial). Hops of a session are replayed in order,
+    sessions concurrently.
+    """
+
+    def __init__(self, gateway: Optional[USSDGateway] = None):
+        self.gateway = gateway or USSDGateway()
+
+    async def replay(self, events: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, str]]]:
+        sessions: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            sessions.setdefault(str(event["session_id"]), []).append(event)
         
-        payee["total_received"] += amount
-        save_member(payee, group_id)
+        transcripts: Dict[str, List[Dict[str, str]]] = {}
         
-        log_transaction(payer["member_name"], "PAYMENT_SENT", amount, None, group_id)
-        log_transaction(payee["member_name"], "PAYMENT_RECEIVED", amount, None, group_id)
+        async def run_session(session_id: str, hops: List[Dict[str, Any]]) -> None:
+            transcript = transcripts[session_id] = []
+            for hop in hops:
+                response = await self.gateway.handle_request(session_id, hop["phone"], hop.get("input", ""))
+                transcript.append({"input": hop.get("input", ""), "response": response})
         
-        return get_message("payment_success").format(
-            amount=format_currency(amount),
-            payer=payer['member_name'],
-            payee=payee['member_name']
-        )
-    
-    except ValueError:
-        return "❌ Please enter valid numbers"
+        await asyncio.gather(*(run_session(sid, hops) for sid, hops in sessions.items()))
+        return transcripts
 
-# ==================== GROUP MANAGEMENT ====================
-def create_group(phone: str, device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- CREATE GROUP ---")
-    else:
-        print("\n" + "="*40)
-        print("        CREATE GROUP")
-        print("="*40)
-    
-    group_id = input("🏷️  Group ID: ").strip()
-    if not validate_group_id(group_id):
-        return get_message("invalid_group")
-    
-    group_name = input("🏢 Group Name: ").strip()
-    if not group_name:
-        return get_message("required")
-    
-    if not confirm_action("✅ Confirm group creation?"):
-        return "❌ Cancelled"
-    
-    conn = get_db_connection()
-    c = conn.cursor()
+    def replay_file(self, path: str) -> Dict[str, List[Dict[str, str]]]:
+        with open(path) as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        return asyncio.run(self.replay(events))
+
+# ==================== HTTP API ====================
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+API_WORKERS = 32
+API_TOKEN_TTL = 3600  # seconds a login token stays valid
+API_KEEPALIVE_TIMEOUT = 5  # idle keep-alive connections give their worker back after this
+API_MAX_BODY = 64 * 1024
+API_MAX_PAGE_SIZE = 100
+# A 4-digit PIN falls to a few thousand guesses, so repeated failures lock
+# the phone out: API_LOGIN_LOCKOUT seconds, doubling per further failure
+API_LOGIN_MAX_FAILURES = 5
+API_LOGIN_LOCKOUT = 60
+API_LOGIN_LOCKOUT_MAX = 3600
+API_LOGIN_TRACKED = 10000  # phones with recent failures kept in memory
+
+class LoginThrottle:
+    """Per-phone failed-login counter with exponential lockout.
     
-    try:
-        c.execute("INSERT INTO groups (group_id, group_name, created_by) VALUES (?,?,?)",
-                  (group_id, group_name, phone))
-        conn.commit()
-        
-        c.execute("SELECT group_ids FROM users WHERE phone=?", (phone,))
-        result = c.fetchone()
-        if result:
-            group_ids = json.loads(result[0])
-            group_ids.append(group_id)
-            c.execute("UPDATE users SET group_ids=? WHERE phone=?", (json.dumps(group_ids), phone))
-            conn.commit()
-            
-            return f"✅ Group {group_name} ({group_id}) created!"
-    except sqlite3.IntegrityError:
-        return "❌ Group ID already exists"
-    finally:
-        conn.close()
+    Failures are forgotten after a successful login or once they are
+    API_LOGIN_LOCKOUT_MAX old; the least recently failed phones are dropped
+    beyond max_entries.
+    """
 
-def manage_groups(user: Dict[str, Any], device_type: str) -> str:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- MANAGE GROUPS ---")
+    def __init__(self, max_failures: int = API_LOGIN_MAX_FAILURES, lockout: float = API_LOGIN_LOCKOUT,
+                 max_lockout: float = API_LOGIN_LOCKOUT_MAX, max_entries: int = API_LOGIN_TRACKED):
+        self.max_failures = max_failures
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        self.max_entries = max_entries
+        # phone -> (failures, last failure, locked until)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, phone: str) -> int:
+        # Seconds until the phone may try again; 0 when it is not locked
+        with self._lock:
+            entry = self._entries.get(phone)
+        remaining = entry[2] - time.time() if entry else 0
+        return int(remaining) + 1 if remaining > 0 else 0
+
+    def failure(self, phone: str) -> None:
+        now = time.time()
+        with self._lock:
+            failures, last_failure, _ = self._entries.pop(phone, (0, now, 0.0))
+            if now - last_failure > self.max_lockout:
+                failures = 0
+            failures += 1
+            locked_until = 0.0
+            if failures >= self.max_failures:
+                locked_until = now + min(self.max_lockout, self.lockout * 2 ** (failures - self.max_failures))
+            self._entries[phone] = (failures, now, locked_until)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def success(self, phone: str) -> None:
+        with self._lock:
+            self._entries.pop(phone, None)
+
+api_sessions = SessionStore(ttl=API_TOKEN_TTL)
+api_login_throttle = LoginThrottle()
+
+def api_error(status: int, message: str) -> tuple:
+    return status, {"error": message}
+
+def api_result(message: str) -> tuple:
+    # The ledger helpers report failures as "❌ ..." strings
+    if message.startswith("❌"):
+        return api_error(400, message.lstrip("❌ "))
+    return 200, {"message": message}
+
+def api_amount(params: Dict[str, Any]) -> int:
+    value = params.get("amount")
+    return value if isinstance(value, int) and not isinstance(value, bool) else parse_amount(value or "")
+
+def api_login(user: Optional[Dict[str, Any]], group_id: Optional[str], params: Dict[str, Any]) -> tuple:
+    phone = str(params.get("phone", "")).strip()
+    pin = str(params.get("pin", "")).strip()
+    retry_after = api_login_throttle.retry_after(phone)
+    if retry_after:
+        return 429, {"error": "Too many failed logins; try again later", "retry_after": retry_after}
+    user = authenticate_user(phone, pin)
+    if not user:
+        api_login_throttle.failure(phone)
+        return api_error(401, get_message("login_failed"))
+    api_login_throttle.success(phone)
+    
+    token = secrets.token_urlsafe(24)
+    api_sessions.put({"session_id": token, "phone": phone, "state": "API", "user": user})
+    return 200, {"token": token, "expires_in": API_TOKEN_TTL, "phone": phone, "groups": user["group_roles"]}
+
+def api_logout(user: Dict[str, Any], group_id: Optional[str], params: Dict[str, Any]) -> tuple:
+    api_sessions.delete(user["token"])
+    return 200, {"message": "Logged out"}
+
+def api_contribute(user: Dict[str, Any], group_id: str, params: Dict[str, Any]) -> tuple:
+    name = str(params.get("member", "")).strip()
+    if not get_member(name, group_id):
+        return api_error(404, get_message("member_not_found"))
+    return api_result(record_contribution(group_id, name, api_amount(params)))
+
+def api_payment(user: Dict[str, Any], group_id: str, params: Dict[str, Any]) -> tuple:
+    payer = str(params.get("payer", "")).strip()
+    payee = str(params.get("payee", "")).strip()
+    if not get_member(payer, group_id) or not get_member(payee, group_id):
+        return api_error(404, get_message("member_not_found"))
+    return api_result(record_payment(group_id, payer, payee, api_amount(params)))
+
+def api_tracker(user: Dict[str, Any], group_id: str, params: Dict[str, Any]) -> tuple:
+    return 200, cached_report(group_id, "tracker", get_round_tracker)
+
+def api_members(user: Dict[str, Any], group_id: str, params: Dict[str, Any]) -> tuple:
+    return 200, {"group_id": group_id, "members": cached_report(group_id, "members", get_member_summary)}
+
+def api_transactions(user: Dict[str, Any], group_id: str, params: Dict[str, Any]) -> tuple:
+    direction = params.get("direction", "next")
+    if direction not in ("next", "prev"):
+        return api_error(400, "direction must be next or prev")
+    limit = params.get("limit", "")
+    limit = int(limit) if limit.isdigit() else TRANSACTION_PAGE_SIZES["SMARTPHONE"]
+    page = cached_report(group_id, "transactions", get_transactions_page,
+                         params.get("member"), params.get("action"), params.get("start"),
+                         params.get("end"), params.get("cursor"), direction,
+                         min(max(limit, 1), API_MAX_PAGE_SIZE))
+    return 200, page
+
+# (method, resource) -> handler(user, group_id, params). "login" and "logout"
+# live at /api/<resource>; the rest at /api/groups/<group_id>/<resource>.
+API_ROUTES = {
+    ("POST", "login"): api_login,
+    ("POST", "logout"): api_logout,
+    ("POST", "contributions"): api_contribute,
+    ("POST", "payments"): api_payment,
+    ("GET", "tracker"): api_tracker,
+    ("GET", "members"): api_members,
+    ("GET", "transactions"): api_transactions,
+}
+
+def handle_api_request(method: str, path: str, params: Dict[str, Any], token: Optional[str] = None,
+                       if_none_match: Optional[str] = None) -> tuple:
+    # Returns (status, payload, etag); the socket side lives in APIRequestHandler
+    parts = [p for p in path.split("/") if p]
+    group_id = None
+    if len(parts) == 2 and parts[0] == "api":
+        resource = parts[1]
+    elif len(parts) == 4 and parts[:2] == ["api", "groups"]:
+        group_id, resource = parts[2], parts[3]
     else:
-        print("\n" + "="*40)
-        print("        GROUP MANAGEMENT")
-        print("="*40)
-    
-    print("1. 🆕 Create New Group")
-    print("2. 🔄 Switch Group")
-    print("3. 👥 View All Groups")
-    choice = input("📥 Choose: ").strip()
-    
-    if choice == "1":
-        return create_group(user["phone"], device_type)
-    elif choice == "2":
-        print("\n🏷️  Your Groups:")
-        for i, gid in enumerate(user["group_ids"], 1):
-            print(f"  {i}. {gid}")
+        return api_error(404, "Not found") + (None,)
+    
+    handler = API_ROUTES.get((method, resource))
+    if handler is None:
+        if any(r == resource for _, r in API_ROUTES):
+            return api_error(405, "Method not allowed") + (None,)
+        return api_error(404, "Not found") + (None,)
+    if handler is api_login:
+        return handler(None, None, params) + (None,)
+    
+    session = api_sessions.get(token) if token else None
+    if session is None:
+        return api_error(401, "Login required") + (None,)
+    user = dict(session["user"], token=token)
+    if group_id is not None and group_id not in user["group_roles"]:
+        return api_error(403, "Not a member of this group") + (None,)
+    if method != "GET" or group_id is None:
+        return handler(user, group_id, params) + (None,)
+    
+    # Group reports only change with the group's stored version: a poller
+    # that already holds it gets 304 after a single key lookup. The tag is taken
+    # before the read, so a write racing the read can only make it stale.
+    etag = report_etag(group_id)
+    tags = {t.strip().removeprefix("W/") for t in (if_none_match or "").split(",")}
+    if "*" in tags or etag in tags:
+        return 304, None, etag
+    status, payload = handler(user, group_id, params)
+    return status, payload, etag if status == 200 else None
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = f"VicobaAPI/{APP_VERSION}"
+    timeout = API_KEEPALIVE_TIMEOUT
+    # Headers and body go out in separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK and every response costs ~40ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.respond(*self.dispatch("GET", url.path, params))
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > API_MAX_BODY:
+            # The body is left unread, so this connection cannot be reused
+            self.close_connection = True
+            self.respond(*api_error(413, "Request body too large"))
+            return
         try:
-            idx = int(input("📥 Select group number: ")) - 1
-            if 0 <= idx < len(user["group_ids"]):
-                user["current_group_id"] = user["group_ids"][idx]
-                return f"✅ Switched to group {user['current_group_id']}"
-            else:
-                return "❌ Invalid selection"
+            params = json.loads(self.rfile.read(length) or b"{}")
         except ValueError:
-            return "❌ Invalid input"
-    elif choice == "3":
-        print("\n🏷️  All Groups:")
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT * FROM groups")
-        groups = [dict(row) for row in c.fetchall()]
-        conn.close()
-        
-        for i, group in enumerate(groups, 1):
-            print(f"  {i}. {group['group_id']} - {group['group_name']}")
-        return "✅ Groups displayed successfully"
-    else:
-        return "❌ Invalid choice"
+            params = None
+        if not isinstance(params, dict):
+            self.respond(*api_error(400, "Body must be a JSON object"))
+            return
+        self.respond(*self.dispatch("POST", url.path, params))
 
-# ==================== REPORTS & ANALYTICS ====================
-def view_round_tracker(group_id: str, device_type: str) -> None:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- ROUND TRACKER ---")
-    else:
-        print("\n" + "="*40)
-        print("        ROUND TRACKER")
-        print("="*40)
-    
-    contribs = get_current_round_contributions(group_id)
-    all_members = get_all_members(group_id)
-    total_pot = sum(c["contributed"] for c in contribs)
-    next_recipient = get_next_recipient(group_id)
-    
-    print(f"💰 Total Collected: {format_currency(total_pot)}")
-    print(f"🎯 Next Recipient: {next_recipient or 'None'}")
-    print("\n📊 Contributions:")
-    
-    for member in all_members:
-        contributed = next((c["contributed"] for c in contribs if c["member_name"] == member["member_name"]), 0)
-        status = "✅" if contributed > 0 else "❌"
-        marker = " <-- NEXT" if member["member_name"] == next_recipient else ""
-        print(f"  👤 {member['member_name']}: {format_currency(contributed)} {status}{marker}")
-    
-    not_contributed = [m["member_name"] for m in all_members if next((c["contributed"] for c in contribs if c["member_name"] == m["member_name"]), 0) == 0]
-    
-    if not_contributed:
-        print(f"\n⏰ Pending: {', '.join(not_contributed)}")
-    else:
-        print("\n🎉 All members have contributed!")
+    def dispatch(self, method: str, path: str, params: Dict[str, Any]) -> tuple:
+        auth = self.headers.get("Authorization", "")
+        token = auth[7:].strip() if auth.startswith("Bearer ") else None
+        try:
+            return handle_api_request(method, path, params, token, self.headers.get("If-None-Match"))
+        except Exception as e:
+            print(f"❌ API {method} {path} failed: {e}")
+            return api_error(500, "Service unavailable. Please try again.") + (None,)
 
-def view_member_summary(group_id: str, device_type: str) -> None:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- MEMBER SUMMARY ---")
-    else:
-        print("\n" + "="*40)
-        print("        MEMBER SUMMARY")
-        print("="*40)
-    
-    members = get_all_members(group_id)
-    if not members:
-        print("❌ No members in group")
-        return
-    
-    for member in members:
-        print(f"\n👤 {member['member_name']}:")
-        print(f"  💰 Contributions: {format_currency(member['total_contributions'])}")
-        print(f"  📥 Received: {format_currency(member['total_received'])}")
-        balance = member['total_received'] - member['total_contributions']
-        status = "🟢" if balance >= 0 else "🔴"
-        print(f"  ⚖️  Balance: {format_currency(balance)} {status}")
+    def respond(self, status: int, payload: Optional[Dict[str, Any]], etag: Optional[str] = None) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        if etag:
+            # Clients may keep the body but must revalidate before reusing it
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status == 429:
+            self.send_header("Retry-After", str(payload["retry_after"]))
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-def view_transactions(group_id: str, device_type: str, member_name: Optional[str] = None) -> None:
-    if device_type == "FEATURE_PHONE":
-        print("\n--- TRANSACTIONS ---")
-    else:
-        print("\n" + "="*40)
-        print("        TRANSACTION HISTORY")
-        print("="*40)
-    
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    query = "SELECT * FROM transactions WHERE group_id=? "
-    params = [group_id]
-    if member_name:
-        query += "AND member_name=? "
-        params.append(member_name)
-    query += "ORDER BY timestamp DESC LIMIT 50"
-    
-    c.execute(query, params)
-    rows = c.fetchall()
-    conn.close()
-    
-    if not rows:
-        print("❌ No transactions found")
-        return
-    
-    for row in rows:
-        action_icon = {
-            "CONTRIBUTION": "💰",
-            "PAYMENT_SENT": "📤",
-            "PAYMENT_RECEIVED": "📥",
-            "ROUND_RECEIVED": "🎯"
-        }.get(row['action'], "📝")
-        
-        print(f"{row['timestamp'][:16]} {action_icon} {row['member_name']} - {row['action']} {format_currency(row['amount'])}")
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # one line per hit drowns the console under load
 
-# ==================== REPORT EXPORT ====================
-def export_transactions_to_csv(group_id: str) -> str:
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    c.execute("""
-    SELECT * FROM transactions 
-    WHERE group_id=? 
-    ORDER BY timestamp DESC
-    """, (group_id,))
-    
-    transactions = [dict(row) for row in c.fetchall()]
-    conn.close()
-    
-    if not transactions:
-        return "❌ No transactions to export"
-    
-    filename = f"vicoba_transactions_{group_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    try:
-        with open(filename, 'w', newline='') as csvfile:
-            fieldnames = transactions[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(transactions)
-        return f"✅ Transactions exported to {filename}"
-    except Exception as e:
-        return f"❌ Export failed: {e}"
+class APIServer(HTTPServer):
+    """HTTP server that hands connections to a fixed worker pool.
+    
+    Unlike ThreadingHTTPServer no thread is spawned per connection: at most
+    `workers` requests run at once, each worker keeping its own pooled SQLite
+    connection via connection_manager, and further connections wait in the
+    listen backlog.
+    """
 
-# ==================== NOTIFICATIONS ====================
-def simulate_notifications(group_id: str, message: str) -> None:
-    members = get_all_members(group_id)
-    for member in members:
-        phone = member.get("phone")
-        if phone:
-            print(f"📱 [SIMULATED SMS to {phone}]: {message}")
+    request_queue_size = 128
 
-# ==================== MOBILE MONEY ====================
-class MobileMoneyService:
-    def __init__(self):
-        self.provider = "M-Pesa"
-    
-    def process_payment(self, phone: str, amount: int, purpose: str = "VICOBA Contribution") -> Dict[str, str]:
-        print(f"[MOBILE MONEY] Processing {format_currency(amount)} to {phone}")
-        return {
-            "status": "success",
-            "transaction_id": f"MM{phone}{amount}",
-            "message": f"Payment of {format_currency(amount)} processed successfully"
-        }
+    def __init__(self, address: tuple = (API_HOST, API_PORT), workers: int = API_WORKERS,
+                 use_group_commit: bool = GROUP_COMMIT_ENABLED):
+        super().__init__(address, APIRequestHandler)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._owns_group_commit = use_group_commit and not group_commit.running
+        if self._owns_group_commit:
+            group_commit.start()
 
-mobile_money_service = MobileMoneyService()
+    def process_request(self, request, client_address) -> None:
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._executor.shutdown(wait=True)
+        if self._owns_group_commit:
+            group_commit.stop()
+
+def serve_api(host: str = API_HOST, port: int = API_PORT, workers: int = API_WORKERS) -> None:
+    server = APIServer((host, port), workers)
+    print(f"🌐 {APP_NAME} API on http://{server.server_address[0]}:{server.server_address[1]}/api "
+          f"({workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 API stopped")
+    finally:
+        server.server_close()
 
 # ==================== MAIN APPLICATION ====================
 def main_app(user: Dict[str, Any], device_type: str) -> None:
     if "current_group_id" not in user:
-        user["current_group_id"] = user["group_ids"][0] if user["group_ids"] else None
+        select_group(user, user["group_ids"][0] if user["group_ids"] else None)
     
     group_id = user["current_group_id"]
     if not group_id:
@@ -1754,13 +3963,17 @@ def main_app(user: Dict[str, Any], device_type: str) -> None:
     print(f"\n🎉 Welcome! Group: {group_id}")
     
     while True:
-        show_menu("MAIN", device_type, user["role"])
+        role = menu_role(user)
+        show_menu("MAIN", device_type, role)
         choice = input("📥 Choose: ").strip()
         
-        if choice == "1" and user["role"] == "MEMBER":
+        if choice == "1" and role == "MEMBER":
             print(contribute(group_id, device_type))
-        elif choice == "1" and user["role"] == "ADMIN":
-            print(add_member(group_id, device_type))
+        elif choice == "1" and role == "ADMIN":
+            if is_group_admin(user):
+                print(add_member(group_id, device_type))
+            else:
+                print(f"❌ {get_message('group_admin_only')}")
         elif choice == "2":
             print(contribute(group_id, device_type))
         elif choice == "3":
@@ -1769,22 +3982,22 @@ def main_app(user: Dict[str, Any], device_type: str) -> None:
             view_round_tracker(group_id, device_type)
         elif choice == "5":
             view_member_summary(group_id, device_type)
-        elif choice == "6" and user["role"] == "MEMBER":
+        elif choice == "6" and role == "MEMBER":
             view_transactions(group_id, device_type)
-        elif choice == "6" and user["role"] == "ADMIN":
+        elif choice == "6" and role == "ADMIN":
             view_transactions(group_id, device_type)
-        elif choice == "7" and user["role"] == "MEMBER":
+        elif choice == "7" and role == "MEMBER":
             print(export_transactions_to_csv(group_id))
-        elif choice == "7" and user["role"] == "ADMIN":
+        elif choice == "7" and role == "ADMIN":
             result = manage_groups(user, device_type)
             print(result)
             group_id = user.get("current_group_id", group_id)
-        elif choice == "8" and user["role"] == "ADMIN":
+        elif choice == "8" and role == "ADMIN":
             print(export_transactions_to_csv(group_id))
-        elif choice == "9" and user["role"] == "ADMIN":
+        elif choice == "9" and role == "ADMIN":
             print("👋 Logging out...")
             break
-        elif choice == "7" and user["role"] == "MEMBER":
+        elif choice == "7" and role == "MEMBER":
             print("👋 Logging out...")
             break
         else:
@@ -1820,6 +4033,10 @@ def main():
         print("="*50)
         
         init_db()
+        if GROUP_COMMIT_ENABLED:
+            group_commit.start()
+        if SCHEDULER_ENABLED:
+            scheduler.start()
         
         device_type = detect_device_type()
         print(f"📱 Detected device: {device_type}")
@@ -1839,7 +4056,141 @@ def main():
     except Exception as e:
         print(f"❌ Unexpected error: {str(e)}")
         print("📞 Please contact support if this persists.")
+    finally:
+        scheduler.stop()
+        notification_dispatcher.stop()
+        group_commit.stop()
+        connection_manager.close_all()
+
+# ==================== COMMAND LINE ====================
+def cli_main(argv: List[str]) -> int:
+    # Non-interactive jobs; with no arguments the interactive app runs
+    parser = argparse.ArgumentParser(prog="vicoba", description=f"{APP_NAME} batch commands",
+                                     fromfile_prefix_chars="@")
+    parser.add_argument("--db", default=DB_FILE, help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    ingest = commands.add_parser("ingest", help="bulk-import contributions from CSV/JSONL (optionally .gz)")
+    ingest.add_argument("path")
+    ingest.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    
+    onboard = commands.add_parser("onboard", help="add a member roster from CSV/JSON/JSONL")
+    onboard.add_argument("path")
+    onboard.add_argument("--group", help="group for rows without a group_id column")
+    
+    batch = argparse.ArgumentParser(add_help=False)
+    batch.add_argument("groups", nargs="+", help='group IDs or "all"; @FILE reads them one per line')
+    batch.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    batch.add_argument("--report", help="also write the summary and per-group results as JSON")
+    commands.add_parser("finalize", parents=[batch], help="close every round whose pot is complete")
+    export = commands.add_parser("export", parents=[batch], help="export each group's transactions")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--gzip", action="store_true")
+    export.add_argument("--since-id", type=int, help="only rows after this ledger id")
+    export.add_argument("--out-dir", default=".")
+    commands.add_parser("summarize", parents=[batch], help="rebuild member balances and open rounds from the ledger")
+    
+    schedule = commands.add_parser("schedule", help="set a group's meeting day")
+    schedule.add_argument("group")
+    when = schedule.add_mutually_exclusive_group(required=True)
+    when.add_argument("--weekly", choices=[d.lower() for d in WEEKDAYS], help="weekday of the meeting")
+    when.add_argument("--monthly", type=int, metavar="DAY", help="day of the month, 1-28")
+    schedule.add_argument("--hour", type=int, default=9)
+    
+    run_scheduler = commands.add_parser("scheduler", help="run reminders, round closing and reports on schedule")
+    run_scheduler.add_argument("--once", action="store_true", help="run what is due now and exit")
+    
+    notify = commands.add_parser("notify", help="deliver queued notifications")
+    notify.add_argument("--once", action="store_true", help="send what is due now and exit")
+    
+    serve = commands.add_parser("serve", help="run the JSON HTTP API for smartphone and web clients")
+    serve.add_argument("--host", default=API_HOST)
+    serve.add_argument("--port", type=int, default=API_PORT)
+    serve.add_argument("--workers", type=int, default=API_WORKERS)
+    serve.add_argument("--scheduler", action="store_true", help="also run the meeting scheduler")
+    
+    args = parser.parse_args(argv)
+    globals()["DB_FILE"] = args.db
+    try:
+        init_db()
+        if args.command == "ingest":
+            result = import_contributions(args.path, args.batch_size)
+            print(result)
+            return 0 if result.startswith("✅") else 1
+        if args.command == "onboard":
+            result = onboard_members(args.path, args.group)
+            print(result)
+            return 0 if result.startswith("✅") else 1
+        if args.command in BATCH_JOBS:
+            known = list_group_ids()
+            group_ids = known if args.groups == ["all"] else list(dict.fromkeys(args.groups))
+            unknown = sorted(set(group_ids) - set(known))
+            if unknown:
+                print(f"❌ Unknown groups: {', '.join(unknown)}")
+                return 2
+            options = {}
+            if args.command == "export":
+                os.makedirs(args.out_dir, exist_ok=True)
+                options = {"format": args.format, "gzip": args.gzip, "since_id": args.since_id,
+                           "out_dir": args.out_dir}
+            summary = run_batch(args.command, group_ids, options, args.jobs)
+            totals = {k: v for k, v in summary.items()
+                      if k not in ("job", "groups", "succeeded", "failed", "workers", "elapsed_sec", "results")}
+            print(f"\n📊 {args.command}: {summary['succeeded']}/{summary['groups']} groups ok "
+                  f"in {summary['elapsed_sec']}s on {summary['workers']} workers; "
+                  + ", ".join(f"{k.replace('_', ' ')} {v:,}" for k, v in totals.items()))
+            if args.report:
+                with open(args.report, "w") as f:
+                    json.dump(summary, f, indent=2)
+            return 1 if summary["failed"] else 0
+        if args.command == "schedule":
+            if args.weekly:
+                result = set_group_schedule(args.group, "WEEKLY", WEEKDAYS.index(args.weekly.upper()), args.hour)
+            else:
+                result = set_group_schedule(args.group, "MONTHLY", args.monthly, args.hour)
+            print(result)
+            return 0 if result.startswith("✅") else 1
+        if args.command == "scheduler":
+            if args.once:
+                print(f"✅ {scheduler.run_pending()} scheduled tasks run")
+                return 0
+            scheduler.start()
+            if NOTIFICATIONS_ENABLED:
+                notification_dispatcher.start()
+            print(f"⏰ Scheduler running (every {SCHEDULER_TICK}s); Ctrl+C to stop")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                print("\n👋 Scheduler stopped")
+        if args.command == "notify":
+            if args.once:
+                notification_dispatcher.flush()
+                stats = notification_dispatcher.stats()
+                print(f"✅ {stats['sent']} sent, {stats['retried']} to retry, {stats['failed']} failed; "
+                      f"outbox {get_outbox_counts()}")
+                return 0
+            notification_dispatcher.start()
+            print("📨 Notification dispatcher running; Ctrl+C to stop")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                print("\n👋 Dispatcher stopped")
+        if args.command == "serve":
+            if args.scheduler or SCHEDULER_ENABLED:
+                scheduler.start()
+            if NOTIFICATIONS_ENABLED:
+                notification_dispatcher.start()
+            serve_api(args.host, args.port, args.workers)
+    finally:
+        scheduler.stop()
+        notification_dispatcher.stop()
+        connection_manager.close_all()
+    return 0
 
 # ==================== START APPLICATION ====================
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(cli_main(sys.argv[1:]))
     main()